@@ -0,0 +1,221 @@
+"""
+Load test comparing the sync (DRF) and native async endpoints under concurrency, against a running server, e.g.:
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py migrate
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.load_test --create-user
+    DJANGO_SETTINGS_MODULE=benchmarks.settings uvicorn main.asgi:application --port 8000 &
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 1 10 50 --duration 10
+
+Each client keeps one HTTP/1.1 connection open and sends requests back to back for the duration. The results (one
+entry per endpoint and concurrency) are printed as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_USERNAME = "benchmark"
+DEFAULT_PASSWORD = "benchmark-password"
+
+# name -> (method, path, JSON body)
+ENDPOINTS = {
+    "tasks_sync": ("GET", "/api/tasks/?limit=40", None),
+    "tasks_async": ("GET", "/api/async/tasks/?limit=40", None),
+    "task_run_sync": (
+        "POST", "/api/task_run/?task=vcelerydev.tasks.count_for_me", {"args": ["benchmark"], "kwargs": {"count_to": 3}}
+    ),
+    "task_run_async": (
+        "POST",
+        "/api/async/task_run/?task=vcelerydev.tasks.count_for_me",
+        {"args": ["benchmark"], "kwargs": {"count_to": 3}},
+    ),
+}
+
+
+def create_user(username: str, password: str):
+    """
+    Creates (or resets) the superuser the load test logs in as. Needs DJANGO_SETTINGS_MODULE.
+    """
+    import django
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+
+    user, _ = get_user_model().objects.get_or_create(username=username)
+    user.is_staff = user.is_superuser = True
+    user.set_password(password)
+    user.save()
+
+
+def log_in(base_url: str, username: str, password: str) -> Tuple[str, str]:
+    """
+    Logs in through the login form.
+
+    :return: the session ID and CSRF token
+    """
+    cookie_jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookie_jar))
+    login_url = f"{base_url}/accounts/login/"
+    page = opener.open(login_url).read().decode("utf-8")
+    match = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page)
+    if not match:
+        raise RuntimeError(f"No CSRF token found in {login_url}")
+    data = urllib.parse.urlencode(
+        {"username": username, "password": password, "csrfmiddlewaretoken": match.group(1), "next": "/api/tasks/"}
+    ).encode("utf-8")
+    opener.open(urllib.request.Request(login_url, data=data, headers={"Referer": login_url}))
+
+    cookies = {cookie.name: cookie.value for cookie in cookie_jar}
+    if "sessionid" not in cookies:
+        raise RuntimeError(f"Cannot log in as {username}")
+    return cookies["sessionid"], cookies["csrftoken"]
+
+
+def _build_request(
+    host: str, method: str, path: str, body: Optional[Dict[str, Any]], session_id: str, csrf_token: str
+) -> bytes:
+    content = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {host}",
+        f"Cookie: sessionid={session_id}; csrftoken={csrf_token}",
+        f"X-CSRFToken: {csrf_token}",
+        f"Referer: http://{host}/",
+        "Content-Type: application/json",
+        f"Content-Length: {len(content)}",
+        "",
+        "",
+    ]
+    return "\r\n".join(headers).encode("latin-1") + content
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    content_length = 0
+    chunked = False
+    while True:
+        line = (await reader.readline()).strip()
+        if not line:
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            content_length = int(value)
+        elif name.lower() == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif content_length:
+        await reader.readexactly(content_length)
+    return status
+
+
+async def _client(
+    host: str, port: int, request: bytes, deadline: float, latencies: List[float], statuses: Dict[int, int]
+):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            started_at = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - started_at)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(
+    base_url: str, endpoint: str, concurrency: int, duration: float, session_id: str, csrf_token: str
+) -> Dict[str, Any]:
+    """
+    :return: the throughput and latency percentiles (in ms) of concurrency clients hitting an endpoint for duration
+        seconds
+    """
+    url = urllib.parse.urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    method, path, body = ENDPOINTS[endpoint]
+    request = _build_request(f"{host}:{port}", method, path, body, session_id, csrf_token)
+
+    latencies = []  # type: List[float]
+    statuses = {}  # type: Dict[int, int]
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+    await asyncio.gather(
+        *(_client(host, port, request, deadline, latencies, statuses) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+            "p50": percentile(0.5) if latencies else None,
+            "p95": percentile(0.95) if latencies else None,
+            "p99": percentile(0.99) if latencies else None,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the server")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint and concurrency")
+    parser.add_argument("--username", default=DEFAULT_USERNAME)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--create-user", action="store_true", help="create the user to log in as and exit")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    options = parser.parse_args(argv)
+
+    if options.create_user:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+        create_user(options.username, options.password)
+        return
+
+    base_url = options.url.rstrip("/")
+    session_id, csrf_token = log_in(base_url, options.username, options.password)
+    results = []
+    for endpoint in options.endpoints:
+        for concurrency in options.concurrency:
+            result = asyncio.run(run_load(base_url, endpoint, concurrency, options.duration, session_id, csrf_token))
+            print(
+                f"{endpoint} x{concurrency}: {result['requests_per_second']} req/s,"
+                f" p95 {result['latency_ms']['p95']} ms",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    output = json.dumps({"url": base_url, "duration": options.duration, "results": results}, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Measures the memory of preforked worker processes serving a synthetic task catalog, e.g.:
+
+    python -m benchmarks.prefork_memory --tasks 10000 --workers 4
+
+For each mode, a fresh master process forks the workers the way a preforking server (e.g. gunicorn) does:
+
+- per_worker: each worker builds its own catalog after the fork (no preloading)
+- preloaded: the master builds the catalog (with the parameters of all tasks as JSON) before the fork
+- preloaded_compact: the same with VCELERY_TASKRUN_COMPACT_CATALOG, i.e. as built by preload_task_registry()
+
+Each worker then pages through the whole task list and the parameters of every task, as it would over time when
+serving the task list API, runs a garbage collection and reports its memory from /proc/self/smaps_rollup (Linux): RSS,
+PSS (shared pages divided between the processes sharing them) and USS (pages private to the worker). The results are
+printed as JSON.
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+
+MODES = ["per_worker", "preloaded", "preloaded_compact"]
+
+
+def read_memory() -> Dict[str, int]:
+    """
+    :return: the rss, pss and uss of the current process in KiB (only the peak rss where smaps_rollup isn't available)
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            values = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        import resource
+
+        return {"max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return {
+        "rss_kib": values["Rss"],
+        "pss_kib": values["Pss"],
+        "uss_kib": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def _build_registry(celery_app, num_tasks: int, compact: bool):
+    from benchmarks.synthetic import get_runnable_tasks
+    from vcelerytaskrunner.services.task_registry import TaskRegistry
+
+    registry = TaskRegistry(celery_app, get_runnable_tasks(num_tasks), force_autodiscovery=False, compact=compact)
+    catalog = registry.refresh()
+    if not compact:
+        # Compact catalogs encode the parameters of all tasks up front
+        for task_name in catalog.task_names:
+            registry.get_task_parameters_json(task_name)
+    return registry
+
+
+def _serve(registry) -> None:
+    """
+    Touches the whole catalog the way the task list API does over many requests.
+    """
+    from vcelerytaskrunner.services.task_registry import LimitOffsetPagination, TaskFilter
+
+    num_tasks = len(registry.task_names)
+    for runnable_only in (False, True):
+        for offset in range(0, num_tasks, 40):
+            task_infos = registry.get_task_infos(
+                TaskFilter(mask=None, runnable_only=runnable_only), LimitOffsetPagination(offset=offset, limit=40)
+            )
+            for task_info in task_infos["task_infos"]:
+                registry.get_task_parameters_json(task_info["name"])
+    for mask in ("reports", "billing", "task_0", "no-such-task"):
+        registry.get_task_infos(TaskFilter(mask=mask, runnable_only=False), LimitOffsetPagination(offset=0, limit=40))
+    gc.collect()
+
+
+def run_mode(mode: str, num_tasks: int, num_workers: int) -> Dict[str, Any]:
+    """
+    Runs one mode in the current process (the master) and its forked workers.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    import django
+
+    django.setup()
+    from benchmarks.synthetic import create_celery_app
+
+    celery_app = create_celery_app(num_tasks)
+    gc.collect()
+    master_before = read_memory()
+
+    registry = None
+    if mode != "per_worker":
+        registry = _build_registry(celery_app, num_tasks, compact=mode == "preloaded_compact")
+        gc.freeze()
+    master_after = read_memory()
+
+    pipes = []
+    for _ in range(num_workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            worker_registry = registry or _build_registry(celery_app, num_tasks, compact=False)
+            _serve(worker_registry)
+            with os.fdopen(write_fd, "w") as f:
+                json.dump(read_memory(), f)
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append((pid, read_fd))
+
+    # The workers report while all of them are alive, so that shared pages are divided between all of them in PSS
+    workers = []
+    for pid, read_fd in pipes:
+        with os.fdopen(read_fd) as f:
+            workers.append(json.load(f))
+        os.waitpid(pid, 0)
+
+    return {
+        "mode": mode,
+        "num_tasks": num_tasks,
+        "num_workers": num_workers,
+        "master_before_kib": master_before,
+        "master_after_kib": master_after,
+        "workers_kib": workers,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000, help="number of tasks")
+    parser.add_argument("--workers", type=int, default=4, help="number of workers forked")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.mode:
+        print(json.dumps(run_mode(options.mode, options.tasks, options.workers)))
+        return 0
+
+    results = []
+    for mode in options.modes:
+        # A fresh master per mode, so that one mode's garbage doesn't skew the next one
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.prefork_memory",
+                "--mode", mode, "--tasks", str(options.tasks), "--workers", str(options.workers),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+
+        workers = result["workers_kib"]
+        summary = "  ".join(
+            f"{key[:-4]} {sum(worker[key] for worker in workers) / len(workers) / 1024:8.1f} MiB"
+            for key in workers[0]
+        )
+        print(f"{options.tasks:>6} tasks  {mode:<20} per worker: {summary}", file=sys.stderr)
+
+    print(json.dumps({"results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
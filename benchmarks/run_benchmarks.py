@@ -0,0 +1,254 @@
+"""
+Benchmarks of the registry and API hot paths on synthetic registries, e.g.:
+
+    python -m benchmarks.run_benchmarks --sizes 100 1000 10000 50000 --output results.json
+    python -m benchmarks.run_benchmarks --output new.json --compare results.json
+
+Runs with benchmarks.settings: Celery's in-memory broker (or --eager) and a throwaway in-memory SQLite database, so
+nothing else needs to be running. The results are written as JSON (one entry per benchmark and registry size, with
+timings in milliseconds). With --compare, benchmarks whose median got slower than the baseline by more than
+--threshold are reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+
+def measure(func: Callable[[], Any], number: int = 1, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Times func() like timeit: repeat rounds of number calls each.
+
+    :return: the min/median/mean time per call in milliseconds and the calls per second at the median
+    """
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started_at) / number)
+    median = statistics.median(timings)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_ms": round(min(timings) * 1000, 4),
+        "median_ms": round(median * 1000, 4),
+        "mean_ms": round(statistics.mean(timings) * 1000, 4),
+        "ops_per_second": round(1 / median, 1) if median else None,
+    }
+
+
+def _get_metadata() -> Dict[str, Any]:
+    from importlib.metadata import PackageNotFoundError, version
+
+    versions = {}
+    for package in ("django", "celery", "pydantic", "djangorestframework", "vcelery-task-runner"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": versions,
+    }
+
+
+def run_size(num_tasks: int, launches: int, eager: bool) -> List[Dict[str, Any]]:
+    """
+    Runs all the benchmarks against a synthetic registry of num_tasks tasks.
+    """
+    from django.contrib.auth import get_user_model
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from benchmarks.synthetic import (
+        LAUNCH_TASK_POSITION, create_celery_app, get_runnable_tasks, get_task_name,
+    )
+    from vcelerytaskrunner.services import task_runner
+    from vcelerytaskrunner.services.task_registry import (
+        CursorPagination, LimitOffsetPagination, TaskFilter, TaskRegistry,
+    )
+    from vcelerytaskrunner.services.task_registry import encode_task_cursor
+    from vcelerytaskrunner.views import TasksAPIView
+
+    results = []
+
+    def add_result(name: str, stats: Dict[str, Any], **params: Any):
+        results.append({"name": name, "num_tasks": num_tasks, "params": params, **stats})
+        print(f"{num_tasks:>6} tasks  {name:<40} {stats['median_ms']:>10.3f} ms", file=sys.stderr)
+
+    started_at = time.perf_counter()
+    celery_app = create_celery_app(num_tasks, eager=eager)
+    add_result("create_celery_app", {"median_ms": round((time.perf_counter() - started_at) * 1000, 4)})
+
+    registry = TaskRegistry(celery_app, get_runnable_tasks(num_tasks), force_autodiscovery=False)
+    task_names = [get_task_name(position) for position in range(num_tasks)]
+    sample = task_names[::max(1, num_tasks // 1000)]
+
+    # Registry refresh
+    add_result("registry_refresh", measure(registry._refresh_registry, repeat=3))
+    add_result("registry_refresh_warm_parameters", measure(lambda: registry.refresh(warm_parameters=True), repeat=1))
+
+    # Loading the catalog (names and parameters) published by another process, instead of discovering it
+    with override_settings(VCELERY_TASKRUN_CATALOG_CACHE="default"):
+        registry.refresh()
+
+        def load_cached_catalog():
+            TaskRegistry.catalog = None
+            assert registry._load_cached_catalog() is not None
+
+        add_result("catalog_cache_load", measure(load_cached_catalog, repeat=3))
+
+    # Task parameters: first lookups after a refresh, then cached ones
+    registry.refresh()
+    sample_iter = iter(sample)
+    add_result(
+        "get_task_parameters_cold",
+        measure(lambda: registry.get_task_parameters(next(sample_iter)), number=len(sample), repeat=1),
+        tasks=len(sample),
+    )
+    add_result(
+        "get_task_parameters_cached",
+        measure(lambda: [registry.get_task_parameters(task_name) for task_name in sample], repeat=5),
+        tasks=len(sample),
+    )
+
+    # Task infos
+    first_page = LimitOffsetPagination(offset=0, limit=40)
+    last_page = LimitOffsetPagination(offset=max(0, num_tasks - 40), limit=40)
+    for name, task_filter, pagination in [
+        ("get_task_infos", TaskFilter(mask=None, runnable_only=False), first_page),
+        ("get_task_infos_last_page", TaskFilter(mask=None, runnable_only=False), last_page),
+        ("get_task_infos_runnable_only", TaskFilter(mask=None, runnable_only=True), first_page),
+        ("get_task_infos_mask_broad", TaskFilter(mask="reports", runnable_only=False), first_page),
+        ("get_task_infos_mask_narrow", TaskFilter(mask=task_names[-1][-8:], runnable_only=False), first_page),
+        ("get_task_infos_mask_no_match", TaskFilter(mask="no-such-task", runnable_only=False), first_page),
+        (
+            "get_task_infos_cursor",
+            TaskFilter(mask=None, runnable_only=False),
+            CursorPagination(cursor=encode_task_cursor(task_names[num_tasks // 2]), limit=40, with_count=False),
+        ),
+    ]:
+        add_result(
+            name,
+            measure(lambda: registry.get_task_infos(task_filter, pagination), number=20),
+            mask=task_filter["mask"],
+            runnable_only=task_filter["runnable_only"],
+            pagination=dict(pagination),
+        )
+
+    # TasksAPIView.get() per page of 40
+    user = get_user_model()(username="benchmark", is_superuser=True, is_active=True)
+    factory = APIRequestFactory()
+    view = TasksAPIView.as_view()
+
+    def get_page(query: Dict[str, Any]) -> None:
+        request = factory.get("/api/tasks/", query)
+        force_authenticate(request, user=user)
+        response = view(request)
+        assert response.status_code == 200, response.content
+
+    with mock.patch.object(task_runner, "TASK_REGISTRY", registry):
+        for name, query in [
+            ("tasks_api_view_first_page", {"limit": 40}),
+            ("tasks_api_view_last_page", {"limit": 40, "offset": max(0, num_tasks - 40)}),
+            ("tasks_api_view_mask", {"limit": 40, "mask": "reports"}),
+            ("tasks_api_view_cursor", {"limit": 40, "cursor": encode_task_cursor(task_names[num_tasks // 2])}),
+        ]:
+            registry.refresh()
+            add_result(f"{name}_cold", measure(lambda: get_page(query), repeat=1), query=query)
+            add_result(name, measure(lambda: get_page(query), number=20), query=query)
+
+        # Launches (publish to the in-memory broker and INSERT of the TaskRunRecord)
+        launch_user, _ = get_user_model().objects.get_or_create(username="benchmark", is_superuser=True)
+        launch_task_name = get_task_name(LAUNCH_TASK_POSITION)
+        stats = measure(
+            lambda: task_runner.run_and_record(launch_task_name, ["benchmark"], {"count": 3}, launch_user),
+            number=launches,
+            repeat=1,
+        )
+        add_result("run_and_record", stats, launches=launches, eager=eager)
+
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    :return: a description of each benchmark whose median is more than threshold (e.g. 0.2 for 20%) slower than in
+        the baseline results
+    """
+    baseline_medians = {
+        (result["name"], result["num_tasks"]): result["median_ms"] for result in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        baseline_median = baseline_medians.get((result["name"], result["num_tasks"]))
+        if baseline_median and result["median_ms"] > baseline_median * (1 + threshold):
+            regressions.append(
+                f"{result['name']} ({result['num_tasks']} tasks): {baseline_median:.3f} ms -> "
+                f"{result['median_ms']:.3f} ms (+{(result['median_ms'] / baseline_median - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="numbers of tasks")
+    parser.add_argument("--launches", type=int, default=500, help="tasks launched for run_and_record")
+    parser.add_argument("--eager", action="store_true", help="run launched tasks in process (task_always_eager)")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression")
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    import django
+
+    django.setup()
+    from django.db import connection
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = []
+        for num_tasks in options.sizes:
+            results.extend(run_size(num_tasks, options.launches, options.eager))
+    finally:
+        connection.creation.destroy_test_db(connection.settings_dict["NAME"], verbosity=0)
+
+    output = json.dumps({"metadata": _get_metadata(), "results": results}, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if options.compare:
+        with open(options.compare) as f:
+            regressions = compare(results, json.load(f), options.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Settings for running the benchmarks locally: the demo project with SQLite and Celery's in-memory broker, so no RabbitMQ
+or worker is needed. Tasks are only published, never executed (unless VCELERY_BENCHMARK_EAGER=1).
+"""
+import os
+import tempfile
+
+from main.settings import *
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get(
+            "VCELERY_BENCHMARK_DB", os.path.join(tempfile.gettempdir(), "vcelery-benchmarks.sqlite3")
+        ),
+    }
+}
+
+CELERY_BROKER_URL = "memory://"
+CELERY_RESULT_BACKEND = None
+CELERY_TASK_ALWAYS_EAGER = os.environ.get("VCELERY_BENCHMARK_EAGER", "") == "1"
+
+ALLOWED_HOSTS = ["*"]
+DEBUG = False
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "root": {"level": "WARNING"},
+}
+
+if os.environ.get("VCELERY_BENCHMARK_WRITE_BEHIND", "") == "1":
+    VCELERY_TASK_RUN_RECORD_WRITE_BEHIND = {"BATCH_SIZE": 100}
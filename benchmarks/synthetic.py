@@ -0,0 +1,110 @@
+"""
+Synthetic Celery apps with any number of tasks, for benchmarking the registry and the API without the demo project's
+handful of tasks.
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from celery import Celery
+from pydantic import BaseModel, Field
+
+
+MODULES = ["billing", "reports", "sync", "email", "inventory", "users", "search", "exports"]
+
+
+class Currency(Enum):
+    USD = "USD"
+    EUR = "EUR"
+
+
+class Payment(BaseModel):
+    amount: int = Field(gt=0)
+    currency: Currency
+    paid_at: datetime
+
+
+class OrderLine(BaseModel):
+    sku: str
+    quantity: int = 1
+
+
+class Order(BaseModel):
+    order_id: str
+    lines: List[OrderLine]
+    payment: Optional[Payment] = None
+
+
+def no_params() -> None:
+    pass
+
+
+def scalar_params(name: str, count: int = 1, ratio: float = 0.5) -> None:
+    pass
+
+
+def datetime_params(when: datetime, tz_name: str = "UTC") -> None:
+    pass
+
+
+def model_param(payment: Payment) -> None:
+    pass
+
+
+def nested_model_param(order: Order, notify: bool = False) -> None:
+    pass
+
+
+def generic_params(items: Dict[str, List[int]], tags: Optional[List[str]] = None) -> None:
+    pass
+
+
+def untyped_params(a, b, *args, **kwargs) -> None:
+    pass
+
+
+# Signatures cycled through by the synthetic tasks
+TASK_FUNCTIONS = [
+    no_params,
+    scalar_params,
+    datetime_params,
+    model_param,
+    nested_model_param,
+    generic_params,
+    untyped_params,
+]  # type: List[Callable[..., Any]]
+
+# Position of a task taking scalar_params(), used to measure launches
+LAUNCH_TASK_POSITION = TASK_FUNCTIONS.index(scalar_params)
+
+
+def get_task_name(position: int) -> str:
+    """
+    :return: the name of the synthetic task at a position, e.g. "bench.reports.task_00001"
+    """
+    return f"bench.{MODULES[position % len(MODULES)]}.task_{position:05d}"
+
+
+def create_celery_app(num_tasks: int, eager: bool = False) -> Celery:
+    """
+    Creates a Celery app (with the in-memory broker) with num_tasks tasks of varied signatures, including pydantic
+    models and generics.
+
+    :param num_tasks: the number of tasks
+    :param eager: True to run the tasks in process when launched
+    """
+    app = Celery(f"bench_{num_tasks}", broker="memory://", backend=None, set_as_current=False)
+    app.conf.task_always_eager = eager
+    app.conf.task_serializer = "pickle"
+    app.conf.accept_content = ["pickle", "json"]
+    for position in range(num_tasks):
+        app.task(name=get_task_name(position), shared=False)(TASK_FUNCTIONS[position % len(TASK_FUNCTIONS)])
+    app.finalize()
+    return app
+
+
+def get_runnable_tasks(num_tasks: int) -> Set[str]:
+    """
+    :return: the names of every other task (including LAUNCH_TASK_POSITION), so that half the tasks are runnable
+    """
+    return {get_task_name(position) for position in range(LAUNCH_TASK_POSITION % 2, num_tasks, 2)}
@@ -11,6 +11,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from vcelerytaskrunner.services.registry_refresh import start_registry_services
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
 application = get_asgi_application()
+
+start_registry_services()
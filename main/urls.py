@@ -18,7 +18,19 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.decorators.csrf import csrf_exempt
 
-from vcelerytaskrunner.views import TaskRunAPIView, TasksAPIView, TasksView, TaskRunFormView
+from vcelerytaskrunner.views import (
+    AsyncTaskRunAPIView,
+    AsyncTasksAPIView,
+    MetricsAPIView,
+    ProfilesView,
+    TaskRunAPIView,
+    TaskRunBulkAPIView,
+    TaskRunRecordExportAPIView,
+    TaskRunStatusesAPIView,
+    TasksAPIView,
+    TasksView,
+    TaskRunFormView,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,9 +39,23 @@ urlpatterns = [
 
     path('tasks/', TasksView.as_view(), name="vcelery-tasks"),
     path('task_run/', TaskRunFormView.as_view(), name="vcelery-task-run"),
+    path('profiles/', ProfilesView.as_view(), name="vcelery-profiles"),
 
 
     path('api/tasks/', TasksAPIView.as_view(), name="vcelery-api-tasks"),
-    # The following are not completed yet.
-    # path('api/task_run/', csrf_exempt(TaskRunAPIView.as_view()), name="vcelery-api-task-run")
+    path('api/task_runs/', csrf_exempt(TaskRunBulkAPIView.as_view()), name="vcelery-api-task-runs"),
+    path(
+        'api/task_run_statuses/', csrf_exempt(TaskRunStatusesAPIView.as_view()), name="vcelery-api-task-run-statuses"
+    ),
+    path(
+        'api/task_run_records/export/',
+        TaskRunRecordExportAPIView.as_view(),
+        name="vcelery-api-task-run-records-export",
+    ),
+    path('api/task_run/', csrf_exempt(TaskRunAPIView.as_view()), name="vcelery-api-task-run"),
+    path('api/metrics/', MetricsAPIView.as_view(), name="vcelery-api-metrics"),
+
+    # Native async versions for ASGI deployments
+    path('api/async/tasks/', AsyncTasksAPIView.as_view(), name="vcelery-api-tasks-async"),
+    path('api/async/task_run/', AsyncTaskRunAPIView.as_view(), name="vcelery-api-task-run-async"),
 ]
@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_init
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
@@ -12,3 +13,10 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@worker_init.connect
+def connect_vcelery_worker_signals(**kwargs):
+    # Only in worker processes, not in every process importing the Celery app
+    from vcelerytaskrunner.services.worker_updates import connect_worker_signals
+    connect_worker_signals()
+
+
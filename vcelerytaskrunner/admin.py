@@ -1,12 +1,100 @@
+import json
+import logging
+from typing import Optional
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.task_status import get_task_run_statuses
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+def get_estimated_row_count(model, using: str = "default") -> Optional[int]:
+    """
+    Returns the number of rows of a model's table as estimated by the database statistics, which is much cheaper than
+    a COUNT(*) on large tables.
+
+    :return: the estimate (None if the database doesn't provide one, e.g. SQLite)
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        query = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+    elif connection.vendor == "mysql":
+        query = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s"
+    else:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(query, [table])
+            row = cursor.fetchone()
+    except Exception as e:
+        logger.warning("Cannot estimate the row count of %s: %s", table, e)
+        return None
+    # PostgreSQL reports -1 for tables never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the database's estimate of the table size instead of COUNT(*) when listing a whole, large
+    table (at least VCELERY_ADMIN_ESTIMATED_COUNT_THRESHOLD rows). Filtered listings are counted exactly.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where:
+            estimate = get_estimated_row_count(self.object_list.model, using=self.object_list.db)
+            threshold = getattr(settings, "VCELERY_ADMIN_ESTIMATED_COUNT_THRESHOLD", DEFAULT_ESTIMATED_COUNT_THRESHOLD)
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return super().count
 
 
 class TaskRunRecordAdmin(admin.ModelAdmin):
-    readonly_fields = ('task_name', 'task_id', 'run_by', 'run_with')
-    list_display  = ('id', 'task_name', 'task_id', 'run_by', 'created_at')
+    readonly_fields = (
+        'task_name', 'task_id', 'run_by', 'run_with', 'arguments', 'run_args_truncated', 'run_args_hash',
+        'status', 'started_at', 'finished_at', 'runtime',
+    )
+    exclude = ('run_args', 'run_args_compressed')
+    list_display  = ('id', 'task_name', 'task_id', 'run_by', 'created_at', 'status', 'runtime')
+    list_filter = ('status',)
+    list_select_related = ('run_by',)
+    actions = ['refresh_status']
     search_fields = ['=task_name', '=run_by__username']
+    # Newest first, so that filtering by task name, user or status is served by the (..., created_at) indexes
+    ordering = ('-created_at',)
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith("_changelist"):
+            # The (possibly large) arguments are only shown on the change page
+            queryset = queryset.defer("run_with", "run_args", "run_args_compressed")
+        return queryset
+
+    @admin.display(description="Arguments")
+    def arguments(self, obj: TaskRunRecord) -> str:
+        run_args = obj.get_run_args()
+        return json.dumps(run_args, indent=2) if run_args is not None else "-"
+
+    @admin.action(description="Refresh the status of selected task runs")
+    def refresh_status(self, request, queryset):
+        task_ids = list(queryset.values_list("task_id", flat=True))
+        get_task_run_statuses(task_ids)
+        self.message_user(request, f"Refreshed the status of {len(task_ids)} task run(s).")
 
     def has_add_permission(self, request, obj=None):
         return False
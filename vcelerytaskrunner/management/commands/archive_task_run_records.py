@@ -0,0 +1,88 @@
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.record_export import (
+    DEFAULT_EXPORT_CHUNK_SIZE,
+    format_rows,
+    get_format_from_path,
+    iter_serialized_task_run_records,
+    open_text,
+)
+from vcelerytaskrunner.services.record_pruning import get_prune_cutoff, prune_task_run_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes TaskRunRecords older than VCELERY_TASK_RUN_RECORD_LONGEVITY (or --before) to a JSON Lines or CSV file "
+        "(gzip-compressed if its name ends with .gz), then deletes them in batches. Runs in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="File to write, e.g. task_run_records-2024-01.jsonl.gz or ....csv.gz")
+        parser.add_argument(
+            "--before",
+            help="ISO 8601 datetime to archive records created before (instead of VCELERY_TASK_RUN_RECORD_LONGEVITY).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_EXPORT_CHUNK_SIZE,
+            help=f"Records read (and deleted) per query (default {DEFAULT_EXPORT_CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Only write the file without deleting the archived records."
+        )
+
+    def _count(self, rows):
+        for row in rows:
+            self.archived += 1
+            yield row
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        try:
+            export_format = get_format_from_path(output)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if os.path.exists(output):
+            raise CommandError(f"{output} already exists.")
+
+        if options["before"]:
+            archive_before = parse_datetime(options["before"])
+            if not isinstance(archive_before, datetime):
+                raise CommandError(f"Invalid datetime: {options['before']}")
+        else:
+            archive_before = get_prune_cutoff()
+            if archive_before is None:
+                raise CommandError("VCELERY_TASK_RUN_RECORD_LONGEVITY set to PERMANENT. Use --before.")
+
+        # Only archive (and then delete) up to the newest record existing now, so records created meanwhile are
+        # neither missed in the file nor deleted.
+        task_run_records = TaskRunRecord.objects.filter(created_at__lt=archive_before)
+        max_pk = task_run_records.aggregate(max_pk=Max("pk"))["max_pk"]
+        if max_pk is None:
+            self.stdout.write(f"No TaskRunRecords created before {archive_before}.")
+            return
+        task_run_records = task_run_records.filter(pk__lte=max_pk).order_by("pk")
+
+        # Written to a temporary file first so that an interrupted run never leaves a partial archive behind.
+        partial_output = f"{output}.partial"
+        self.archived = 0
+        rows = self._count(iter_serialized_task_run_records(task_run_records, chunk_size=options["chunk_size"]))
+        with open_text(partial_output, "w", compressed=output.endswith(".gz")) as f:
+            f.writelines(format_rows(rows, export_format))
+        os.replace(partial_output, output)
+        self.stdout.write(f"Archived {self.archived} TaskRunRecords created before {archive_before} to {output}.")
+
+        if options["keep"]:
+            return
+        deleted = prune_task_run_records(archive_before, batch_size=options["chunk_size"], max_pk=max_pk)
+        if deleted is None:
+            self.stdout.write("TaskRunRecords are being pruned by another process. Archived records were not deleted.")
+        else:
+            self.stdout.write(f"Deleted {deleted} archived TaskRunRecords.")
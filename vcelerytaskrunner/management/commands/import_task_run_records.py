@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vcelerytaskrunner.services.record_export import (
+    DEFAULT_EXPORT_CHUNK_SIZE,
+    get_format_from_path,
+    import_task_run_records,
+    open_text,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports TaskRunRecords from a file written by archive_task_run_records, in batches and in constant memory. "
+        "Records whose task ID already exists are skipped, so an import can be rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="File to read, e.g. task_run_records-2024-01.jsonl.gz")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_EXPORT_CHUNK_SIZE,
+            help=f"Records inserted per query (default {DEFAULT_EXPORT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import_format = get_format_from_path(options["input"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with open_text(options["input"], "r") as f:
+            imported, skipped = import_task_run_records(read_rows(f, import_format), batch_size=options["batch_size"])
+        self.stdout.write(f"Imported {imported} TaskRunRecords ({skipped} already present).")
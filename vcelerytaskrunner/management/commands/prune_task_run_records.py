@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from vcelerytaskrunner.services.record_pruning import (
+    DEFAULT_PRUNE_BATCH_SIZE,
+    get_prune_cutoff,
+    prune_task_run_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes TaskRunRecords older than VCELERY_TASK_RUN_RECORD_LONGEVITY in batches. Safe to interrupt and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            help="ISO 8601 datetime to prune records created before (instead of VCELERY_TASK_RUN_RECORD_LONGEVITY).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_PRUNE_BATCH_SIZE,
+            help=f"Maximum number of records deleted per statement (default {DEFAULT_PRUNE_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches. The next run resumes where this one stopped.",
+        )
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            prune_before = parse_datetime(options["before"])
+            if not isinstance(prune_before, datetime):
+                raise CommandError(f"Invalid datetime: {options['before']}")
+        else:
+            prune_before = get_prune_cutoff()
+            if prune_before is None:
+                self.stdout.write("VCELERY_TASK_RUN_RECORD_LONGEVITY set to PERMANENT. Skipping pruning.")
+                return
+
+        deleted = prune_task_run_records(
+            prune_before, batch_size=options["batch_size"], max_batches=options["max_batches"]
+        )
+        if deleted is None:
+            self.stdout.write("TaskRunRecords are already being pruned by another process.")
+        else:
+            self.stdout.write(f"Pruned {deleted} TaskRunRecords created before {prune_before}.")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from vcelerytaskrunner.services.registry_refresh import request_registry_refresh
+from vcelerytaskrunner.services.task_runner import reload_task_registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Rediscovers Celery tasks and asks running processes to refresh their task registry. Processes only notice the "
+        "request if VCELERY_TASK_REGISTRY_REFRESH_INTERVAL is set and VCELERY_TASK_REGISTRY_REFRESH_CACHE is shared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--local-only",
+            action="store_true",
+            help="Only refresh (and report on) the registry of this process without notifying other processes.",
+        )
+
+    def handle(self, *args, **options):
+        task_registry = reload_task_registry()
+        self.stdout.write(
+            f"{len(task_registry.task_names)} task(s) found (catalog version {task_registry.catalog_version})."
+        )
+
+        if not options["local_only"]:
+            generation = request_registry_refresh()
+            self.stdout.write(f"Published refresh request {generation}.")
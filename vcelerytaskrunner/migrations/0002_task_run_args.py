@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-17 18:40
+
+from django.db import migrations, models
+import vcelerytaskrunner.services.run_args
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vcelerytaskrunner', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='run_args',
+            field=models.JSONField(blank=True, encoder=vcelerytaskrunner.services.run_args.RunArgsJSONEncoder, help_text='The args and kwargs the task was run with', null=True),
+        ),
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='run_args_compressed',
+            field=models.BinaryField(blank=True, help_text='Compressed JSON of the args and kwargs when too large to store in run_args', null=True),
+        ),
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='run_args_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the args and kwargs to find identical runs', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='run_args_truncated',
+            field=models.BooleanField(default=False, help_text='The args and kwargs were too large (VCELERY_TASK_RUN_RECORD_ARGS_MAX_SIZE) to store'),
+        ),
+        migrations.AlterField(
+            model_name='taskrunrecord',
+            name='run_with',
+            field=models.TextField(help_text='The params the task was run with (shortened for display)'),
+        ),
+    ]
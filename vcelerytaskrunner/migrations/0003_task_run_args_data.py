@@ -0,0 +1,125 @@
+import ast
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations
+
+
+# The encoding below is a frozen copy of vcelerytaskrunner.services.run_args as of this migration, so that later
+# changes to that module don't change what this migration does.
+
+BATCH_SIZE = 1000
+
+FIELDS = ["run_args", "run_args_compressed", "run_args_truncated", "run_args_hash", "run_with"]
+
+RUN_WITH_MAXLEN = 1000
+RUN_WITH_PREFIX = "args="
+RUN_WITH_KWARGS_SEPARATOR = ", kwargs="
+
+DEFAULT_RUN_ARGS_COMPRESS_THRESHOLD = 4096
+DEFAULT_RUN_ARGS_MAX_SIZE = 1024 * 1024
+
+
+class RunArgsJSONEncoder(DjangoJSONEncoder):
+
+    def default(self, o):
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        try:
+            return super().default(o)
+        except TypeError:
+            return repr(o)
+
+
+def parse_run_with(run_with):
+    if not run_with or not run_with.startswith(RUN_WITH_PREFIX):
+        return None
+
+    # The separator may also appear inside the args, so try each occurrence until both sides parse.
+    start = len(RUN_WITH_PREFIX)
+    position = run_with.find(RUN_WITH_KWARGS_SEPARATOR, start)
+    while position >= 0:
+        try:
+            args = ast.literal_eval(run_with[start:position])
+            kwargs = ast.literal_eval(run_with[position + len(RUN_WITH_KWARGS_SEPARATOR):])
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            pass
+        else:
+            if isinstance(args, (list, tuple)) and isinstance(kwargs, dict):
+                return list(args), kwargs
+        position = run_with.find(RUN_WITH_KWARGS_SEPARATOR, position + 1)
+    return None
+
+
+def encode_run_args(args, kwargs):
+    args_json = json.dumps(
+        {"args": list(args or []), "kwargs": dict(kwargs or {})},
+        cls=RunArgsJSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    args_bytes = args_json.encode("utf-8")
+    run_with = f"{RUN_WITH_PREFIX}{args}{RUN_WITH_KWARGS_SEPARATOR}{kwargs}"
+    encoded_run_args = {
+        "run_args": None,
+        "run_args_compressed": None,
+        "run_args_truncated": False,
+        "run_args_hash": hashlib.sha256(args_bytes).hexdigest(),
+        "run_with": run_with if len(run_with) <= RUN_WITH_MAXLEN else f"{run_with[:RUN_WITH_MAXLEN - 3]}...",
+    }
+
+    max_size = getattr(settings, "VCELERY_TASK_RUN_RECORD_ARGS_MAX_SIZE", DEFAULT_RUN_ARGS_MAX_SIZE)
+    compress_threshold = getattr(
+        settings, "VCELERY_TASK_RUN_RECORD_ARGS_COMPRESS_THRESHOLD", DEFAULT_RUN_ARGS_COMPRESS_THRESHOLD
+    )
+    if max_size is not None and len(args_bytes) > max_size:
+        encoded_run_args["run_args_truncated"] = True
+    elif compress_threshold is not None and len(args_bytes) > compress_threshold:
+        encoded_run_args["run_args_compressed"] = zlib.compress(args_bytes)
+    else:
+        encoded_run_args["run_args"] = json.loads(args_json)
+    return encoded_run_args
+
+
+def forwards(apps, schema_editor):
+    """
+    Fills the run_args* fields of existing TaskRunRecords from their run_with text, a batch of rows at a time (by
+    primary key) so that the table is never loaded in memory. Rows whose run_with cannot be parsed are left as they are.
+    """
+    TaskRunRecord = apps.get_model("vcelerytaskrunner", "TaskRunRecord")
+    task_run_records = TaskRunRecord.objects.using(schema_editor.connection.alias)
+
+    last_pk = None
+    while True:
+        batch_query = task_run_records.only("pk", "run_with").order_by("pk")
+        if last_pk is not None:
+            batch_query = batch_query.filter(pk__gt=last_pk)
+        batch = list(batch_query[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        updated = []
+        for task_run_record in batch:
+            parsed = parse_run_with(task_run_record.run_with)
+            if parsed is not None:
+                args, kwargs = parsed
+                for field, value in encode_run_args(args, kwargs).items():
+                    setattr(task_run_record, field, value)
+                updated.append(task_run_record)
+        if updated:
+            task_run_records.bulk_update(updated, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vcelerytaskrunner', '0002_task_run_args'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vcelerytaskrunner', '0003_task_run_args_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='runtime',
+            field=models.FloatField(blank=True, help_text='Seconds the task ran for', null=True),
+        ),
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskrunrecord',
+            name='status',
+            field=models.CharField(choices=[('FAILURE', 'FAILURE'), ('PENDING', 'PENDING'), ('RECEIVED', 'RECEIVED'), ('RETRY', 'RETRY'), ('REVOKED', 'REVOKED'), ('STARTED', 'STARTED'), ('SUCCESS', 'SUCCESS')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-17 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vcelerytaskrunner', '0004_task_run_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskrunrecord',
+            index=models.Index(fields=['task_name', '-created_at'], name='vcelery_trr_task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskrunrecord',
+            index=models.Index(fields=['run_by', '-created_at'], name='vcelery_trr_run_by_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskrunrecord',
+            index=models.Index(fields=['status', '-created_at'], name='vcelery_trr_status_created_idx'),
+        ),
+        # Dropped after the composite index that replaces it is in place
+        migrations.AlterField(
+            model_name='taskrunrecord',
+            name='task_name',
+            field=models.CharField(max_length=200),
+        ),
+    ]
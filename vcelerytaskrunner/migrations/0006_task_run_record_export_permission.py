@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 18:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vcelerytaskrunner', '0005_task_run_record_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='taskrunrecord',
+            options={'permissions': [('export_taskrunrecord', 'Can export task run records')]},
+        ),
+    ]
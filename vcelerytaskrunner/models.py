@@ -1,17 +1,52 @@
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 
+from celery import states
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import PermissionDenied
 from django.db import models
-from django.db.models import CharField, TextField, DateTimeField, ForeignKey
+from django.db.models import (
+    BinaryField, BooleanField, CharField, TextField, DateTimeField, FloatField, ForeignKey, JSONField,
+)
+
+from vcelerytaskrunner.services.metrics import METRIC_RECORD_WRITE, timed
+from vcelerytaskrunner.services.record_writer import get_task_run_record_writer
+from vcelerytaskrunner.services.run_args import RunArgsJSONEncoder, decode_run_args, encode_run_args, hash_run_args
 
 
 TASKNAME_MAXLEN = 200
+TASK_STATUS_CHOICES = [(state, state) for state in sorted(states.ALL_STATES)]
 
 
 class TaskRunRecordManager(models.Manager):
 
+    @staticmethod
+    def _get_run_by(user: Optional[AbstractUser]) -> Optional[AbstractUser]:
+        if user and user.is_anonymous:
+            if getattr(settings, "TASKRUN_ALLOW_ANONYMOUS_USER", False):
+                user = None
+            else:
+                raise PermissionDenied("Set TASKRUN_ALLOW_ANONYMOUS_USER to allow anonymous users.")
+        return user
+
+    def build_run_record(
+        self, task_name: str, task_id: str, args: List[Any], kwargs: Dict[str, Any], user: Optional[AbstractUser] = None
+    ) -> "TaskRunRecord":
+        """
+        Create (but not save) a record for a task run.
+
+        :param task_name: the name of the task that was run
+        :param task_id: the task ID
+        :param args: optional positional arguments passed to the task
+        :param kwargs: optional keyword arguments passed to the task
+        :param user: optional User who ran the task
+
+        :return: an unsaved instance of TaskRunRecord
+        """
+        return self.model(
+            task_name=task_name, task_id=task_id, run_by=self._get_run_by(user), **encode_run_args(args, kwargs)
+        )
+
     def record_run_task(
         self, task_name: str, task_id: str, args: List[Any], kwargs: Dict[str, Any], user: Optional[AbstractUser] = None
     ) -> "TaskRunRecord":
@@ -24,26 +59,86 @@ class TaskRunRecordManager(models.Manager):
         :param kwargs: optional keyword arguments passed to the task
         :param user: optional User who ran the task
 
-        :return: an instance of TaskRunRecord created
+        :return: an instance of TaskRunRecord created. With VCELERY_TASK_RUN_RECORD_WRITE_BEHIND enabled, the instance
+            is saved shortly after by a background thread (or right away if too many records are waiting to be saved).
         """
-        run_with = f"args={args}, kwargs={kwargs}"
-        if user and user.is_anonymous:
-            if getattr(settings, "TASKRUN_ALLOW_ANONYMOUS_USER", False):
-                user = None
-            else:
-                raise PermissionDenied("Set TASKRUN_ALLOW_ANONYMOUS_USER to allow anonymous users.")
-        return super().create(task_name=task_name, task_id=task_id, run_by=user, run_with=run_with)
+        task_run_record = self.build_run_record(task_name, task_id, args, kwargs, user=user)
+
+        task_run_record_writer = get_task_run_record_writer()
+        if task_run_record_writer is None or not task_run_record_writer.enqueue(task_run_record):
+            with timed(METRIC_RECORD_WRITE, {"mode": "single"}):
+                task_run_record.save(force_insert=True, using=self.db)
+        return task_run_record
+
+    def record_run_tasks(
+        self, task_runs: List[Tuple[str, str, List[Any], Dict[str, Any]]], user: Optional[AbstractUser] = None
+    ) -> List["TaskRunRecord"]:
+        """
+        Create and save records for several task runs with a single bulk INSERT.
+
+        :param task_runs: (task name, task ID, args, kwargs) of each task run
+        :param user: optional User who ran the tasks
+
+        :return: the instances of TaskRunRecord created
+        """
+        task_run_records = [
+            self.build_run_record(task_name, task_id, args, kwargs, user=user)
+            for task_name, task_id, args, kwargs in task_runs
+        ]
+        with timed(METRIC_RECORD_WRITE, {"mode": "bulk"}):
+            return self.bulk_create(task_run_records)
+
+    def filter_identical_runs(self, task_name: str, args: List[Any], kwargs: Dict[str, Any]) -> models.QuerySet:
+        """
+        :return: the records of the runs of a task with the same args and kwargs (matched by their run_args_hash)
+        """
+        return self.filter(run_args_hash=hash_run_args(args, kwargs), task_name=task_name)
 
 
 class TaskRunRecord(models.Model):
-    task_name = CharField(max_length=TASKNAME_MAXLEN, db_index=True)
+    task_name = CharField(max_length=TASKNAME_MAXLEN)
     task_id = CharField(max_length=100, db_index=True)
     run_by = ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, null=True, blank=True)
-    run_with = TextField(help_text="The params the task was run with")
+    run_with = TextField(help_text="The params the task was run with (shortened for display)")
+    run_args = JSONField(
+        null=True, blank=True, encoder=RunArgsJSONEncoder, help_text="The args and kwargs the task was run with"
+    )
+    run_args_compressed = BinaryField(
+        null=True, blank=True, help_text="Compressed JSON of the args and kwargs when too large to store in run_args"
+    )
+    run_args_truncated = BooleanField(
+        default=False, help_text="The args and kwargs were too large (VCELERY_TASK_RUN_RECORD_ARGS_MAX_SIZE) to store"
+    )
+    run_args_hash = CharField(
+        max_length=64, blank=True, db_index=True, help_text="SHA-256 of the args and kwargs to find identical runs"
+    )
 
     created_at = DateTimeField(auto_now_add=True, db_index=True)
 
+    status = CharField(max_length=20, choices=TASK_STATUS_CHOICES, default=states.PENDING)
+    started_at = DateTimeField(null=True, blank=True)
+    finished_at = DateTimeField(null=True, blank=True)
+    runtime = FloatField(null=True, blank=True, help_text="Seconds the task ran for")
+
     objects = TaskRunRecordManager()
 
+    class Meta:
+        permissions = [
+            ("export_taskrunrecord", "Can export task run records"),
+        ]
+        # For listing the latest runs of a task / by a user / in a state (e.g. the admin filters). The task_name index
+        # also serves lookups by task_name alone.
+        indexes = [
+            models.Index(fields=["task_name", "-created_at"], name="vcelery_trr_task_created_idx"),
+            models.Index(fields=["run_by", "-created_at"], name="vcelery_trr_run_by_created_idx"),
+            models.Index(fields=["status", "-created_at"], name="vcelery_trr_status_created_idx"),
+        ]
+
+    def get_run_args(self) -> Optional[Dict[str, Any]]:
+        """
+        :return: {"args": [...], "kwargs": {...}} the task was run with (None if they were not stored)
+        """
+        return decode_run_args(self.run_args, self.run_args_compressed)
+
     def __str__(self) -> str:
         return f"Task {self.task_name} (ID {self.task_id}) run by {self.run_by} at {self.created_at.isoformat()}"
@@ -0,0 +1,204 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Generic, List, Optional, TypeVar
+try:
+    from typing_extensions import TypedDict
+except:
+    from typing import TypedDict
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar("T")
+
+# Queued by stop() so that the background thread doesn't wait for the flush interval before exiting
+_WAKEUP = object()
+
+
+class BatcherStats(TypedDict):
+    """
+    Counters of a BackgroundBatcher since it was created
+    """
+    enqueued: int
+    rejected: int
+    flushed: int
+    failed: int
+    retried: int  # items handed back by the flush function to be flushed again
+    flushes: int
+    flush_seconds_total: float
+    flush_seconds_max: float
+    queue_size: int
+
+
+class BackgroundBatcher(Generic[T]):
+    """
+    Collects items in a bounded in-process queue and hands them to a flush function in batches from a background
+    thread. A batch is flushed when it reaches batch_size items or flush_interval seconds after its first item,
+    whichever comes first. If flushing a batch fails and a flush_one function is given, the items of the batch are
+    flushed one by one with it, so that only the offending items are lost.
+
+    The flush functions can return items to flush again later (e.g. updates of rows that don't exist yet). Those are
+    kept apart from the queue and flushed again with the next batch, or after flush_interval seconds if no item comes.
+    drain() doesn't wait for them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[T]], Any],
+        batch_size: int = 100,
+        flush_interval: float = 0.2,
+        max_queue_size: int = 10000,
+        flush_one: Optional[Callable[[T], Any]] = None,
+    ):
+        """
+        :param name: name of the background thread
+        :param flush: called (from the background thread) with each batch of items. It may return items to retry.
+        :param batch_size: the maximum number of items per batch
+        :param flush_interval: the maximum number of seconds an item waits in the queue before being flushed
+        :param max_queue_size: the maximum number of items waiting. put() refuses items beyond that.
+        :param flush_one: called (from the background thread) with each item of a batch whose flush failed. It may
+            return items to retry.
+        """
+        self.name = name
+        self.flush = flush
+        self.flush_one = flush_one
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue_size)  # type: queue.Queue
+        self._max_retries = max_queue_size
+        self._retries = []  # type: List[T]  # only used by the background thread
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = BatcherStats(
+            enqueued=0, rejected=0, flushed=0, failed=0, retried=0, flushes=0, flush_seconds_total=0.0,
+            flush_seconds_max=0.0, queue_size=0,
+        )
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, item: T) -> bool:
+        """
+        Queues an item to be flushed without blocking.
+
+        :return: False if the item could not be queued (the queue is full or the batcher is stopped)
+        """
+        accepted = False
+        if not self._stopped.is_set():
+            try:
+                self._queue.put_nowait(item)
+                accepted = True
+            except queue.Full:
+                pass
+
+        with self._stats_lock:
+            self._stats["enqueued" if accepted else "rejected"] += 1
+        return accepted
+
+    def drain(self):
+        """
+        Blocks until every item queued so far has been flushed.
+        """
+        self._queue.join()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Flushes the items still queued and stops the background thread.
+        """
+        self._stopped.set()
+        try:
+            self._queue.put_nowait(_WAKEUP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> BatcherStats:
+        with self._stats_lock:
+            stats = BatcherStats(**self._stats)
+        stats["queue_size"] = self._queue.qsize()
+        return stats
+
+    def _get(self, timeout: float) -> Any:
+        item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+        if item is _WAKEUP:
+            self._queue.task_done()
+            raise queue.Empty()
+        return item
+
+    def _take_batch(self) -> List[T]:
+        batch = []
+        try:
+            batch.append(self._get(self.flush_interval))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._get(deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush_batch(self, batch: List[T], retries: List[T]):
+        """
+        :param batch: items taken from the queue
+        :param retries: items handed back by earlier flushes, flushed along with the batch
+        """
+        started_at = time.perf_counter()
+        items = retries + batch
+        to_retry = []  # type: List[T]
+        try:
+            to_retry = list(self.flush(items) or [])
+            failed = 0
+        except Exception as e:
+            if self.flush_one is None:
+                logger.exception("%s: cannot flush %d item(s): %s", self.name, len(items), e)
+                failed = len(items)
+            else:
+                logger.warning("%s: cannot flush %d item(s) (%s), flushing them one by one", self.name, len(items), e)
+                failed = self._flush_one_by_one(items, to_retry)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+        dropped = max(0, len(to_retry) - self._max_retries)
+        if dropped:
+            logger.warning("%s: too many items to retry, dropping %d of them", self.name, dropped)
+        self._retries = to_retry[dropped:]
+
+        elapsed = time.perf_counter() - started_at
+        with self._stats_lock:
+            self._stats["flushed"] += len(items) - failed - len(to_retry)
+            self._stats["failed"] += failed + dropped
+            self._stats["retried"] += len(to_retry)
+            self._stats["flushes"] += 1
+            self._stats["flush_seconds_total"] += elapsed
+            self._stats["flush_seconds_max"] = max(self._stats["flush_seconds_max"], elapsed)
+
+    def _flush_one_by_one(self, items: List[T], to_retry: List[T]) -> int:
+        """
+        :param to_retry: extended with the items that flush_one hands back
+
+        :return: the number of items that could not be flushed
+        """
+        failed = 0
+        for item in items:
+            try:
+                to_retry.extend(self.flush_one(item) or [])
+            except Exception as e:
+                logger.exception("%s: cannot flush %r: %s", self.name, item, e)
+                failed += 1
+        return failed
+
+    def _run(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch or self._retries:
+                retries, self._retries = self._retries, []
+                self._flush_batch(batch, retries)
+        if self._retries:
+            logger.warning("%s: stopped with %d item(s) left to retry", self.name, len(self._retries))
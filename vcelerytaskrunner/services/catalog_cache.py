@@ -0,0 +1,130 @@
+import functools
+import hashlib
+import logging
+from importlib.metadata import PackageNotFoundError, version as get_distribution_version
+from typing import Dict, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import caches
+try:
+    from typing_extensions import TypedDict
+except:
+    from typing import TypedDict
+
+logger = logging.getLogger(__name__)
+
+
+CATALOG_CACHE_KEY_PREFIX = "vcelerytaskrunner:task_catalog:"
+
+DISTRIBUTION_NAME = "vcelery-task-runner"
+
+DEFAULT_CATALOG_CACHE_TIMEOUT = 24 * 3600
+
+
+class CachedCatalog(TypedDict):
+    """
+    The serializable parts of a TaskCatalog, as published to the catalog cache
+    """
+    version: str
+    task_names: List[str]
+    runnable_flags: List[bool]
+    # The task parameters (TaskParameter.to_dict(), including JSON schemas) pre-encoded as JSON arrays, by task name
+    task_parameters_json: Dict[str, str]
+
+
+def _get_cache():
+    cache_name = getattr(settings, "VCELERY_TASKRUN_CATALOG_CACHE", None)
+    return caches[cache_name] if cache_name else None
+
+
+def is_catalog_cache_enabled() -> bool:
+    """
+    :return: True if VCELERY_TASKRUN_CATALOG_CACHE names the Django cache to share task catalogs through
+    """
+    return bool(getattr(settings, "VCELERY_TASKRUN_CATALOG_CACHE", None))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_package_version() -> str:
+    try:
+        return get_distribution_version(DISTRIBUTION_NAME)
+    except PackageNotFoundError:
+        return ""
+
+
+def get_code_version() -> str:
+    """
+    :return: the version of the code catalogs are built from: VCELERY_TASKRUN_CATALOG_CACHE_VERSION (e.g. the release
+        or commit deployed) along with the version of this package
+    """
+    return f"{_get_package_version()}|{getattr(settings, 'VCELERY_TASKRUN_CATALOG_CACHE_VERSION', '') or ''}"
+
+
+def _get_pointer_key(celery_app_name: str, runnable_tasks: Optional[Set[str]]) -> str:
+    # Processes configured with different runnable tasks (or Celery apps), or running different code, must not load
+    # each other's catalogs.
+    runnable_key = "*" if runnable_tasks is None else "|".join(sorted(runnable_tasks))
+    digest = hashlib.sha1(f"{celery_app_name}|{get_code_version()}|{runnable_key}".encode("utf-8")).hexdigest()
+    return f"{CATALOG_CACHE_KEY_PREFIX}{digest}:version"
+
+
+def _get_catalog_key(pointer_key: str, version: str) -> str:
+    return f"{pointer_key[:-len('version')]}{version}"
+
+
+def publish_catalog(celery_app_name: str, runnable_tasks: Optional[Set[str]], cached_catalog: CachedCatalog):
+    """
+    Stores a catalog under its version in the cache named by VCELERY_TASKRUN_CATALOG_CACHE, then points the version
+    key at it. Readers following the version key therefore never see a partially published catalog. Does nothing if
+    the setting is not configured.
+
+    :param celery_app_name: the name (main) of the Celery app the tasks belong to
+    :param runnable_tasks: the names of the runnable tasks the catalog was built with (None means all tasks)
+    :param cached_catalog: the catalog to publish
+    """
+    cache = _get_cache()
+    if cache is None:
+        return
+
+    timeout = getattr(settings, "VCELERY_TASKRUN_CATALOG_CACHE_TIMEOUT", DEFAULT_CATALOG_CACHE_TIMEOUT)
+    pointer_key = _get_pointer_key(celery_app_name, runnable_tasks)
+    try:
+        cache.set(_get_catalog_key(pointer_key, cached_catalog["version"]), cached_catalog, timeout=timeout)
+        cache.set(pointer_key, cached_catalog["version"], timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Cannot publish task catalog {cached_catalog['version']} to the catalog cache: {e}")
+        return
+    logger.info(f"Published task catalog {cached_catalog['version']} ({len(cached_catalog['task_names'])} task(s))")
+
+
+def load_catalog(celery_app_name: str, runnable_tasks: Optional[Set[str]]) -> Optional[CachedCatalog]:
+    """
+    Loads the catalog last published by publish_catalog() for the same Celery app, runnable tasks and code version
+    (see get_code_version()).
+
+    :param celery_app_name: the name (main) of the Celery app
+    :param runnable_tasks: the names of the runnable tasks configured (None means all tasks)
+
+    :return: the catalog (None if the cache is not configured, or holds no catalog for this configuration)
+    """
+    cache = _get_cache()
+    if cache is None:
+        return None
+
+    pointer_key = _get_pointer_key(celery_app_name, runnable_tasks)
+    try:
+        version = cache.get(pointer_key)
+        cached_catalog = cache.get(_get_catalog_key(pointer_key, version)) if version else None
+    except Exception as e:
+        logger.warning(f"Cannot load the task catalog from the catalog cache: {e}")
+        return None
+    if cached_catalog is None:
+        return None
+
+    runnable_flags = [
+        runnable_tasks is None or task_name in runnable_tasks for task_name in cached_catalog["task_names"]
+    ]
+    if cached_catalog["runnable_flags"] != runnable_flags:
+        logger.warning(f"Ignoring cached task catalog {version}: its runnable tasks don't match the settings")
+        return None
+    return cached_catalog
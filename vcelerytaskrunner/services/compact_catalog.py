@@ -0,0 +1,91 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Iterable, Iterator, List, Union
+
+
+class CompactStrings(Sequence):
+    """
+    Immutable sequence of strings stored as one str, with the offsets of the strings in an array. Compared to a list of
+    str, it is three objects however many strings there are, so processes forked after it is built share its memory
+    pages instead of copying them as they update reference counts.
+    """
+
+    def __init__(self, values: Iterable[str]):
+        values = list(values)
+        self.text = "".join(values)
+        self.offsets = array("q", [0])
+        offset = 0
+        for value in values:
+            offset += len(value)
+            self.offsets.append(offset)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CompactStrings index out of range")
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self.text
+        offsets = self.offsets
+        for index in range(len(offsets) - 1):
+            yield text[offsets[index]:offsets[index + 1]]
+
+
+class Bitset(Sequence):
+    """
+    Immutable sequence of booleans stored one bit each in a bytes object.
+    """
+
+    def __init__(self, flags: Iterable[bool]):
+        flags = list(flags)
+        self.size = len(flags)
+        bits = bytearray((self.size + 7) // 8)
+        for index, flag in enumerate(flags):
+            if flag:
+                bits[index >> 3] |= 1 << (index & 7)
+        self.bits = bytes(bits)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> bool:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("Bitset index out of range")
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+
+class CompactJsonMap(Mapping):
+    """
+    Read-only mapping of sorted keys to pre-encoded JSON documents, both stored as CompactStrings. Keys are looked up by
+    binary search.
+    """
+
+    def __init__(self, keys: CompactStrings, values: CompactStrings):
+        """
+        :param keys: the keys, sorted
+        :param values: the value of each key, in the same order
+        """
+        self.sorted_keys = keys
+        self.json_values = values
+
+    def __getitem__(self, key: str) -> str:
+        position = bisect_left(self.sorted_keys, key)
+        if position < len(self.sorted_keys) and self.sorted_keys[position] == key:
+            return self.json_values[position]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sorted_keys)
+
+    def __len__(self) -> int:
+        return len(self.sorted_keys)
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser
+from django.core.cache import caches
+
+from vcelerytaskrunner.services.run_args import hash_run_args
+
+logger = logging.getLogger(__name__)
+
+
+RATE_LIMIT_CACHE_KEY_PREFIX = "vcelery:rate_limit:"
+IDEMPOTENCY_CACHE_KEY_PREFIX = "vcelery:idempotency:"
+
+RATE_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when launching a task would exceed VCELERY_TASKRUN_RATE_LIMIT_PER_USER or VCELERY_TASKRUN_RATE_LIMIT_PER_TASK
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _get_cache():
+    return caches[getattr(settings, "VCELERY_TASKRUN_LAUNCH_GUARD_CACHE", "default")]
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Parses a rate such as "10/m" (10 per minute). The period is one of s, m, h or d, only its first letter counts
+    (e.g. "100/hour").
+
+    :return: (number of launches, period in seconds)
+    """
+    try:
+        num, period = rate.split("/")
+        return int(num), RATE_PERIODS[period.strip()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid rate {rate!r}. Expected e.g. '10/m'.")
+
+
+def _get_rate_limits(task_name: str, user: Optional[AbstractUser]) -> List[Tuple[str, str, str]]:
+    """
+    :return: the (cache key, rate, description) of each bucket a launch of the task by the user draws from
+    """
+    rate_limits = []
+    per_user_rate = getattr(settings, "VCELERY_TASKRUN_RATE_LIMIT_PER_USER", None)
+    if per_user_rate:
+        user_key = str(user.pk) if user is not None else "anonymous"
+        rate_limits.append((f"{RATE_LIMIT_CACHE_KEY_PREFIX}user:{user_key}", per_user_rate, f"user {user}"))
+
+    per_task_rates = getattr(settings, "VCELERY_TASKRUN_RATE_LIMIT_PER_TASK", None) or {}
+    per_task_rate = per_task_rates.get(task_name, per_task_rates.get("*"))
+    if per_task_rate:
+        task_key = hashlib.sha1(task_name.encode("utf-8")).hexdigest()
+        rate_limits.append((f"{RATE_LIMIT_CACHE_KEY_PREFIX}task:{task_key}", per_task_rate, f"task {task_name}"))
+    return rate_limits
+
+
+def _get_tokens(bucket: Optional[Tuple[float, float]], capacity: int, refill_per_second: float, now: float) -> float:
+    """
+    :return: the tokens in a bucket (as stored in the cache: tokens, time of the last update) refilled up to now
+    """
+    tokens, updated_at = bucket or (capacity, now)
+    return min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+
+def check_rate_limits(task_name: str, user: Optional[AbstractUser]):
+    """
+    Takes a token from the token buckets of the user and of the task, kept in the Django cache named by
+    VCELERY_TASKRUN_LAUNCH_GUARD_CACHE. A bucket holds up to N tokens for a rate of "N/period" and refills
+    continuously at that rate, so short bursts are allowed. No token is taken unless all buckets have one.
+
+    Concurrent launches may read the same bucket state, so a limit can be exceeded slightly under contention.
+
+    :raises RateLimitExceeded: if a bucket is empty
+    """
+    rate_limits = _get_rate_limits(task_name, user)
+    if not rate_limits:
+        return
+
+    cache = _get_cache()
+    buckets = cache.get_many([key for key, _, _ in rate_limits])
+    now = time.time()
+    updated_buckets = {}
+    timeout = 0
+    for key, rate, description in rate_limits:
+        capacity, period = parse_rate(rate)
+        refill_per_second = capacity / period
+        tokens = _get_tokens(buckets.get(key), capacity, refill_per_second, now)
+        if tokens < 1:
+            retry_after = (1 - tokens) / refill_per_second
+            raise RateLimitExceeded(
+                f"Rate limit of {rate} for {description} exceeded. Retry in {retry_after:.0f}s.", retry_after
+            )
+        updated_buckets[key] = (tokens - 1, now)
+        timeout = max(timeout, period)
+
+    # A bucket left alone for a full period is full again, so it can expire from the cache then.
+    cache.set_many(updated_buckets, timeout=timeout)
+
+
+def refund_rate_limits(task_name: str, user: Optional[AbstractUser]):
+    """
+    Gives back the tokens check_rate_limits() took for a launch of the task by the user that failed, so that the
+    failed launch doesn't count against the limits.
+    """
+    rate_limits = _get_rate_limits(task_name, user)
+    if not rate_limits:
+        return
+
+    cache = _get_cache()
+    buckets = cache.get_many([key for key, _, _ in rate_limits])
+    now = time.time()
+    updated_buckets = {}
+    timeout = 0
+    for key, rate, _ in rate_limits:
+        if key not in buckets:
+            # Expired, i.e. full again
+            continue
+        capacity, period = parse_rate(rate)
+        tokens = _get_tokens(buckets[key], capacity, capacity / period, now)
+        updated_buckets[key] = (min(capacity, tokens + 1), now)
+        timeout = max(timeout, period)
+
+    if updated_buckets:
+        cache.set_many(updated_buckets, timeout=timeout)
+
+
+def get_idempotency_window() -> int:
+    """
+    :return: the seconds (VCELERY_TASKRUN_IDEMPOTENCY_WINDOW) during which launching the same task with the same
+        arguments again returns the task ID of the first launch (0 if disabled)
+    """
+    return getattr(settings, "VCELERY_TASKRUN_IDEMPOTENCY_WINDOW", 0) or 0
+
+
+def get_idempotency_key(
+    task_name: str, args: List[Any], kwargs: Dict[str, Any], user: Optional[AbstractUser]
+) -> str:
+    """
+    :return: the cache key identifying launches of a task with the same arguments by the same user
+    """
+    user_key = str(user.pk) if user is not None else "anonymous"
+    digest = hashlib.sha256(f"{task_name}|{user_key}|{hash_run_args(args, kwargs)}".encode("utf-8")).hexdigest()
+    return f"{IDEMPOTENCY_CACHE_KEY_PREFIX}{digest}"
+
+
+def claim_task_run(idempotency_key: str, task_id: str, window: int) -> Optional[str]:
+    """
+    Atomically claims a launch for the idempotency window.
+
+    :param idempotency_key: see get_idempotency_key()
+    :param task_id: the ID the task will be launched with if the claim succeeds
+    :param window: the idempotency window in seconds
+
+    :return: None if the claim succeeded (the task should be launched with task_id), otherwise the task ID of the
+        launch made within the window
+    """
+    cache = _get_cache()
+    if cache.add(idempotency_key, task_id, timeout=window):
+        return None
+    existing_task_id = cache.get(idempotency_key)
+    if existing_task_id is None:
+        # Expired in between: claim again
+        cache.set(idempotency_key, task_id, timeout=window)
+    return existing_task_id
+
+
+def release_task_run(idempotency_key: str, task_id: str):
+    """
+    Releases a claim made by claim_task_run() (e.g. because the launch failed) so that the task can be launched again.
+    """
+    cache = _get_cache()
+    if cache.get(idempotency_key) == task_id:
+        cache.delete(idempotency_key)
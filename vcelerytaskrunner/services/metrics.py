@@ -0,0 +1,229 @@
+import bisect
+import logging
+import threading
+import time
+from typing import ContextManager, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# Names of the timings (histograms, in seconds) recorded by the task runner
+METRIC_REGISTRY_REFRESH = "vcelery_registry_refresh_seconds"
+METRIC_TASK_FILTER = "vcelery_task_filter_seconds"
+METRIC_TASK_PARAMETERS = "vcelery_task_parameters_introspection_seconds"
+METRIC_JSON_ENCODE = "vcelery_json_encode_seconds"
+METRIC_TASK_PUBLISH = "vcelery_task_publish_seconds"
+METRIC_RECORD_WRITE = "vcelery_record_write_seconds"
+METRIC_SIGNAL_DISPATCH = "vcelery_signal_dispatch_seconds"
+
+METRIC_HELP = {
+    METRIC_REGISTRY_REFRESH: "Time to rediscover the tasks and rebuild the task catalog",
+    METRIC_TASK_FILTER: "Time to filter and paginate the task list",
+    METRIC_TASK_PARAMETERS: "Time to extract the parameters of a task from its signature (cache misses only)",
+    METRIC_JSON_ENCODE: "Time to encode task parameters or task run arguments as JSON",
+    METRIC_TASK_PUBLISH: "Time to publish tasks to the broker (apply_async)",
+    METRIC_RECORD_WRITE: "Time to save TaskRunRecords",
+    METRIC_SIGNAL_DISPATCH: "Time to send TaskRunSignal / TaskRunBatchSignal to their receivers",
+}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """
+    Interface of the metrics sinks the task runner reports its timings to. Set VCELERY_TASKRUN_METRICS to the dotted
+    path of a subclass (or of an instance) to plug in a metrics system, e.g. to forward to StatsD.
+
+    Implementations must be thread-safe. Instrumented code skips timing altogether when enabled is False.
+    """
+    enabled = True
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+        """
+        Records the duration of an operation.
+
+        :param name: the name of the timing (one of the METRIC_* names)
+        :param seconds: how long the operation took
+        :param labels: optional labels qualifying the operation (e.g. {"mode": "bulk"})
+        """
+        raise NotImplementedError()
+
+
+class NullMetrics(Metrics):
+    """
+    Discards everything. The default.
+    """
+    enabled = False
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+        pass
+
+
+class _Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+
+class InProcessMetrics(Metrics):
+    """
+    Keeps histograms in memory, per process, to be scraped in the Prometheus text format from MetricsAPIView. Each
+    process (e.g. each gunicorn worker) reports its own numbers.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}  # type: Dict[str, Dict[Labels, _Histogram]]
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+        label_key = tuple(sorted(labels.items())) if labels else ()
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            histogram = histograms.get(label_key)
+            if histogram is None:
+                histogram = histograms[label_key] = _Histogram(self.buckets)
+            if bucket < len(self.buckets):
+                histogram.bucket_counts[bucket] += 1
+            histogram.count += 1
+            histogram.sum += seconds
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def render_prometheus(self) -> str:
+        """
+        :return: the histograms in the Prometheus text exposition format (version 0.0.4)
+        """
+        with self._lock:
+            snapshot = {
+                name: [
+                    (label_key, list(histogram.bucket_counts), histogram.count, histogram.sum)
+                    for label_key, histogram in sorted(histograms.items())
+                ]
+                for name, histograms in sorted(self._histograms.items())
+            }
+
+        lines = []  # type: List[str]
+        for name, histograms in snapshot.items():
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for label_key, bucket_counts, count, total in histograms:
+                cumulative = 0
+                for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    le = _format_labels(label_key + (("le", _format_value(upper_bound)),))
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(label_key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(label_key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(label_key)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def _format_labels(label_key: Labels) -> str:
+    if not label_key:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in label_key) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_metrics = None  # type: Optional[Metrics]
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """
+    Returns the process-wide Metrics configured by VCELERY_TASKRUN_METRICS: the dotted path of a Metrics subclass or
+    instance, e.g. "vcelerytaskrunner.services.metrics.InProcessMetrics". NullMetrics if not set.
+    """
+    global _metrics
+
+    metrics = _metrics
+    if metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = _create_metrics()
+            metrics = _metrics
+    return metrics
+
+
+def _create_metrics() -> Metrics:
+    metrics_path = getattr(settings, "VCELERY_TASKRUN_METRICS", None)
+    if not metrics_path:
+        return NullMetrics()
+
+    metrics = import_string(metrics_path)
+    if isinstance(metrics, type):
+        metrics = metrics()
+    logger.info(f"Reporting task runner metrics to {metrics}")
+    return metrics
+
+
+@receiver(setting_changed)
+def _reset_metrics(sender, setting: str, **kwargs):
+    global _metrics
+
+    if setting == "VCELERY_TASKRUN_METRICS":
+        _metrics = None
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started_at")
+
+    def __init__(self, metrics: Metrics, name: str, labels: Optional[Dict[str, str]]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> bool:
+        self.metrics.observe(self.name, time.perf_counter() - self.started_at, self.labels)
+        return False
+
+
+class _NullTimer:
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(name: str, labels: Optional[Dict[str, str]] = None) -> ContextManager[None]:
+    """
+    Context manager timing the enclosed block and reporting it to get_metrics() (even if it raises). When metrics are
+    disabled, a shared no-op context manager is returned, so the overhead is a flag check.
+
+    :param name: the name of the timing (one of the METRIC_* names)
+    :param labels: optional labels qualifying the operation
+    """
+    metrics = _metrics or get_metrics()
+    if not metrics.enabled:
+        return _NULL_TIMER
+    return _Timer(metrics, name, labels)
@@ -0,0 +1,288 @@
+import cProfile
+import logging
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.urls import Resolver404, resolve
+try:
+    from typing_extensions import TypedDict
+except:
+    from typing import TypedDict
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILING_SAMPLE_RATE = 0.01
+DEFAULT_PROFILING_TOP_N = 25
+DEFAULT_PROFILING_RING_SIZE = 20
+
+PROFILED_VIEWS_MODULE = "vcelerytaskrunner."
+
+# (file name, line number, function name), as used by pstats
+FunctionKey = Tuple[str, int, str]
+
+
+class ProfilingConfig(TypedDict):
+    sample_rate: float
+    top_n: int
+    ring_size: int
+
+
+class FunctionStats(TypedDict):
+    """
+    Time spent in one function during profiled requests
+    """
+    function: str
+    calls: int
+    total_time: float  # in the function itself (seconds)
+    cumulative_time: float  # in the function and the functions it called (seconds)
+
+
+class ProfileSample(TypedDict):
+    """
+    One profiled request
+    """
+    view: str
+    path: str
+    profiled_at: str
+    duration: float
+    functions: List[FunctionStats]
+
+
+class ViewProfile(TypedDict):
+    """
+    Profiles of one view: the hottest functions over all the requests profiled and the latest samples
+    """
+    view: str
+    requests: int
+    total_duration: float
+    functions: List[FunctionStats]
+    samples: List[ProfileSample]
+
+
+def get_profiling_config() -> Optional[ProfilingConfig]:
+    """
+    Reads the VCELERY_TASKRUN_PROFILING setting, e.g.:
+
+        VCELERY_TASKRUN_PROFILING = {
+            "SAMPLE_RATE": 0.01,  # fraction of the requests to the runner views that are profiled
+            "TOP_N": 25,  # functions kept per profile, by time spent in the function itself
+            "RING_SIZE": 20,  # latest profiled requests kept per view
+        }
+
+    :return: the configuration (None if profiling is disabled)
+    """
+    config = getattr(settings, "VCELERY_TASKRUN_PROFILING", None)
+    if not config:
+        return None
+
+    config = config if isinstance(config, dict) else {}
+    return ProfilingConfig(
+        sample_rate=config.get("SAMPLE_RATE", DEFAULT_PROFILING_SAMPLE_RATE),
+        top_n=config.get("TOP_N", DEFAULT_PROFILING_TOP_N),
+        ring_size=config.get("RING_SIZE", DEFAULT_PROFILING_RING_SIZE),
+    )
+
+
+def _format_function(function_key: FunctionKey) -> str:
+    file_name, line_number, function_name = function_key
+    if file_name == "~":
+        # Built-in functions, e.g. "<method 'join' of 'str' objects>"
+        return function_name
+    return f"{file_name}:{line_number}({function_name})"
+
+
+def _top_functions(stats: Dict[FunctionKey, Tuple[int, float, float]], top_n: int) -> List[FunctionStats]:
+    top = sorted(stats.items(), key=lambda item: item[1][1], reverse=True)[:top_n]
+    return [
+        FunctionStats(
+            function=_format_function(function_key),
+            calls=calls,
+            total_time=round(total_time, 6),
+            cumulative_time=round(cumulative_time, 6),
+        )
+        for function_key, (calls, total_time, cumulative_time) in top
+    ]
+
+
+class _ViewProfiles:
+
+    def __init__(self, ring_size: int):
+        self.requests = 0
+        self.total_duration = 0.0
+        # Aggregated over all the requests profiled, trimmed to the hottest functions after each request
+        self.stats = {}  # type: Dict[FunctionKey, Tuple[int, float, float]]
+        self.samples = deque(maxlen=ring_size)  # type: Deque[ProfileSample]
+
+
+class ProfileStore:
+    """
+    Profiles of the runner views, kept in memory by the process serving them. Memory use is bounded: per view, only
+    the top_n hottest functions are aggregated and the ring_size latest samples kept.
+    """
+
+    def __init__(self):
+        self._views = {}  # type: Dict[str, _ViewProfiles]
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        view_name: str,
+        path: str,
+        duration: float,
+        profile_stats: Dict[FunctionKey, Tuple[int, float, float]],
+        config: ProfilingConfig,
+    ):
+        """
+        Adds the stats of a profiled request.
+
+        :param view_name: the name of the view
+        :param path: the path of the request
+        :param duration: how long the request took (seconds)
+        :param profile_stats: (calls, total time, cumulative time) by function
+        :param config: the profiling configuration
+        """
+        top_n = config["top_n"]
+        sample = ProfileSample(
+            view=view_name,
+            path=path,
+            profiled_at=datetime.now(timezone.utc).isoformat(),
+            duration=round(duration, 6),
+            functions=_top_functions(profile_stats, top_n),
+        )
+        with self._lock:
+            view_profiles = self._views.get(view_name)
+            if view_profiles is None or view_profiles.samples.maxlen != config["ring_size"]:
+                view_profiles = self._views[view_name] = _ViewProfiles(config["ring_size"])
+            view_profiles.requests += 1
+            view_profiles.total_duration += duration
+            view_profiles.samples.append(sample)
+
+            aggregated = dict(view_profiles.stats)
+            for function_key, (calls, total_time, cumulative_time) in profile_stats.items():
+                previous_calls, previous_total_time, previous_cumulative_time = aggregated.get(function_key, (0, 0, 0))
+                aggregated[function_key] = (
+                    previous_calls + calls,
+                    previous_total_time + total_time,
+                    previous_cumulative_time + cumulative_time,
+                )
+            # Keep a margin over top_n so that functions just below the cut can still climb into it
+            hottest = sorted(aggregated.items(), key=lambda item: item[1][1], reverse=True)[:top_n * 4]
+            view_profiles.stats = dict(hottest)
+
+    def get_profiles(self, top_n: Optional[int] = None) -> List[ViewProfile]:
+        """
+        :param top_n: the number of functions to report per view (defaults to TOP_N of VCELERY_TASKRUN_PROFILING)
+
+        :return: the profiles of each view, the slowest views (by total time profiled) first
+        """
+        if top_n is None:
+            config = get_profiling_config()
+            top_n = config["top_n"] if config else DEFAULT_PROFILING_TOP_N
+        with self._lock:
+            view_profiles = [
+                ViewProfile(
+                    view=view_name,
+                    requests=profiles.requests,
+                    total_duration=round(profiles.total_duration, 6),
+                    functions=_top_functions(profiles.stats, top_n),
+                    samples=list(reversed(profiles.samples)),
+                )
+                for view_name, profiles in self._views.items()
+            ]
+        return sorted(view_profiles, key=lambda view_profile: view_profile["total_duration"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._views = {}
+
+
+PROFILE_STORE = ProfileStore()
+"""
+The profiles of the runner views served by this process
+"""
+
+# cProfile can't have several profilers active at once on Python 3.12+ (and concurrent ones would also slow requests
+# down more), so at most one request is profiled at a time. Requests sampled while another one is profiled are not.
+_profiler_lock = threading.Lock()
+
+
+def _get_runner_view_name(request: HttpRequest) -> Optional[str]:
+    try:
+        resolver_match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    func = resolver_match.func
+    view_class = getattr(func, "view_class", None) or getattr(func, "cls", None)
+    view = view_class or func
+    module = getattr(view, "__module__", "") or ""
+    if not module.startswith(PROFILED_VIEWS_MODULE):
+        return None
+    return f"{module}.{getattr(view, '__qualname__', getattr(view, '__name__', repr(view)))}"
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a sample of the requests to the vcelerytaskrunner views with cProfile when VCELERY_TASKRUN_PROFILING is
+    set (see get_profiling_config()), and adds the stats to PROFILE_STORE. Requests to other views, and the requests not
+    sampled, only pay for a setting lookup and a random number.
+
+    Add it to MIDDLEWARE after AuthenticationMiddleware:
+
+        "vcelerytaskrunner.services.profiling.ProfilingMiddleware",
+
+    Requests to async views pass through unprofiled: cProfile would also count the other requests running on the
+    event loop meanwhile.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if self.is_async:
+            return self.get_response(request)
+
+        config = get_profiling_config()
+        if not config or random.random() >= config["sample_rate"]:
+            return self.get_response(request)
+
+        view_name = _get_runner_view_name(request)
+        if view_name is None or not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            return self._profile(request, view_name, config)
+        finally:
+            _profiler_lock.release()
+
+    def _profile(self, request: HttpRequest, view_name: str, config: ProfilingConfig) -> HttpResponse:
+        profiler = cProfile.Profile()
+        started_at = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - started_at
+            try:
+                profile_stats = {
+                    function_key: (calls, total_time, cumulative_time)
+                    for function_key, (_, calls, total_time, cumulative_time, _) in pstats.Stats(profiler).stats.items()
+                }
+                PROFILE_STORE.add(view_name, request.path, duration, profile_stats, config)
+            except Exception:
+                logger.exception(f"Cannot record the profile of a request to {view_name}")
+        return response
@@ -0,0 +1,237 @@
+import csv
+import gzip
+import json
+from datetime import datetime
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, QuerySet, Value, When
+from django.utils.dateparse import parse_datetime
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.run_args import RunArgsJSONEncoder, encode_run_args
+
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMATS = (FORMAT_JSONL, FORMAT_CSV)
+
+DEFAULT_EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FIELDS = [
+    "id",
+    "task_name",
+    "task_id",
+    "run_by",
+    "run_with",
+    "run_args",
+    "run_args_truncated",
+    "run_args_hash",
+    "status",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "runtime",
+]
+
+
+def serialize_task_run_record(task_run_record: TaskRunRecord) -> Dict[str, Any]:
+    """
+    :return: the EXPORT_FIELDS of a TaskRunRecord as JSON-compatible values. run_by is the username and run_args the
+        decoded {"args": [...], "kwargs": {...}}.
+    """
+    run_by = task_run_record.run_by
+    return {
+        "id": task_run_record.pk,
+        "task_name": task_run_record.task_name,
+        "task_id": task_run_record.task_id,
+        "run_by": run_by.get_username() if run_by else None,
+        "run_with": task_run_record.run_with,
+        "run_args": task_run_record.get_run_args(),
+        "run_args_truncated": task_run_record.run_args_truncated,
+        "run_args_hash": task_run_record.run_args_hash,
+        "status": task_run_record.status,
+        "created_at": task_run_record.created_at.isoformat() if task_run_record.created_at else None,
+        "started_at": task_run_record.started_at.isoformat() if task_run_record.started_at else None,
+        "finished_at": task_run_record.finished_at.isoformat() if task_run_record.finished_at else None,
+        "runtime": task_run_record.runtime,
+    }
+
+
+def iter_serialized_task_run_records(
+    queryset: QuerySet, chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the records of a queryset from the database chunk_size rows at a time (the queryset is never loaded as a
+    whole).
+
+    :return: the serialize_task_run_record() of each record
+    """
+    for task_run_record in queryset.select_related("run_by").iterator(chunk_size=chunk_size):
+        yield serialize_task_run_record(task_run_record)
+
+
+class _Echo:
+    """
+    File-like object whose write() returns what is written, to produce CSV lines one by one.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def format_rows(rows: Iterable[Dict[str, Any]], export_format: str) -> Iterator[str]:
+    """
+    Formats serialized records as JSON Lines or CSV (with a header line), one line at a time.
+
+    :param rows: serialized records (see serialize_task_run_record())
+    :param export_format: FORMAT_JSONL or FORMAT_CSV
+    """
+    if export_format == FORMAT_JSONL:
+        for row in rows:
+            yield json.dumps(row, cls=RunArgsJSONEncoder) + "\n"
+    elif export_format == FORMAT_CSV:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            values = dict(row, run_args=json.dumps(row["run_args"]) if row["run_args"] is not None else "")
+            yield writer.writerow(["" if values[field] is None else values[field] for field in EXPORT_FIELDS])
+    else:
+        raise ValueError(f"Unsupported format {export_format}. Expected one of {FORMATS}.")
+
+
+def _from_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    values = {field: (row.get(field) or None) for field in EXPORT_FIELDS}  # type: Dict[str, Any]
+    values["id"] = int(values["id"]) if values["id"] else None
+    values["run_with"] = values["run_with"] or ""
+    values["run_args"] = json.loads(values["run_args"]) if values["run_args"] else None
+    values["run_args_truncated"] = values["run_args_truncated"] == "True"
+    values["run_args_hash"] = values["run_args_hash"] or ""
+    values["runtime"] = float(values["runtime"]) if values["runtime"] else None
+    return values
+
+
+def read_rows(fileobj: IO[str], export_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reverse of format_rows(): reads serialized records from a text file one line at a time.
+    """
+    if export_format == FORMAT_JSONL:
+        for line in fileobj:
+            if line.strip():
+                yield json.loads(line)
+    elif export_format == FORMAT_CSV:
+        for row in csv.DictReader(fileobj):
+            yield _from_csv_row(row)
+    else:
+        raise ValueError(f"Unsupported format {export_format}. Expected one of {FORMATS}.")
+
+
+def deserialize_task_run_records(rows: List[Dict[str, Any]]) -> List[TaskRunRecord]:
+    """
+    Builds (unsaved) TaskRunRecords from serialized records. The users are looked up by username in one query, and
+    records run by users that don't exist (anymore) get no run_by. The original IDs are not kept.
+
+    :return: the unsaved TaskRunRecords in the same order
+    """
+    user_model = get_user_model()
+    usernames = {row["run_by"] for row in rows if row.get("run_by")}
+    users = {
+        user.get_username(): user
+        for user in user_model.objects.filter(**{f"{user_model.USERNAME_FIELD}__in": usernames})
+    } if usernames else {}
+
+    task_run_records = []
+    for row in rows:
+        fields = {
+            "run_with": row.get("run_with") or "",
+            "run_args_truncated": bool(row.get("run_args_truncated")),
+            "run_args_hash": row.get("run_args_hash") or "",
+        }
+        run_args = row.get("run_args")
+        if run_args is not None:
+            fields.update(encode_run_args(run_args.get("args") or [], run_args.get("kwargs") or {}))
+            # Keep the original text, which may show more than the JSON (e.g. object reprs)
+            fields["run_with"] = row.get("run_with") or fields["run_with"]
+
+        task_run_records.append(
+            TaskRunRecord(
+                task_name=row["task_name"],
+                task_id=row["task_id"],
+                run_by=users.get(row.get("run_by")),
+                status=row.get("status") or TaskRunRecord._meta.get_field("status").default,
+                started_at=_parse_datetime(row.get("started_at")),
+                finished_at=_parse_datetime(row.get("finished_at")),
+                runtime=row.get("runtime"),
+                **fields,
+            )
+        )
+    return task_run_records
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return parse_datetime(value) if value else None
+
+
+def _import_batch(rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    existing_task_ids = set(
+        TaskRunRecord.objects.filter(task_id__in=[row["task_id"] for row in rows]).values_list("task_id", flat=True)
+    )
+    new_rows = [row for row in rows if row["task_id"] not in existing_task_ids]
+    if new_rows:
+        with transaction.atomic():
+            TaskRunRecord.objects.bulk_create(deserialize_task_run_records(new_rows))
+            # created_at is set to "now" on insert (auto_now_add), so restore the original times with one UPDATE.
+            created_ats = [
+                When(task_id=row["task_id"], then=Value(_parse_datetime(row["created_at"])))
+                for row in new_rows if row.get("created_at")
+            ]
+            if created_ats:
+                TaskRunRecord.objects.filter(task_id__in=[row["task_id"] for row in new_rows]).update(
+                    created_at=Case(*created_ats, default=F("created_at"))
+                )
+    return len(new_rows), len(rows) - len(new_rows)
+
+
+def import_task_run_records(
+    rows: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_EXPORT_CHUNK_SIZE
+) -> Tuple[int, int]:
+    """
+    Saves serialized records (e.g. read_rows() of an archive) batch_size at a time, keeping their creation times.
+    Records whose task_id is already in the database are skipped, so an import can be rerun safely.
+
+    :return: the number of records imported and skipped
+    """
+    imported = skipped = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            batch_imported, batch_skipped = _import_batch(batch)
+            imported, skipped, batch = imported + batch_imported, skipped + batch_skipped, []
+    if batch:
+        batch_imported, batch_skipped = _import_batch(batch)
+        imported, skipped = imported + batch_imported, skipped + batch_skipped
+    return imported, skipped
+
+
+def get_format_from_path(path: str) -> str:
+    """
+    :return: FORMAT_JSONL or FORMAT_CSV according to the extension of a file name (e.g. records.jsonl.gz)
+    """
+    name = path[:-len(".gz")] if path.endswith(".gz") else path
+    for export_format in FORMATS:
+        if name.endswith(f".{export_format}"):
+            return export_format
+    raise ValueError(f"Cannot tell the format of {path}. Expected a .jsonl, .jsonl.gz, .csv or .csv.gz file.")
+
+
+def open_text(path: str, mode: str, compressed: Optional[bool] = None) -> IO[str]:
+    """
+    Opens a text file for reading ("r") or writing ("w").
+
+    :param compressed: whether the file is gzip-compressed (by default, if its name ends with .gz)
+    """
+    if compressed if compressed is not None else path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
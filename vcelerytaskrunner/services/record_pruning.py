@@ -0,0 +1,108 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.timezone import get_current_timezone
+
+from vcelerytaskrunner.apps import TASK_RUN_RECORD_LONGEVITY_PERMANENT
+from vcelerytaskrunner.models import TaskRunRecord
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PRUNE_BATCH_SIZE = 1000
+PRUNE_LOCK_CACHE_KEY = "vcelerytaskrunner:prune_task_run_records:lock"
+
+
+def get_task_run_record_longevity() -> Optional[timedelta]:
+    """
+    Reads the VCELERY_TASK_RUN_RECORD_LONGEVITY setting.
+
+    :return: how long to keep TaskRunRecords (None if they are to be kept permanently)
+    """
+    task_run_record_longevity = getattr(settings, "VCELERY_TASK_RUN_RECORD_LONGEVITY", None)
+
+    if task_run_record_longevity is None:
+        logger.warning("VCELERY_TASK_RUN_RECORD_LONGEVITY is not set or not a timedelta. Assuming 4 weeks")
+        task_run_record_longevity = timedelta(weeks=4)
+    elif task_run_record_longevity == TASK_RUN_RECORD_LONGEVITY_PERMANENT:
+        task_run_record_longevity = None
+    elif not isinstance(task_run_record_longevity, timedelta):
+        raise ValueError("VCELERY_TASK_RUN_RECORD_LONGEVITY must be a timedelta.")
+    return task_run_record_longevity
+
+
+def get_prune_cutoff() -> Optional[datetime]:
+    """
+    :return: the creation time before which TaskRunRecords should be pruned (None if they are kept permanently)
+    """
+    task_run_record_longevity = get_task_run_record_longevity()
+    if task_run_record_longevity is None:
+        return None
+
+    now = datetime.utcnow()
+    if settings.USE_TZ:
+        now = datetime.now(get_current_timezone())
+    if task_run_record_longevity.total_seconds() > 0:
+        return now - task_run_record_longevity
+    return now + task_run_record_longevity
+
+
+def prune_task_run_records(
+    prune_records_created_before: datetime,
+    batch_size: int = DEFAULT_PRUNE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    max_pk: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Deletes the TaskRunRecords created before a given time, oldest first, in batches of primary keys. Each batch is a
+    separate short DELETE, so an interrupted run leaves no partial work behind and simply resumes when run again.
+
+    Only one process prunes at a time: a lock is taken in the cache named by VCELERY_TASK_RUN_RECORD_PRUNE_CACHE
+    (which must be shared between processes for the lock to be effective) for up to
+    VCELERY_TASK_RUN_RECORD_PRUNE_LOCK_TIMEOUT seconds.
+
+    :param prune_records_created_before: records created before this time are deleted
+    :param batch_size: the maximum number of records deleted per DELETE statement
+    :param max_batches: optional maximum number of batches to delete in this run
+    :param max_pk: optional highest primary key to delete (e.g. the last record archived)
+
+    :return: the number of records deleted (None if another process is already pruning)
+    """
+    cache = caches[getattr(settings, "VCELERY_TASK_RUN_RECORD_PRUNE_CACHE", "default")]
+    lock_timeout = getattr(settings, "VCELERY_TASK_RUN_RECORD_PRUNE_LOCK_TIMEOUT", 3600)
+    lock_token = uuid.uuid4().hex
+    if not cache.add(PRUNE_LOCK_CACHE_KEY, lock_token, timeout=lock_timeout):
+        logger.info("TaskRunRecords are already being pruned by another process. Skipping.")
+        return None
+
+    deleted = 0
+    try:
+        batches = 0
+        last_pk = 0
+        task_run_records = TaskRunRecord.objects.filter(created_at__lt=prune_records_created_before)
+        if max_pk is not None:
+            task_run_records = task_run_records.filter(pk__lte=max_pk)
+        while max_batches is None or batches < max_batches:
+            pks = list(
+                task_run_records.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+
+            batch_deleted, _ = TaskRunRecord.objects.filter(pk__in=pks).delete()
+            deleted += batch_deleted
+            batches += 1
+            last_pk = pks[-1]
+            logger.debug(f"Pruned {batch_deleted} TaskRunRecords up to ID {last_pk}")
+    finally:
+        if cache.get(PRUNE_LOCK_CACHE_KEY) == lock_token:
+            cache.delete(PRUNE_LOCK_CACHE_KEY)
+
+    logger.info(f"Pruned {deleted} TaskRunRecords created before {prune_records_created_before}")
+    return deleted
@@ -0,0 +1,115 @@
+import atexit
+import logging
+import threading
+from typing import List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Model
+
+from vcelerytaskrunner.services.batching import BackgroundBatcher, BatcherStats
+from vcelerytaskrunner.services.metrics import METRIC_RECORD_WRITE, timed
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WRITE_BEHIND_BATCH_SIZE = 100
+DEFAULT_WRITE_BEHIND_FLUSH_INTERVAL_MS = 200
+DEFAULT_WRITE_BEHIND_MAX_QUEUE_SIZE = 10000
+
+
+class TaskRunRecordWriter:
+    """
+    Write-behind persistence of TaskRunRecords: records are queued in memory and saved by a background thread with
+    bulk_create(), so recording a task run doesn't add a database round trip to the request.
+    """
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_queue_size: int):
+        self._batcher = BackgroundBatcher(
+            "vcelery-task-run-record-writer",
+            self._write,
+            batch_size=batch_size,
+            flush_interval=flush_interval_ms / 1000.0,
+            max_queue_size=max_queue_size,
+            flush_one=self._write_one,
+        )
+
+    @staticmethod
+    def _write(task_run_records: List[Model]):
+        close_old_connections()
+        with timed(METRIC_RECORD_WRITE, {"mode": "write_behind"}):
+            apps.get_model("vcelerytaskrunner", "TaskRunRecord").objects.bulk_create(task_run_records)
+
+    @staticmethod
+    def _write_one(task_run_record: Model):
+        # bulk_create() of the batch failed as a whole (it is atomic), so each record is saved on its own.
+        close_old_connections()
+        with timed(METRIC_RECORD_WRITE, {"mode": "single"}):
+            task_run_record.save()
+
+    def enqueue(self, task_run_record: Model) -> bool:
+        """
+        Queues an unsaved TaskRunRecord to be saved by the background thread.
+
+        :return: False if the queue is full, in which case the caller should save the record itself
+        """
+        return self._batcher.put(task_run_record)
+
+    def flush(self):
+        """
+        Blocks until every record queued so far is saved.
+        """
+        self._batcher.drain()
+
+    def stop(self):
+        """
+        Saves the records still queued and stops the background thread.
+        """
+        self._batcher.stop()
+
+    def get_stats(self) -> BatcherStats:
+        """
+        :return: counts of the records queued/saved/failed (and of records refused because the queue was full, under
+            "rejected"), and the time spent writing them
+        """
+        return self._batcher.get_stats()
+
+
+_writer = None  # type: Optional[TaskRunRecordWriter]
+_writer_lock = threading.Lock()
+
+
+def get_task_run_record_writer() -> Optional[TaskRunRecordWriter]:
+    """
+    Returns the process-wide TaskRunRecordWriter if write-behind is enabled through the setting
+    VCELERY_TASK_RUN_RECORD_WRITE_BEHIND, e.g.:
+
+        VCELERY_TASK_RUN_RECORD_WRITE_BEHIND = {
+            "BATCH_SIZE": 100,  # records per bulk_create()
+            "FLUSH_INTERVAL_MS": 200,  # maximum time a record waits before being saved
+            "MAX_QUEUE_SIZE": 10000,  # records are saved synchronously when this many are waiting
+        }
+
+    The writer is started on first use and flushed when the process exits.
+
+    :return: the writer (None if write-behind is disabled)
+    """
+    global _writer
+
+    config = getattr(settings, "VCELERY_TASK_RUN_RECORD_WRITE_BEHIND", None)
+    if not config:
+        return None
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = config if isinstance(config, dict) else {}
+                _writer = TaskRunRecordWriter(
+                    batch_size=config.get("BATCH_SIZE", DEFAULT_WRITE_BEHIND_BATCH_SIZE),
+                    flush_interval_ms=config.get("FLUSH_INTERVAL_MS", DEFAULT_WRITE_BEHIND_FLUSH_INTERVAL_MS),
+                    max_queue_size=config.get("MAX_QUEUE_SIZE", DEFAULT_WRITE_BEHIND_MAX_QUEUE_SIZE),
+                )
+                atexit.register(_writer.stop)
+                logger.info(f"Started write-behind of TaskRunRecords: {config}")
+    return _writer
@@ -0,0 +1,162 @@
+import logging
+import signal
+import threading
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+REFRESH_GENERATION_CACHE_KEY = "vcelerytaskrunner:task_registry:generation"
+
+
+def _get_cache():
+    return caches[getattr(settings, "VCELERY_TASK_REGISTRY_REFRESH_CACHE", "default")]
+
+
+def get_refresh_generation() -> Optional[str]:
+    """
+    :return: the token last published by request_registry_refresh() (None if never published)
+    """
+    return _get_cache().get(REFRESH_GENERATION_CACHE_KEY)
+
+
+def request_registry_refresh() -> str:
+    """
+    Asks every process running a TaskRegistryRefresher to refresh its registry by publishing a new generation token
+    into the cache named by VCELERY_TASK_REGISTRY_REFRESH_CACHE. Processes only see the token if that cache is shared
+    between them (e.g. Redis or Memcached, not the default local memory cache).
+
+    :return: the new generation token
+    """
+    generation = uuid.uuid4().hex
+    _get_cache().set(REFRESH_GENERATION_CACHE_KEY, generation, timeout=None)
+    return generation
+
+
+class TaskRegistryRefresher(threading.Thread):
+    """
+    Background thread refreshing the process-wide TaskRegistry when asked to:
+
+    - every `interval` seconds, it checks whether request_registry_refresh() published a new generation token.
+    - trigger() (e.g. from a signal handler) wakes it up to refresh right away.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        super().__init__(name="vcelery-task-registry-refresher", daemon=True)
+        self.interval = interval
+        self._triggered = threading.Event()
+        self._stopped = threading.Event()
+        self._generation = None  # type: Optional[str]
+
+    def trigger(self):
+        self._triggered.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._triggered.set()
+
+    def _generation_changed(self) -> bool:
+        try:
+            generation = get_refresh_generation()
+        except Exception as e:
+            logger.warning("Cannot read the task registry refresh generation: %s", e)
+            return False
+
+        changed = generation != self._generation
+        self._generation = generation
+        return changed
+
+    def run(self):
+        # Imported here so that starting the thread (from start_registry_services(), while the WSGI/ASGI application is
+        # being set up) doesn't build the registry.
+        from vcelerytaskrunner.services.task_runner import reload_task_registry
+
+        if self.interval:
+            # Only generations published from now on should trigger a refresh.
+            self._generation_changed()
+
+        while not self._stopped.is_set():
+            triggered = self._triggered.wait(timeout=self.interval)
+            self._triggered.clear()
+            if self._stopped.is_set():
+                break
+
+            if triggered or self._generation_changed():
+                try:
+                    reload_task_registry(warm_parameters=True)
+                except Exception as e:
+                    logger.exception("Cannot refresh the task registry: %s", e)
+
+
+_refresher = None  # type: Optional[TaskRegistryRefresher]
+
+
+def start_registry_refresher() -> Optional[TaskRegistryRefresher]:
+    """
+    Starts the TaskRegistryRefresher configured by the settings, if any:
+
+    - VCELERY_TASK_REGISTRY_REFRESH_INTERVAL -- seconds between checks for refresh requests
+    - VCELERY_TASK_REGISTRY_REFRESH_SIGNAL -- name of a signal (e.g. "SIGUSR1") that triggers a refresh. Only installed
+      when called from the main thread.
+
+    :return: the refresher started (None if neither setting is configured)
+    """
+    global _refresher
+
+    interval = getattr(settings, "VCELERY_TASK_REGISTRY_REFRESH_INTERVAL", None)
+    signal_name = getattr(settings, "VCELERY_TASK_REGISTRY_REFRESH_SIGNAL", None)
+    if not interval and not signal_name:
+        return None
+
+    if _refresher is None:
+        _refresher = TaskRegistryRefresher(interval=interval)
+        _refresher.start()
+        logger.info(f"Started task registry refresher (interval={interval}, signal={signal_name})")
+
+        if signal_name:
+            refresher = _refresher
+            try:
+                signal.signal(getattr(signal, signal_name), lambda signum, frame: refresher.trigger())
+            except (AttributeError, ValueError) as e:
+                logger.warning(f"Cannot refresh task registry on {signal_name}: {e}")
+    return _refresher
+
+
+def start_registry_services():
+    """
+    Starts the background threads configured by the settings for a process serving the task runner: the registry
+    warmer (VCELERY_TASKRUN_WARM_REGISTRY) and refresher (VCELERY_TASK_REGISTRY_REFRESH_INTERVAL /
+    VCELERY_TASK_REGISTRY_REFRESH_SIGNAL). Call it from the server's entry point, e.g. wsgi.py or asgi.py, so that
+    other processes loading the app (e.g. management commands) don't start them.
+    """
+    start_registry_warmer()
+    start_registry_refresher()
+
+
+def start_registry_warmer() -> Optional[threading.Thread]:
+    """
+    If VCELERY_TASKRUN_WARM_REGISTRY is True, discovers the tasks (and their parameters) in a background thread so
+    that the first requests don't pay for it, without delaying the start of the process either.
+
+    :return: the thread started (None if warming is not configured)
+    """
+    if not getattr(settings, "VCELERY_TASKRUN_WARM_REGISTRY", False):
+        return None
+
+    def warm():
+        from vcelerytaskrunner.services.task_runner import get_task_registry
+
+        task_registry = get_task_registry()
+        try:
+            if not task_registry.is_loaded:
+                task_registry.refresh(warm_parameters=True)
+        except Exception as e:
+            logger.exception("Cannot warm the task registry: %s", e)
+
+    thread = threading.Thread(target=warm, name="vcelery-task-registry-warmer", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,157 @@
+import ast
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from pydantic import BaseModel
+try:
+    from typing_extensions import TypedDict
+except:
+    from typing import TypedDict
+
+from vcelerytaskrunner.services.metrics import METRIC_JSON_ENCODE, timed
+
+
+DEFAULT_RUN_ARGS_COMPRESS_THRESHOLD = 4096
+DEFAULT_RUN_ARGS_MAX_SIZE = 1024 * 1024
+RUN_WITH_MAXLEN = 1000
+
+RUN_WITH_PREFIX = "args="
+RUN_WITH_KWARGS_SEPARATOR = ", kwargs="
+
+
+class RunArgsJSONEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder for the args and kwargs of a task run. On top of what DjangoJSONEncoder handles (datetimes, decimals,
+    UUIDs...), pydantic models are encoded as their JSON-compatible dump, sets and tuples as lists and anything else
+    as its repr() so that encoding never fails.
+    """
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, BaseModel):
+            return o.model_dump(mode="json")
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        try:
+            return super().default(o)
+        except TypeError:
+            return repr(o)
+
+
+class EncodedRunArgs(TypedDict):
+    """
+    How the args and kwargs of a task run are stored in a TaskRunRecord
+    """
+    run_args: Optional[Dict[str, Any]]  # {"args": [...], "kwargs": {...}} unless compressed or truncated
+    run_args_compressed: Optional[bytes]  # zlib-compressed JSON of the same, when larger than the compress threshold
+    run_args_truncated: bool  # True if the arguments were larger than the maximum size and were not stored
+    run_args_hash: str  # SHA-256 of the canonical JSON of the arguments
+    run_with: str  # readable form, cut to RUN_WITH_MAXLEN characters
+
+
+def get_compress_threshold() -> Optional[int]:
+    """
+    :return: the size in bytes (VCELERY_TASK_RUN_RECORD_ARGS_COMPRESS_THRESHOLD) above which the arguments are stored
+        compressed (None to never compress)
+    """
+    return getattr(settings, "VCELERY_TASK_RUN_RECORD_ARGS_COMPRESS_THRESHOLD", DEFAULT_RUN_ARGS_COMPRESS_THRESHOLD)
+
+
+def get_max_size() -> Optional[int]:
+    """
+    :return: the size in bytes (VCELERY_TASK_RUN_RECORD_ARGS_MAX_SIZE) above which the arguments are not stored (None
+        for no limit)
+    """
+    return getattr(settings, "VCELERY_TASK_RUN_RECORD_ARGS_MAX_SIZE", DEFAULT_RUN_ARGS_MAX_SIZE)
+
+
+def _to_json(args: List[Any], kwargs: Dict[str, Any]) -> str:
+    return json.dumps(
+        {"args": list(args or []), "kwargs": dict(kwargs or {})},
+        cls=RunArgsJSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def _truncate(text: str, maxlen: int = RUN_WITH_MAXLEN) -> str:
+    return text if len(text) <= maxlen else f"{text[:maxlen - 3]}..."
+
+
+def hash_run_args(args: List[Any], kwargs: Dict[str, Any]) -> str:
+    """
+    :return: the hash stored in TaskRunRecord.run_args_hash for these args and kwargs
+    """
+    return hashlib.sha256(_to_json(args, kwargs).encode("utf-8")).hexdigest()
+
+
+def encode_run_args(args: List[Any], kwargs: Dict[str, Any]) -> EncodedRunArgs:
+    """
+    Encodes the args and kwargs of a task run into the fields of a TaskRunRecord.
+
+    :param args: positional arguments passed to the task
+    :param kwargs: keyword arguments passed to the task
+
+    :return: the values of the TaskRunRecord fields
+    """
+    with timed(METRIC_JSON_ENCODE, {"what": "run_args"}):
+        args_json = _to_json(args, kwargs)
+    args_bytes = args_json.encode("utf-8")
+    encoded_run_args = EncodedRunArgs(
+        run_args=None,
+        run_args_compressed=None,
+        run_args_truncated=False,
+        run_args_hash=hashlib.sha256(args_bytes).hexdigest(),
+        run_with=_truncate(f"{RUN_WITH_PREFIX}{args}{RUN_WITH_KWARGS_SEPARATOR}{kwargs}"),
+    )
+
+    max_size = get_max_size()
+    compress_threshold = get_compress_threshold()
+    if max_size is not None and len(args_bytes) > max_size:
+        encoded_run_args["run_args_truncated"] = True
+    elif compress_threshold is not None and len(args_bytes) > compress_threshold:
+        encoded_run_args["run_args_compressed"] = zlib.compress(args_bytes)
+    else:
+        encoded_run_args["run_args"] = json.loads(args_json)
+    return encoded_run_args
+
+
+def decode_run_args(
+    run_args: Optional[Dict[str, Any]], run_args_compressed: Optional[bytes]
+) -> Optional[Dict[str, Any]]:
+    """
+    Reverse of encode_run_args().
+
+    :return: {"args": [...], "kwargs": {...}} (None if the arguments were not stored)
+    """
+    if run_args_compressed:
+        return json.loads(zlib.decompress(bytes(run_args_compressed)).decode("utf-8"))
+    return run_args
+
+
+def parse_run_with(run_with: str) -> Optional[Tuple[List[Any], Dict[str, Any]]]:
+    """
+    Best-effort parsing of the "args=[...], kwargs={...}" text that TaskRunRecord.run_with used to hold.
+
+    :return: (args, kwargs), or None if the text cannot be parsed (e.g. it contains reprs of arbitrary objects)
+    """
+    if not run_with or not run_with.startswith(RUN_WITH_PREFIX):
+        return None
+
+    # The separator may also appear inside the args, so try each occurrence until both sides parse.
+    start = len(RUN_WITH_PREFIX)
+    position = run_with.find(RUN_WITH_KWARGS_SEPARATOR, start)
+    while position >= 0:
+        try:
+            args = ast.literal_eval(run_with[start:position])
+            kwargs = ast.literal_eval(run_with[position + len(RUN_WITH_KWARGS_SEPARATOR):])
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            pass
+        else:
+            if isinstance(args, (list, tuple)) and isinstance(kwargs, dict):
+                return list(args), kwargs
+        position = run_with.find(RUN_WITH_KWARGS_SEPARATOR, position + 1)
+    return None
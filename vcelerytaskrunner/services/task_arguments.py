@@ -0,0 +1,187 @@
+import json
+import logging
+from inspect import Parameter
+from typing import Any, Dict, ForwardRef, List, Tuple, Type, Union, get_args, get_origin
+try:
+    from typing_extensions import Annotated, TypedDict
+except:
+    from typing import Annotated, TypedDict
+
+from pydantic import (
+    BaseModel, BeforeValidator, ConfigDict, Field, TypeAdapter, ValidationError as PydanticValidationError,
+    create_model,
+)
+from pydantic.errors import PydanticSchemaGenerationError
+
+from vcelerytaskrunner.services.task_registry import TaskParameter
+
+logger = logging.getLogger(__name__)
+
+JSON_CONTAINER_TYPES = (dict, list, tuple, set, frozenset)
+
+
+class ParamError(TypedDict):
+    """
+    Why the value of a task parameter was rejected
+    """
+    param: str
+    error: str
+
+
+class TaskArgumentsError(ValueError):
+    """
+    Raised when the args/kwargs for a task don't match its parameters. param_errors has the details for each
+    offending parameter.
+    """
+
+    def __init__(self, param_errors: List[ParamError]):
+        super().__init__("; ".join(f"{param_error['param']}: {param_error['error']}" for param_error in param_errors))
+        self.param_errors = param_errors
+
+
+def _is_json_type(annotation: Any) -> bool:
+    """
+    :return: True if values of the type are written as JSON in the task run form (containers and pydantic models)
+    """
+    origin = get_origin(annotation)
+    if origin is Union:
+        return any(_is_json_type(arg) for arg in get_args(annotation))
+    if origin is not None:
+        return origin in JSON_CONTAINER_TYPES
+    return isinstance(annotation, type) and issubclass(annotation, JSON_CONTAINER_TYPES + (BaseModel,))
+
+
+def _loads_json_str(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            # Let the validation report the string as the wrong type
+            pass
+    return value
+
+
+def _get_field_type(task_param: TaskParameter) -> Any:
+    annotation = task_param.annotation
+    if annotation == Parameter.empty or isinstance(annotation, (str, ForwardRef)):
+        # No type hint, or one that was never evaluated (e.g. with "from __future__ import annotations")
+        return Any
+    if _is_json_type(annotation):
+        return Annotated[annotation, BeforeValidator(_loads_json_str)]
+
+    try:
+        TypeAdapter(annotation)
+    except PydanticSchemaGenerationError:
+        # A class pydantic knows nothing about: construct it from the value (e.g. Decimal-like classes), as the form
+        # always did. The model only checks isinstance() afterwards (arbitrary_types_allowed).
+        def construct(value: Any, annotation: Type = annotation) -> Any:
+            return value if value is None or isinstance(value, annotation) else annotation(value)
+
+        return Annotated[annotation, BeforeValidator(construct)]
+    except Exception as e:
+        logger.warning(f"Cannot validate parameter {task_param.name} as {annotation}: {e}. Passing its values as is.")
+        return Any
+    return annotation
+
+
+class TaskArgumentsValidator:
+    """
+    Validates and coerces the args/kwargs of a task against its whole signature with one call to a pydantic model
+    generated from its TaskParameters. Generating the model is the expensive part, so a validator is built once per
+    task and cached with the task's parameters (see TaskRegistry.get_task_arguments_validator()).
+
+    Values are validated in pydantic's lax mode, so strings from the task run form are converted (e.g. "3" for an int
+    and ISO 8601 strings for a datetime), and strings for containers and pydantic models are parsed as JSON first.
+    Nested types such as Dict[Literal["items"], Dict[str, List[int]]] are checked all the way down. Values of
+    parameters without a type hint, or with one that pydantic cannot validate, are passed as is.
+    """
+
+    def __init__(self, task_params: List[TaskParameter]):
+        self.task_params = task_params
+        self.positional_params = [
+            task_param for task_param in task_params
+            if task_param.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+        ]
+        self.accepts_var_args = any(task_param.kind == Parameter.VAR_POSITIONAL for task_param in task_params)
+        self.accepts_var_kwargs = any(task_param.kind == Parameter.VAR_KEYWORD for task_param in task_params)
+
+        # The fields are named by position, with the parameter names as aliases, so that parameter names can't clash
+        # with BaseModel attributes (e.g. a parameter named "json" or "model_config").
+        self.field_names = {}  # type: Dict[str, str]
+        fields = {}
+        for position, task_param in enumerate(task_params):
+            if task_param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                continue
+            field_name = f"param_{position}"
+            self.field_names[task_param.name] = field_name
+            fields[field_name] = (
+                _get_field_type(task_param),
+                Field(default=None if task_param.default is not None else ..., alias=task_param.name),
+            )
+
+        config = ConfigDict(arbitrary_types_allowed=True, extra="allow" if self.accepts_var_kwargs else "forbid")
+        try:
+            self.model = create_model("TaskArguments", __config__=config, **fields)  # type: Type[BaseModel]
+            # Raises if a type the model refers to cannot be resolved (e.g. List["SomeClass"])
+            self.model.model_rebuild()
+        except Exception as e:
+            # Still check the arguments against the signature (missing, unexpected...), without checking the values.
+            logger.warning(f"Cannot build a validation model for {task_params}: {e}. Passing the values as is.")
+            fields = {field_name: (Any, field_info) for field_name, (_, field_info) in fields.items()}
+            self.model = create_model("TaskArguments", __config__=config, **fields)
+
+    def validate(self, args: List[Any], kwargs: Dict[str, Any]) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        :param args: positional arguments for the task
+        :param kwargs: keyword arguments for the task
+
+        :return: the coerced (args, kwargs). Parameters that were not given are left out so that the task uses its
+            defaults.
+        :raises TaskArgumentsError: with all the problems found if the arguments don't fit the task's signature
+        """
+        param_errors = []  # type: List[ParamError]
+        if len(args) > len(self.positional_params) and not self.accepts_var_args:
+            for position in range(len(self.positional_params), len(args)):
+                param_errors.append(
+                    ParamError(
+                        param=f"args[{position}]", error=f"takes at most {len(self.positional_params)} positional args"
+                    )
+                )
+        positional_params = self.positional_params[:len(args)]
+        values = {task_param.name: value for task_param, value in zip(positional_params, args)}
+        for name, value in kwargs.items():
+            if name in values:
+                param_errors.append(ParamError(param=name, error="given both as positional and keyword argument"))
+            else:
+                values[name] = value
+
+        validated = None
+        try:
+            validated = self.model.model_validate(values)
+        except PydanticValidationError as e:
+            param_errors.extend(self._to_param_errors(e))
+        if param_errors:
+            raise TaskArgumentsError(param_errors)
+
+        coerced_args = [getattr(validated, self.field_names[task_param.name]) for task_param in positional_params]
+        coerced_args.extend(args[len(self.positional_params):])
+        coerced_kwargs = {
+            name: getattr(validated, self.field_names[name]) if name in self.field_names else value
+            for name, value in kwargs.items()
+        }
+        return coerced_args, coerced_kwargs
+
+    @staticmethod
+    def _to_param_errors(validation_error: PydanticValidationError) -> List[ParamError]:
+        param_errors = []
+        for error in validation_error.errors(include_url=False):
+            loc = error["loc"]
+            if error["type"] == "missing":
+                message = "missing value"
+            elif error["type"] == "extra_forbidden":
+                message = "unexpected argument"
+            else:
+                path = "".join(f"[{part!r}]" for part in loc[1:])
+                message = f"{path}: {error['msg']}" if path else error["msg"]
+            param_errors.append(ParamError(param=str(loc[0]) if loc else "", error=message))
+        return param_errors
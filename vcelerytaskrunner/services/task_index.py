@@ -0,0 +1,214 @@
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from vcelerytaskrunner.services.compact_catalog import Bitset, CompactStrings
+
+
+NGRAM_SIZE = 3
+
+# Number of (mask, runnable_only) match counts remembered per index
+COUNT_CACHE_SIZE = 256
+
+
+class TaskNameIndex:
+    """
+    Case-insensitive substring index over a sorted list of task names.
+
+    Each lowered task name is broken into n-grams (trigrams by default) mapped to the positions of the names containing
+    them. A mask at least NGRAM_SIZE long is answered by scanning only the positions of its rarest n-gram, so the cost
+    depends on how many names share that n-gram instead of on the size of the whole catalog. Results are positions into
+    task_names in ascending order, i.e. the same order as task_names itself.
+    """
+
+    def __init__(self, task_names: List[str], runnable_tasks: Optional[Set[str]] = None):
+        """
+        :param task_names: the task names, already sorted
+        :param runnable_tasks: the names of the runnable tasks (None means all tasks are runnable)
+        """
+        self.task_names = task_names
+        self.runnable_tasks = runnable_tasks
+        self.lowered_names = [task_name.lower() for task_name in task_names]
+
+        self.runnable_flags = [
+            (runnable_tasks is None) or (task_name in runnable_tasks) for task_name in task_names
+        ]
+        self.all_positions = list(range(len(task_names)))
+        self.runnable_positions = [position for position, runnable in enumerate(self.runnable_flags) if runnable]
+
+        self.ngrams = {}  # type: Dict[str, List[int]]
+        for position, lowered_name in enumerate(self.lowered_names):
+            for ngram in self._ngrams_of(lowered_name):
+                self.ngrams.setdefault(ngram, []).append(position)
+
+        self._counts = OrderedDict()  # type: OrderedDict[Tuple[str, bool], int]
+        self._counts_lock = threading.Lock()
+
+    @staticmethod
+    def _ngrams_of(value: str) -> Set[str]:
+        return {value[i:i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+
+    def _candidate_positions(self, mask: str) -> List[int]:
+        if len(mask) < NGRAM_SIZE:
+            # Short masks match most of the catalog anyway, so there is little to gain over a plain scan.
+            return self.all_positions
+
+        candidates = None
+        for ngram in self._ngrams_of(mask):
+            positions = self.ngrams.get(ngram)
+            if not positions:
+                return []
+            if candidates is None or len(positions) < len(candidates):
+                candidates = positions
+        return candidates
+
+    def find(self, mask: Optional[str], runnable_only: bool = False) -> List[int]:
+        """
+        Finds the positions of the task names containing a mask.
+
+        :param mask: optional substring to look for (case-insensitive)
+        :param runnable_only: True to only return runnable tasks
+
+        :return: positions into task_names of the matches, in ascending order
+        """
+        if not mask:
+            return self.runnable_positions if runnable_only else self.all_positions
+
+        mask = mask.lower()
+        lowered_names = self.lowered_names
+        runnable_flags = self.runnable_flags
+        return [
+            position for position in self._candidate_positions(mask)
+            if mask in lowered_names[position] and (not runnable_only or runnable_flags[position])
+        ]
+
+    def find_after(
+        self, mask: Optional[str], after_name: Optional[str], limit: int, runnable_only: bool = False
+    ) -> Tuple[List[int], bool]:
+        """
+        Keyset version of find(): finds up to limit matches whose names sort after a given name. Only the matches
+        up to the end of the page are examined, so deep pages cost the same as the first one.
+
+        :param mask: optional substring to look for (case-insensitive)
+        :param after_name: the name to resume after (None to start from the beginning). The name does not need to be
+            in the index anymore.
+        :param limit: the maximum number of positions to return
+        :param runnable_only: True to only return runnable tasks
+
+        :return: positions into task_names of the matches in ascending order, and whether more matches follow
+        """
+        after_position = -1 if after_name is None else bisect_right(self.task_names, after_name) - 1
+
+        if not mask:
+            positions = self.runnable_positions if runnable_only else self.all_positions
+            start = bisect_right(positions, after_position)
+            return positions[start:start + limit], start + limit < len(positions)
+
+        mask = mask.lower()
+        lowered_names = self.lowered_names
+        runnable_flags = self.runnable_flags
+        candidates = self._candidate_positions(mask)
+        matches = []
+        for i in range(bisect_right(candidates, after_position), len(candidates)):
+            position = candidates[i]
+            if mask in lowered_names[position] and (not runnable_only or runnable_flags[position]):
+                if len(matches) == limit:
+                    return matches, True
+                matches.append(position)
+        return matches, False
+
+    def count(self, mask: Optional[str], runnable_only: bool = False) -> int:
+        """
+        Counts the matches of find(). Recent counts are cached since the index never changes once built.
+
+        :param mask: optional substring to look for (case-insensitive)
+        :param runnable_only: True to only count runnable tasks
+
+        :return: the number of matches
+        """
+        key = ((mask or "").lower(), runnable_only)
+        with self._counts_lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+
+        count = len(self.find(mask, runnable_only=runnable_only))
+        with self._counts_lock:
+            self._counts[key] = count
+            if len(self._counts) > COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
+        return count
+
+
+class CompactTaskNameIndex(TaskNameIndex):
+    """
+    TaskNameIndex laid out in a few large buffers instead of one Python object per name and position: the names are
+    CompactStrings, the runnable flags a Bitset and the positions arrays of ints. Built before a server forks its
+    workers, its memory pages stay shared with them, since lookups don't update reference counts inside the buffers.
+    """
+
+    def __init__(self, task_names: Sequence[str], runnable_tasks: Optional[Set[str]] = None):
+        """
+        :param task_names: the task names, already sorted
+        :param runnable_tasks: the names of the runnable tasks (None means all tasks are runnable)
+        """
+        self.task_names = task_names if isinstance(task_names, CompactStrings) else CompactStrings(task_names)
+        self.runnable_tasks = runnable_tasks
+        self.lowered_names = CompactStrings(task_name.lower() for task_name in self.task_names)
+
+        self.runnable_flags = Bitset(
+            (runnable_tasks is None) or (task_name in runnable_tasks) for task_name in self.task_names
+        )
+        self.all_positions = range(len(self.task_names))
+        self.runnable_positions = array(
+            "i", (position for position, runnable in enumerate(self.runnable_flags) if runnable)
+        )
+
+        ngrams = {}  # type: Dict[str, List[int]]
+        for position, lowered_name in enumerate(self.lowered_names):
+            for ngram in self._ngrams_of(lowered_name):
+                ngrams.setdefault(ngram, []).append(position)
+        self.ngrams = {ngram: array("i", positions) for ngram, positions in ngrams.items()}
+
+        self._counts = OrderedDict()  # type: OrderedDict[Tuple[str, bool], int]
+        self._counts_lock = threading.Lock()
+
+    def find(self, mask: Optional[str], runnable_only: bool = False) -> Sequence[int]:
+        if not mask:
+            return self.runnable_positions if runnable_only else self.all_positions
+
+        mask = mask.lower()
+        find_in_names = self.lowered_names.text.find
+        offsets = self.lowered_names.offsets
+        # Bitset.__getitem__ inlined: this loop runs over every candidate
+        runnable_bits = self.runnable_flags.bits
+        return [
+            position for position in self._candidate_positions(mask)
+            if find_in_names(mask, offsets[position], offsets[position + 1]) >= 0
+            and (not runnable_only or runnable_bits[position >> 3] & (1 << (position & 7)))
+        ]
+
+    def find_after(
+        self, mask: Optional[str], after_name: Optional[str], limit: int, runnable_only: bool = False
+    ) -> Tuple[Sequence[int], bool]:
+        if not mask:
+            return super().find_after(mask, after_name, limit, runnable_only=runnable_only)
+
+        after_position = -1 if after_name is None else bisect_right(self.task_names, after_name) - 1
+        mask = mask.lower()
+        find_in_names = self.lowered_names.text.find
+        offsets = self.lowered_names.offsets
+        runnable_bits = self.runnable_flags.bits
+        candidates = self._candidate_positions(mask)
+        matches = []
+        for i in range(bisect_right(candidates, after_position), len(candidates)):
+            position = candidates[i]
+            if find_in_names(mask, offsets[position], offsets[position + 1]) >= 0 and \
+                    (not runnable_only or runnable_bits[position >> 3] & (1 << (position & 7))):
+                if len(matches) == limit:
+                    return matches, True
+                matches.append(position)
+        return matches, False
@@ -1,11 +1,20 @@
+import base64
+import binascii
 from datetime import datetime
+import hashlib
 import inspect
 import json
 import logging
-from collections import OrderedDict
-from dataclasses import dataclass
+import threading
+import time
+from bisect import bisect_left
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from inspect import Parameter, Signature
-from typing import Dict, Optional, Set, _GenericAlias, List, Any, Type
+from typing import (
+    TYPE_CHECKING, Dict, FrozenSet, Iterator, Optional, Sequence, Set, _GenericAlias, List, Any, Type, Union, get_args,
+)
 try:
     from typing_extensions import TypedDict
 except:
@@ -21,9 +30,26 @@ from pydantic import BaseModel
 
 from celery.local import Proxy
 
+from vcelerytaskrunner.services.catalog_cache import (
+    CachedCatalog, is_catalog_cache_enabled, load_catalog, publish_catalog,
+)
+from vcelerytaskrunner.services.metrics import (
+    METRIC_JSON_ENCODE, METRIC_REGISTRY_REFRESH, METRIC_TASK_FILTER, METRIC_TASK_PARAMETERS, get_metrics, timed,
+)
+from vcelerytaskrunner.services.compact_catalog import CompactJsonMap, CompactStrings
+from vcelerytaskrunner.services.task_index import CompactTaskNameIndex, TaskNameIndex
+
+if TYPE_CHECKING:
+    from vcelerytaskrunner.services.task_arguments import TaskArgumentsValidator
+
 logger = logging.getLogger(__name__)
 
 
+# Prefix of the maintenance tasks of the task runner itself (e.g. prune_task_run_records), which are left out of the
+# catalog so that they can't be launched from the runner
+RUNNER_TASK_PREFIX = "vcelerytaskrunner."
+
+
 @dataclass
 class DefaultValue:
     value: Any
@@ -50,11 +76,80 @@ class LimitOffsetPagination(TypedDict):
     limit: int
 
 
+class CursorPagination(TypedDict):
+    """
+    Keyset pagination: resume after the task the cursor points at (None for the first page). The count of all
+    matches is only computed when with_count is True.
+    """
+    cursor: Optional[str]
+    limit: int
+    with_count: bool
+
+
 class TaskInfosWithCount(TypedDict):
     task_infos: List[TaskInfo]
     count: int
 
 
+class TaskInfosWithCursor(TypedDict):
+    task_infos: List[TaskInfo]
+    count: Optional[int]
+    next_cursor: Optional[str]
+
+
+def encode_task_cursor(task_name: str) -> str:
+    """
+    Creates an opaque cursor pointing at a task name for CursorPagination.
+    """
+    return base64.urlsafe_b64encode(task_name.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_task_cursor(cursor: str) -> str:
+    """
+    Reverses encode_task_cursor().
+
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        padded_cursor = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded_cursor, altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+class ParameterCacheInfo(TypedDict):
+    """
+    Statistics on the cache of TaskParameters kept by the TaskRegistry
+    """
+    hits: int
+    misses: int
+    size: int
+
+
+def _get_annotation_fingerprint(annotation: Any, model_fingerprints: Dict[type, str]) -> str:
+    """
+    :param model_fingerprints: the fingerprints of the pydantic models already seen, by model
+
+    :return: a text that changes with the annotation, including the fields of the pydantic models it refers to
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        fingerprint = model_fingerprints.get(annotation)
+        if fingerprint is None:
+            # Placeholder for models referring to themselves
+            model_fingerprints[annotation] = repr(annotation)
+            fields = ",".join(
+                f"{name}:{field_info!r}:{_get_annotation_fingerprint(field_info.annotation, model_fingerprints)}"
+                for name, field_info in annotation.model_fields.items()
+            )
+            fingerprint = f"{annotation!r}{annotation.model_config!r}({fields})"
+            model_fingerprints[annotation] = fingerprint
+        return fingerprint
+    args_fingerprint = "".join(
+        f"[{_get_annotation_fingerprint(arg, model_fingerprints)}]" for arg in get_args(annotation)
+    )
+    return f"{annotation!r}{args_fingerprint}"
+
+
 @dataclass
 class TaskParameter:
     name: str
@@ -63,6 +158,7 @@ class TaskParameter:
     is_base_model: bool = False
     json_schema: Optional[Dict] = None
     default: Optional[DefaultValue] = None
+    kind: Any = Parameter.POSITIONAL_OR_KEYWORD
 
     class Encoder(json.JSONEncoder):
         def default(self, o):
@@ -99,7 +195,14 @@ class TaskParameter:
         else:
             type_info = str(annotation)
 
-        inst = cls(name=parameter.name, annotation=annotation, type_info=type_info, is_base_model=is_base_model, json_schema=json_schema)
+        inst = cls(
+            name=parameter.name,
+            annotation=annotation,
+            type_info=type_info,
+            is_base_model=is_base_model,
+            json_schema=json_schema,
+            kind=parameter.kind,
+        )
         if parameter.default != Parameter.empty:
             val = parameter.default
             inst.default = DefaultValue(value=val)
@@ -120,15 +223,127 @@ class TaskParameter:
         return TaskParameter.Encoder
         
 
+class LazyTasks(Mapping):
+    """
+    The tasks of a catalog loaded from the catalog cache. Task names map to the Proxies of the Celery app, looked up
+    when first needed. The task modules are only autodiscovered if a task of the catalog isn't registered with the
+    Celery app yet, so a process can serve the task list and parameters without importing them.
+    """
+
+    def __init__(self, celery_app, task_names: Sequence[str], force_autodiscovery: bool):
+        """
+        :param celery_app: the Celery app to look the tasks up from
+        :param task_names: the names of the tasks of the catalog, sorted
+        :param force_autodiscovery: False to never autodiscover tasks
+        """
+        self.celery_app = celery_app
+        self.task_names = task_names
+        self.force_autodiscovery = force_autodiscovery
+        self._discovered = False
+        self._discovery_lock = threading.Lock()
+
+    def __getitem__(self, task_name: str) -> Proxy:
+        if task_name.startswith(RUNNER_TASK_PREFIX):
+            raise KeyError(task_name)
+        task = self.celery_app.tasks.get(task_name)
+        if task is None and self._in_catalog(task_name) and self._discover():
+            task = self.celery_app.tasks.get(task_name)
+        if task is None:
+            raise KeyError(task_name)
+        return task
+
+    def __contains__(self, task_name) -> bool:
+        return self._in_catalog(task_name) or (
+            not task_name.startswith(RUNNER_TASK_PREFIX) and self.celery_app.tasks.get(task_name) is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.task_names)
+
+    def __len__(self) -> int:
+        return len(self.task_names)
+
+    def _in_catalog(self, task_name: str) -> bool:
+        position = bisect_left(self.task_names, task_name)
+        return position < len(self.task_names) and self.task_names[position] == task_name
+
+    def _discover(self) -> bool:
+        """
+        :return: True if tasks were (or had already been) autodiscovered
+        """
+        if not self.force_autodiscovery:
+            return False
+        with self._discovery_lock:
+            if not self._discovered:
+                logger.info("Autodiscovering tasks to resolve a task of the cached catalog")
+                self.celery_app.autodiscover_tasks(force=True)
+                self._discovered = True
+        return True
+
+
+@dataclass
+class TaskCatalog:
+    """
+    Snapshot of the tasks known to a TaskRegistry. TaskRegistry.refresh() builds a new catalog and swaps it in as a
+    whole, so a reader holding a catalog always sees a consistent set of tasks, names and index.
+    """
+    # Task names to Proxies (LazyTasks for catalogs loaded from the catalog cache or compacted)
+    tasks: Mapping
+    # CompactStrings for compacted catalogs
+    task_names: Sequence[str]
+    name_index: TaskNameIndex
+
+    # Digest of the catalog (names, runnable flags and signatures). It only changes when the catalog does, and it is
+    # the same across processes serving the same code and settings.
+    version: str
+
+    # TaskParameters extracted from tasks' signatures, keyed by task name. Filled lazily by get_task_parameters().
+    task_parameters: Dict[str, List[TaskParameter]] = field(default_factory=dict)
+
+    # The task parameters pre-encoded as JSON arrays, keyed by task name. Filled lazily by get_task_parameters_json(),
+    # except for compacted catalogs, which have them all in a CompactJsonMap.
+    task_parameters_json: Mapping = field(default_factory=dict)
+
+    # TaskArgumentsValidators compiled from the task parameters, keyed by task name. Filled lazily by
+    # get_task_arguments_validator().
+    task_arguments_validators: Dict[str, Any] = field(default_factory=dict)
+
+    # Indexes of the task names for registries configured with other runnable tasks than the one that built the
+    # catalog, keyed by their runnable tasks (None for all tasks). Filled lazily by TaskRegistry._get_name_index().
+    other_name_indexes: Dict[Optional[FrozenSet[str]], TaskNameIndex] = field(default_factory=dict)
+
+
 class TaskRegistry:
     """
     Registry of Celery tasks with methods to query for task names and to look up tasks for a name.
     """
-    tasks = OrderedDict()  # type: Dict[str, Proxy]
-    task_names = []
+    # The current TaskCatalog, shared by all instances. Built on first use and only ever replaced (by refresh()), never
+    # modified in place.
+    catalog = None  # type: Optional[TaskCatalog]
+    parameter_cache_stats = {"hits": 0, "misses": 0}  # type: Dict[str, int]
 
-    def __init__(self, celery_app, runnable_tasks: Optional[Set[str]] = None):
+    _refresh_lock = threading.Lock()
+
+    def __init__(
+        self,
+        celery_app,
+        runnable_tasks: Optional[Set[str]] = None,
+        force_autodiscovery: bool = True,
+        compact: bool = False,
+    ):
+        """
+        Creating a TaskRegistry is cheap: tasks are only discovered when first looked up (or on refresh()).
+
+        :param celery_app: the Celery app whose tasks to expose
+        :param runnable_tasks: names of the runnable tasks (None means all tasks are runnable)
+        :param force_autodiscovery: False to skip celery_app.autodiscover_tasks(force=True) and only use the tasks
+            the Celery app has already registered
+        :param compact: True to build compact catalogs (see _compact_catalog()), e.g. to share them with preforked
+            worker processes
+        """
         self.celery_app = celery_app
+        self.force_autodiscovery = force_autodiscovery
+        self.compact = compact
 
         self.runnable_tasks = None
         self.runnable_tasks_set = set()
@@ -136,39 +351,266 @@ class TaskRegistry:
             self.runnable_tasks = runnable_tasks.copy()
             self.runnable_tasks_set = set(self.runnable_tasks)
 
-        if not self.tasks:
-            self._refresh_registry()
+    @property
+    def is_loaded(self) -> bool:
+        return self.catalog is not None
 
-    def _refresh_registry(self):
-        logger.info("Refreshing tasks registry")
-        self.celery_app.autodiscover_tasks(force=True)
+    def is_task_list_warm(self) -> bool:
+        """
+        Tells whether the task list can be built from memory alone, i.e. the catalog is loaded and the parameters of
+        all its tasks are encoded. Otherwise building it may autodiscover tasks and inspect their signatures.
+
+        :return: True if the task list is warm
+        """
+        catalog = self.catalog
+        return catalog is not None and len(catalog.task_parameters_json) >= len(catalog.task_names)
+
+    def is_task_warm(self, task_name: str) -> bool:
+        """
+        Tells whether a task can be looked up and its arguments validated from memory alone, i.e. the catalog is
+        loaded and the task's TaskArgumentsValidator is compiled (or there is no such task).
+
+        :param task_name: the name of the Celery task
+
+        :return: True if the task is warm
+        """
+        catalog = self.catalog
+        return catalog is not None and (
+            task_name in catalog.task_arguments_validators or task_name not in catalog.tasks
+        )
+
+    @property
+    def tasks(self) -> Mapping:
+        return self._get_catalog().tasks
+
+    @property
+    def task_names(self) -> Sequence[str]:
+        return self._get_catalog().task_names
 
-        self.tasks.clear()
-        self.tasks.update(self.celery_app.tasks)
-        self.task_names.clear()
+    @property
+    def catalog_version(self) -> str:
+        return self._get_catalog().version
 
-        # Assumption: self.task_names is of a "manageable" number to store in memory. Are there systems where the
+    def _get_catalog(self) -> TaskCatalog:
+        catalog = self.catalog
+        if catalog is None:
+            with self._refresh_lock:
+                # Another thread may have loaded the catalog while this one waited for the lock.
+                catalog = self.catalog
+                if catalog is None:
+                    catalog = self._load_cached_catalog() or self._refresh_locked(warm_parameters=False)
+        return catalog
+
+    def _get_celery_app_name(self) -> str:
+        return getattr(self.celery_app, "main", None) or ""
+
+    def _load_cached_catalog(self) -> Optional[TaskCatalog]:
+        """
+        Loads the catalog published by another process into the catalog cache (see VCELERY_TASKRUN_CATALOG_CACHE)
+        instead of discovering the tasks and introspecting their parameters.
+
+        :return: the catalog loaded (None if there is none to load)
+        """
+        started_at = time.perf_counter()
+        cached_catalog = load_catalog(self._get_celery_app_name(), self.runnable_tasks)
+        if cached_catalog is None:
+            return None
+
+        task_names = cached_catalog["task_names"]
+        unknown_task_names = self._get_registered_task_names() - set(task_names)
+        if unknown_task_names:
+            logger.warning(
+                f"Ignoring cached task catalog {cached_catalog['version']}: it lacks {len(unknown_task_names)}"
+                f" registered task(s), e.g. {min(unknown_task_names)}"
+            )
+            return None
+
+        catalog = TaskCatalog(
+            tasks=LazyTasks(self.celery_app, task_names, self.force_autodiscovery),
+            task_names=task_names,
+            name_index=self._build_name_index(task_names),
+            version=cached_catalog["version"],
+            task_parameters_json=dict(cached_catalog["task_parameters_json"]),
+        )
+        if self.compact:
+            catalog = self._compact_catalog(catalog, warm_parameters=False)
+        TaskRegistry.catalog = catalog
+        logger.info(
+            f"Task catalog {catalog.version} ({len(task_names)} task(s)) loaded from the catalog cache"
+            f" in {time.perf_counter() - started_at:.3f}s"
+        )
+        return catalog
+
+    def _get_registered_task_names(self) -> Set[str]:
+        """
+        :return: the names of the tasks already registered with the Celery app that would be in a catalog built now
+            (without autodiscovering tasks)
+        """
+        return {
+            task_name for task_name in self.celery_app.tasks.keys()
+            if not task_name.startswith("celery") and not task_name.startswith(RUNNER_TASK_PREFIX)
+        }
+
+    def _publish_catalog(self, catalog: TaskCatalog):
+        for task_name in catalog.task_names:
+            self._get_task_parameters_json(catalog, task_name)
+        publish_catalog(
+            self._get_celery_app_name(),
+            self.runnable_tasks,
+            CachedCatalog(
+                version=catalog.version,
+                task_names=list(catalog.task_names),
+                runnable_flags=[self._is_runnable(task_name) for task_name in catalog.task_names],
+                task_parameters_json=dict(catalog.task_parameters_json),
+            ),
+        )
+
+    def _compact_catalog(self, catalog: TaskCatalog, warm_parameters: bool) -> TaskCatalog:
+        """
+        Rebuilds a catalog in a few large buffers instead of one Python object per task: the names as CompactStrings
+        (shared by the CompactTaskNameIndex) and the parameters of all tasks pre-encoded into one CompactJsonMap. The
+        tasks are looked up from the Celery app (LazyTasks) instead of being copied into a dict of their own.
+
+        Built in a server's master process before it forks its workers (see preload_task_registry()), the buffers stay
+        shared between the workers: reading them doesn't write to their memory pages, while merely looking up an
+        object in a dict or list updates its reference count and makes the page it is on private to the worker.
+
+        :param catalog: the catalog to compact
+        :param warm_parameters: True to also keep the TaskParameters and compile the validators of all tasks
+
+        :return: the compact catalog
+        """
+        name_index = catalog.name_index
+        if not isinstance(name_index, CompactTaskNameIndex):
+            name_index = CompactTaskNameIndex(catalog.task_names, name_index.runnable_tasks)
+        task_names = name_index.task_names
+
+        parameters_json = CompactStrings(
+            self._get_task_parameters_json(catalog, task_name) for task_name in catalog.task_names
+        )
+        compact_catalog = TaskCatalog(
+            tasks=LazyTasks(self.celery_app, task_names, self.force_autodiscovery),
+            task_names=task_names,
+            name_index=name_index,
+            version=catalog.version,
+            # Tasks outside the catalog (e.g. Celery's own) are encoded on demand into the dict
+            task_parameters_json=ChainMap({}, CompactJsonMap(task_names, parameters_json)),
+        )
+        if warm_parameters:
+            compact_catalog.task_parameters = catalog.task_parameters
+            for task_name in task_names:
+                self._get_task_arguments_validator(compact_catalog, task_name)
+        return compact_catalog
+
+    def refresh(self, warm_parameters: bool = False) -> TaskCatalog:
+        """
+        Rediscovers the tasks of the Celery app and replaces the catalog shared by all TaskRegistry instances. The new
+        catalog is completely built before it is swapped in, so concurrent lookups see either the old or the new
+        catalog, never a partial one. Concurrent refreshes are serialized.
+
+        If VCELERY_TASKRUN_CATALOG_CACHE is set, the new catalog (with the parameters of all its tasks) is also
+        published to that cache for other processes to load instead of discovering the tasks themselves.
+
+        :param warm_parameters: True to also extract (and JSON-encode) the parameters of every task and compile their
+            validators before the swap instead of lazily on first lookup
+
+        :return: the new catalog
+        """
+        with self._refresh_lock:
+            return self._refresh_locked(warm_parameters)
+
+    def _refresh_locked(self, warm_parameters: bool) -> TaskCatalog:
+        logger.info("Refreshing tasks registry")
+        started_at = time.perf_counter()
+        if self.force_autodiscovery:
+            self.celery_app.autodiscover_tasks(force=True)
+        discovered_at = time.perf_counter()
+
+        tasks = OrderedDict(
+            (task_name, task) for task_name, task in self.celery_app.tasks.items()
+            if not task_name.startswith(RUNNER_TASK_PREFIX)
+        )
+
+        # Assumption: task_names is of a "manageable" number to store in memory. Are there systems where the
         # number of celery tasks exceed comfortable memory footprint?
-        self.task_names.extend(sorted(name for name in self.tasks.keys() if not name.startswith("celery")))
+        task_names = sorted(name for name in tasks.keys() if not name.startswith("celery"))
 
-        logger.info(f"{len(self.task_names)} task(s) found: {self.task_names}")
+        catalog = TaskCatalog(
+            tasks=tasks,
+            task_names=task_names,
+            name_index=self._build_name_index(task_names),
+            version=self._compute_catalog_version(tasks, task_names),
+        )
+        if self.compact:
+            catalog = self._compact_catalog(catalog, warm_parameters)
+        elif warm_parameters:
+            for task_name in task_names:
+                self._get_task_parameters_json(catalog, task_name)
+                self._get_task_arguments_validator(catalog, task_name)
+
+        if is_catalog_cache_enabled():
+            self._publish_catalog(catalog)
+
+        TaskRegistry.catalog = catalog
+        finished_at = time.perf_counter()
+        metrics = get_metrics()
+        if metrics.enabled:
+            metrics.observe(METRIC_REGISTRY_REFRESH, finished_at - started_at)
+
+        logger.info(
+            f"Task registry refreshed in {finished_at - started_at:.3f}s"
+            f" (autodiscovery: {discovered_at - started_at:.3f}s, force={self.force_autodiscovery})"
+        )
+        logger.info(f"{len(task_names)} task(s) found: {task_names}")
         if self.runnable_tasks is None:
             logger.warning("No VCELERY_TASKRUN_RUNNABLE_TASKS configured, so all tasks are runnable.")
         elif not self.runnable_tasks:
             logger.warning("VCELERY_TASKRUN_RUNNABLE_TASKS is empty, so NO tasks are runnable.")
         else:
             logger.info(f"Runnable task(s): {self.runnable_tasks}")
+        return catalog
+
+    def _refresh_registry(self):
+        self.refresh()
+
+    def _is_runnable(self, task_name: str) -> bool:
+        return (self.runnable_tasks is None) or (task_name in self.runnable_tasks_set)
+
+    def _compute_catalog_version(self, tasks: Dict[str, Proxy], task_names: List[str]) -> str:
+        """
+        Digests the names, runnable flags and signatures of all the tasks. The pydantic models in the signatures are
+        digested down to their fields, so that e.g. changing the type of a field (hence the JSON schema the task list
+        returns) changes the version. Unlike encoding the parameters, this doesn't generate any JSON schema, so the
+        parameters are still only extracted and encoded on first lookup (or when warming the catalog).
+        """
+        digest = hashlib.sha1()
+        model_fingerprints = {}  # type: Dict[type, str]
+        for task_name in task_names:
+            try:
+                parameters = inspect.signature(tasks[task_name]).parameters.values()
+                signature_fingerprint = ",".join(
+                    f"{parameter.name}:{parameter.kind}:"
+                    f"{_get_annotation_fingerprint(parameter.annotation, model_fingerprints)}={parameter.default!r}"
+                    for parameter in parameters
+                )
+            except (TypeError, ValueError) as e:
+                # Broken signatures fail the lookups of that task, not the refresh
+                logger.warning(f"Cannot get the signature of {task_name}: {e}")
+                signature_fingerprint = ""
+            digest.update(f"{task_name}|{int(self._is_runnable(task_name))}|{signature_fingerprint}\n".encode("utf-8"))
+        return digest.hexdigest()
 
     def get_task_infos(
         self,
         task_filter: Optional[TaskFilter],
-        pagination: Optional[LimitOffsetPagination] = None
-    ) -> TaskInfosWithCount:
+        pagination: Optional[Union[LimitOffsetPagination, CursorPagination]] = None
+    ) -> Union[TaskInfosWithCount, TaskInfosWithCursor]:
         """
         Filters list of recognized task names against a white list of tasks names that are runnable.
 
         :param task_filter: optional filter parameters to use to filter results
-        :param pagination: optional pagination for the results (defaults to the first DEFAULT_PAGE_SIZE entries)
+        :param pagination: optional pagination for the results (defaults to the first DEFAULT_PAGE_SIZE entries). With
+            a CursorPagination, a TaskInfosWithCursor is returned instead.
 
         :return: TaskInfo on recognized tasks
         """
@@ -176,32 +618,64 @@ class TaskRegistry:
         mask = task_filter['mask']
         runnable_only = task_filter['runnable_only']
 
-        mask = mask.lower() if mask else None
-        offset = max(0, pagination['offset'])
-        limit = max(0, pagination['limit'])
+        with timed(METRIC_TASK_FILTER):
+            if "cursor" in pagination:
+                return self._get_task_infos_after(mask, runnable_only, pagination)
 
-        if mask:
-            matched_task_names = [task_name for task_name in self.task_names if mask in task_name.lower()]
-        else:
-            matched_task_names = self.task_names
+            offset = max(0, pagination['offset'])
+            limit = max(0, pagination['limit'])
 
-        if runnable_only and self.runnable_tasks is not None:
-            matched_task_names = [
-                task_name for task_name in matched_task_names
-                if task_name in self.runnable_tasks_set
-            ]
+            name_index = self._get_name_index()
+            matched_positions = name_index.find(mask, runnable_only=runnable_only)
 
-        return TaskInfosWithCount(
+            return TaskInfosWithCount(
+                task_infos=[
+                    TaskInfo(name=name_index.task_names[position], runnable=name_index.runnable_flags[position])
+                    for position in matched_positions[offset:offset+limit]
+                ],
+                count=len(matched_positions)
+            )
+
+    def _get_task_infos_after(
+        self, mask: Optional[str], runnable_only: bool, pagination: CursorPagination
+    ) -> TaskInfosWithCursor:
+        cursor = pagination['cursor']
+        limit = max(0, pagination['limit'])
+
+        name_index = self._get_name_index()
+        positions, has_more = name_index.find_after(
+            mask, decode_task_cursor(cursor) if cursor else None, limit, runnable_only=runnable_only
+        )
+
+        return TaskInfosWithCursor(
             task_infos=[
-                TaskInfo(
-                    name=task_name,
-                    runnable=(self.runnable_tasks is None) or (task_name in self.runnable_tasks_set)
-                )
-                for task_name in matched_task_names[offset:offset+limit]
+                TaskInfo(name=name_index.task_names[position], runnable=name_index.runnable_flags[position])
+                for position in positions
             ],
-            count=len(matched_task_names)
+            count=name_index.count(mask, runnable_only=runnable_only) if pagination['with_count'] else None,
+            next_cursor=encode_task_cursor(name_index.task_names[positions[-1]]) if has_more and positions else None,
         )
 
+    def _build_name_index(self, task_names: Sequence[str]) -> TaskNameIndex:
+        runnable_tasks = self.runnable_tasks_set if self.runnable_tasks is not None else None
+        if self.compact:
+            return CompactTaskNameIndex(task_names, runnable_tasks)
+        return TaskNameIndex(task_names, runnable_tasks)
+
+    def _get_name_index(self) -> TaskNameIndex:
+        catalog = self._get_catalog()
+        name_index = catalog.name_index
+        runnable_tasks = self.runnable_tasks_set if self.runnable_tasks is not None else None
+        if name_index.runnable_tasks != runnable_tasks:
+            # The shared index was built by a registry configured with different runnable tasks. Build this
+            # registry's own index once per catalog.
+            key = frozenset(runnable_tasks) if runnable_tasks is not None else None
+            other_name_index = catalog.other_name_indexes.get(key)
+            if other_name_index is None:
+                other_name_index = catalog.other_name_indexes[key] = self._build_name_index(name_index.task_names)
+            name_index = other_name_index
+        return name_index
+
     def get_task_info(self, task_name: str) -> Optional[TaskInfo]:
         """
         Filters list of recognized task names against an exact task name.
@@ -216,7 +690,7 @@ class TaskRegistry:
         if task:
             task_info = TaskInfo(
                 name=task_name,
-                runnable=(self.runnable_tasks is None) or (task_name in self.runnable_tasks)
+                runnable=self._is_runnable(task_name)
             )
         return task_info
 
@@ -239,11 +713,80 @@ class TaskRegistry:
 
         :return: the parameters extracted (can be empty)
         """
+        return list(self._get_task_parameters(self._get_catalog(), task_name))
+
+    def _get_task_parameters(self, catalog: TaskCatalog, task_name: str) -> List[TaskParameter]:
+        parameters = catalog.task_parameters.get(task_name)
+        if parameters is not None:
+            self.parameter_cache_stats["hits"] += 1
+            return parameters
+
+        self.parameter_cache_stats["misses"] += 1
         parameters = []
 
-        task = self.get_task(task_name)
+        task = catalog.tasks.get(task_name)
         if task:
-            signature = inspect.signature(task)
-            for _, parameter in signature.parameters.items():
-                parameters.append(TaskParameter.from_parameter(parameter))
+            with timed(METRIC_TASK_PARAMETERS):
+                signature = inspect.signature(task)
+                for _, parameter in signature.parameters.items():
+                    parameters.append(TaskParameter.from_parameter(parameter))
+
+            # Only cache parameters of known tasks so that lookups of bogus names can't grow the cache.
+            catalog.task_parameters[task_name] = parameters
         return parameters
+
+    def get_task_parameters_json(self, task_name: str) -> str:
+        """
+        Same as get_task_parameters() but returns the parameters already encoded as a JSON array. The encoded value
+        is cached until the registry is refreshed, so callers can splice it into a larger JSON document as-is.
+
+        :param task_name: the name of the Celery task
+
+        :return: the JSON-encoded parameters (can be "[]")
+        """
+        return self._get_task_parameters_json(self._get_catalog(), task_name)
+
+    def _get_task_parameters_json(self, catalog: TaskCatalog, task_name: str) -> str:
+        parameters_json = catalog.task_parameters_json.get(task_name)
+        if parameters_json is None:
+            parameters = self._get_task_parameters(catalog, task_name)
+            with timed(METRIC_JSON_ENCODE, {"what": "task_parameters"}):
+                parameters_json = json.dumps(parameters, cls=TaskParameter.json_encoder())
+            if task_name in catalog.tasks:
+                catalog.task_parameters_json[task_name] = parameters_json
+        return parameters_json
+
+    def get_task_arguments_validator(self, task_name: str) -> Optional["TaskArgumentsValidator"]:
+        """
+        Looks up the TaskArgumentsValidator for a task. It is compiled from the task parameters on first use and
+        cached until the registry is refreshed.
+
+        :param task_name: the name of the Celery task
+
+        :return: the validator (None if there is no such task)
+        """
+        return self._get_task_arguments_validator(self._get_catalog(), task_name)
+
+    def _get_task_arguments_validator(
+        self, catalog: TaskCatalog, task_name: str
+    ) -> Optional["TaskArgumentsValidator"]:
+        # Imported here since task_arguments builds on TaskParameter
+        from vcelerytaskrunner.services.task_arguments import TaskArgumentsValidator
+
+        validator = catalog.task_arguments_validators.get(task_name)
+        if validator is None and task_name in catalog.tasks:
+            validator = TaskArgumentsValidator(self._get_task_parameters(catalog, task_name))
+            catalog.task_arguments_validators[task_name] = validator
+        return validator
+
+    def get_parameter_cache_info(self) -> ParameterCacheInfo:
+        """
+        Reports how effective the cache of task parameters has been.
+
+        :return: hit/miss counts since the process started and the number of tasks currently cached
+        """
+        return ParameterCacheInfo(
+            hits=self.parameter_cache_stats["hits"],
+            misses=self.parameter_cache_stats["misses"],
+            size=len(self.catalog.task_parameters) if self.catalog is not None else 0,
+        )
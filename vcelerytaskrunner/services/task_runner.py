@@ -1,35 +1,159 @@
+import asyncio
+import functools
+import gc
 import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import Any, Dict, Optional, Callable, List
+from typing import Any, Dict, Optional, Callable, List, Set, Tuple, Union
+try:
+    from typing_extensions import TypedDict
+except:
+    from typing import TypedDict
 
+from asgiref.sync import sync_to_async
 from celery.result import AsyncResult
 from django import dispatch
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
+from django.db import close_old_connections
 from django.dispatch import receiver
 
 from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.launch_guard import (
+    RateLimitExceeded,
+    check_rate_limits,
+    claim_task_run,
+    get_idempotency_key,
+    get_idempotency_window,
+    refund_rate_limits,
+    release_task_run,
+)
+from vcelerytaskrunner.services.metrics import METRIC_SIGNAL_DISPATCH, METRIC_TASK_PUBLISH, timed
 from vcelerytaskrunner.services.task_registry import (
     TaskRegistry,
     TaskInfo,
     LimitOffsetPagination,
+    CursorPagination,
     TaskInfosWithCount,
+    TaskInfosWithCursor,
     TaskFilter,
 )
 
 logger = logging.getLogger(__name__)
 
+
+def _get_runnable_tasks_setting() -> Optional[Set[str]]:
+    runnable_tasks = getattr(settings, "VCELERY_TASKRUN_RUNNABLE_TASKS", None)
+    if runnable_tasks:
+        runnable_tasks = set(runnable_tasks)
+    return runnable_tasks
+
+
+def _create_task_registry(runnable_tasks: Optional[Set[str]]) -> TaskRegistry:
+    return TaskRegistry(
+        CELERY_APP,
+        runnable_tasks,
+        force_autodiscovery=getattr(settings, "VCELERY_TASKRUN_FORCE_AUTODISCOVERY", True),
+        compact=getattr(settings, "VCELERY_TASKRUN_COMPACT_CATALOG", False),
+    )
+
+
 CELERY_APP = settings.VCELERY_TASKRUN_CELERY_APP
-RUNNABLE_TASKS = getattr(settings, "VCELERY_TASKRUN_RUNNABLE_TASKS", None)
-if RUNNABLE_TASKS:
-    RUNNABLE_TASKS = set(RUNNABLE_TASKS)
+RUNNABLE_TASKS = _get_runnable_tasks_setting()
+
+TASK_REGISTRY = _create_task_registry(RUNNABLE_TASKS)
+"""
+The process-wide TaskRegistry as of import time. Prefer get_task_registry(), which also reflects reload_task_registry().
+Tasks are discovered on first use rather than at import time.
+"""
+
+_task_registry_lock = threading.Lock()
+
+
+def get_task_registry() -> TaskRegistry:
+    """
+    Returns the process-wide TaskRegistry. It is created once and shared by all requests, so nothing on the request
+    path needs to build registry state.
+
+    :return: the TaskRegistry configured by VCELERY_TASKRUN_CELERY_APP and VCELERY_TASKRUN_RUNNABLE_TASKS
+    """
+    return TASK_REGISTRY
+
+
+def reload_task_registry(warm_parameters: bool = False) -> TaskRegistry:
+    """
+    Rebuilds the process-wide TaskRegistry from the Celery app and the current VCELERY_TASKRUN_RUNNABLE_TASKS setting.
+    Concurrent reloads are serialized, and requests in flight keep using the previous catalog until the new one is
+    swapped in (see TaskRegistry.refresh()).
+
+    :param warm_parameters: True to also extract the parameters of all tasks before the new catalog is swapped in
+
+    :return: the new TaskRegistry (also returned by get_task_registry() from now on)
+    """
+    global TASK_REGISTRY, RUNNABLE_TASKS
+
+    with _task_registry_lock:
+        runnable_tasks = _get_runnable_tasks_setting()
+        task_registry = _create_task_registry(runnable_tasks)
+        task_registry.refresh(warm_parameters=warm_parameters)
 
-TASK_REGISTRY = TaskRegistry(CELERY_APP, RUNNABLE_TASKS)
+        RUNNABLE_TASKS = runnable_tasks
+        TASK_REGISTRY = task_registry
+    return task_registry
+
+
+def preload_task_registry(warm_parameters: bool = True) -> TaskRegistry:
+    """
+    Builds the process-wide task catalog in the master process of a preforking server (e.g. from gunicorn's when_ready
+    hook with preload_app = True), so that the workers forked afterwards share it instead of each building their own.
+    Set VCELERY_TASKRUN_COMPACT_CATALOG = True so that the catalog is built in buffers whose memory pages stay shared
+    (see TaskRegistry._compact_catalog()).
+
+    The objects allocated so far are then moved out of reach of the garbage collector with gc.freeze(), so that
+    collections in the workers don't write to their pages either.
+
+    :param warm_parameters: True to also extract the parameters of all tasks and compile their validators
+
+    :return: the TaskRegistry (also returned by get_task_registry())
+    """
+    task_registry = reload_task_registry(warm_parameters=warm_parameters)
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    logger.info(f"Task registry preloaded ({len(task_registry.task_names)} task(s), compact={task_registry.compact})")
+    return task_registry
 
 
 TaskRunCallable = Callable[[str, str, List[Any], Dict[str, Any]], None]
 
+# Called with the (task name, task ID, args, kwargs) of each task launched by TaskRunner.run_tasks()
+TaskRunsCallable = Callable[[List[Tuple[str, str, List[Any], Dict[str, Any]]]], None]
+
+
+class TaskRunRequest(TypedDict):
+    """
+    One task to launch with TaskRunner.run_tasks() / run_and_record_many()
+    """
+    task: str
+    args: List[Any]
+    kwargs: Dict[str, Any]
+    delay: Optional[timedelta]
+
+
+class TaskRunResult(TypedDict):
+    """
+    Outcome of launching one TaskRunRequest: either task_id or error is set.
+    """
+    task: str
+    task_id: Optional[str]
+    error: Optional[str]
+
+
+TASK_RUN_SIGNAL_PER_ITEM = "item"
+TASK_RUN_SIGNAL_PER_BATCH = "batch"
+
 
 TaskRunSignal = dispatch.Signal()
 """
@@ -42,15 +166,30 @@ Signal to listen to for notifications of task run events. The kwargs provided to
     user - User who ran the task (can be None)
 """
 
+TaskRunBatchSignal = dispatch.Signal()
+"""
+Signal sent once per TaskRunner.run_tasks() call instead of TaskRunSignal for each task when
+VCELERY_TASKRUN_BULK_SIGNAL_MODE is "batch". The kwargs provided to listeners:
+
+    task_runs - list of dicts with the task_name, task_id, args and kwargs of each task launched
+    user - User who ran the tasks (can be None)
+"""
+
 
 class TaskRunner:
     """
     Run tasks with args and kwargs parameters.
     """
 
-    def __init__(self, task_registry: TaskRegistry, post_task_run: Optional[TaskRunCallable]):
+    def __init__(
+        self,
+        task_registry: TaskRegistry,
+        post_task_run: Optional[TaskRunCallable],
+        post_task_runs: Optional[TaskRunsCallable] = None,
+    ):
         self.task_registry = task_registry
         self.post_task_run = post_task_run
+        self.post_task_runs = post_task_runs
 
     def run_task(
         self,
@@ -58,7 +197,8 @@ class TaskRunner:
         args: List[Any],
         kwargs: Dict[str, Any],
         user: Optional[AbstractUser] = None,
-        delay: timedelta = None
+        delay: timedelta = None,
+        task_id: Optional[str] = None,
     ) -> AsyncResult:
         """
         Run a Celery task given its name and the parameters to pass to the task.
@@ -68,21 +208,97 @@ class TaskRunner:
         :param kwargs: optional keyword arguments (kwargs) to the task
         :param user: optional User running the task
         :param delay: optional timedelta indicating the time to delay before actually running the task
+        :param task_id: optional ID to launch the task with (generated by Celery by default)
 
         :return: an AsyncResult for the task run
         """
         task = self.task_registry.get_task(task_name)
         if task:
-            result = task.apply_async(args=args, kwargs=kwargs, countdown=delay.total_seconds() if delay else None)
-            TaskRunSignal.send_robust(
-                self.__class__, task_name=task_name, task_id=result.id, args=args, kwargs=kwargs, user=user
-            )
+            with timed(METRIC_TASK_PUBLISH, {"mode": "single"}):
+                result = task.apply_async(
+                    args=args, kwargs=kwargs, countdown=delay.total_seconds() if delay else None, task_id=task_id
+                )
+            with timed(METRIC_SIGNAL_DISPATCH, {"signal": "TaskRunSignal"}):
+                TaskRunSignal.send_robust(
+                    self.__class__, task_name=task_name, task_id=result.id, args=args, kwargs=kwargs, user=user
+                )
             if self.post_task_run:
                 self.post_task_run(task_name, result.id, args, kwargs)
         else:
             raise ValueError(f"No task found for name {task_name}")
         return result
 
+    def run_tasks(
+        self,
+        task_run_requests: List[TaskRunRequest],
+        user: Optional[AbstractUser] = None,
+        task_ids: Optional[List[Optional[str]]] = None,
+    ) -> List[TaskRunResult]:
+        """
+        Run several Celery tasks, publishing all of them through a single producer (and broker connection). A task
+        that cannot be launched doesn't prevent the others from being launched.
+
+        TaskRunSignal is sent for each task launched, or TaskRunBatchSignal once for all of them if the setting
+        VCELERY_TASKRUN_BULK_SIGNAL_MODE is "batch". post_task_runs (if any) is called once with all tasks launched.
+
+        :param task_run_requests: the tasks to run
+        :param user: optional User running the tasks
+        :param task_ids: optional IDs to launch the tasks with, in the same order as the requests (None to let Celery
+            generate the ID of a task)
+
+        :return: the outcome of each request, in the same order as the requests
+        """
+        signal_mode = getattr(settings, "VCELERY_TASKRUN_BULK_SIGNAL_MODE", TASK_RUN_SIGNAL_PER_ITEM)
+        results = []  # type: List[TaskRunResult]
+        task_runs = []  # type: List[Tuple[str, str, List[Any], Dict[str, Any]]]
+
+        with self.task_registry.celery_app.producer_or_acquire() as producer:
+            for i, task_run_request in enumerate(task_run_requests):
+                task_name = task_run_request["task"]
+                args = task_run_request.get("args") or []
+                kwargs = task_run_request.get("kwargs") or {}
+                delay = task_run_request.get("delay")
+                try:
+                    task = self.task_registry.get_task(task_name)
+                    if not task:
+                        raise ValueError(f"No task found for name {task_name}")
+
+                    with timed(METRIC_TASK_PUBLISH, {"mode": "bulk"}):
+                        result = task.apply_async(
+                            args=args,
+                            kwargs=kwargs,
+                            countdown=delay.total_seconds() if delay else None,
+                            producer=producer,
+                            task_id=task_ids[i] if task_ids else None,
+                        )
+                except Exception as e:
+                    logger.exception("Cannot run task %s with (args=%s, kwargs=%s): %s", task_name, args, kwargs, e)
+                    results.append(TaskRunResult(task=task_name, task_id=None, error=str(e)))
+                    continue
+
+                results.append(TaskRunResult(task=task_name, task_id=result.id, error=None))
+                task_runs.append((task_name, result.id, args, kwargs))
+                if signal_mode != TASK_RUN_SIGNAL_PER_BATCH:
+                    with timed(METRIC_SIGNAL_DISPATCH, {"signal": "TaskRunSignal"}):
+                        TaskRunSignal.send_robust(
+                            self.__class__, task_name=task_name, task_id=result.id, args=args, kwargs=kwargs, user=user
+                        )
+
+        if task_runs:
+            if signal_mode == TASK_RUN_SIGNAL_PER_BATCH:
+                with timed(METRIC_SIGNAL_DISPATCH, {"signal": "TaskRunBatchSignal"}):
+                    TaskRunBatchSignal.send_robust(
+                        self.__class__,
+                        task_runs=[
+                            {"task_name": task_name, "task_id": task_id, "args": args, "kwargs": kwargs}
+                            for task_name, task_id, args, kwargs in task_runs
+                        ],
+                        user=user,
+                    )
+            if self.post_task_runs:
+                self.post_task_runs(task_runs)
+        return results
+
 
 def run_and_record(
     task: str, args: List[Any], kwargs: Dict[str, Any], user: AbstractUser, delay: Optional[timedelta] = None
@@ -90,6 +306,13 @@ def run_and_record(
     """
     Helper function to run a task and record its running context as a TaskRunRecord.
 
+    Every launch goes through two guards, both disabled by default:
+
+    - with VCELERY_TASKRUN_IDEMPOTENCY_WINDOW set, launching the same task with the same arguments as the same user
+      again within that many seconds returns the AsyncResult of the first launch instead of launching another task,
+    - launches beyond VCELERY_TASKRUN_RATE_LIMIT_PER_USER / VCELERY_TASKRUN_RATE_LIMIT_PER_TASK raise
+      RateLimitExceeded.
+
     :param task: the task name
     :param args: optional position arguments to the task
     :param kwargs: optional keyword arguments (kwargs) to the task
@@ -97,21 +320,44 @@ def run_and_record(
     :param delay: optional timedelta indicating the time to delay before actually running the task
 
     :return: an AsyncResult for the task run
+    :raises RateLimitExceeded: if a rate limit is exceeded
     """
     if task:
         def on_task_post_run(task_name: str, task_id: str, args: List[Any], kwargs: Dict[str, Any]) -> None:
             TaskRunRecord.objects.record_run_task(task_name, task_id, args, kwargs, user=user)
 
-        logger.debug(f"runnable_tasks={RUNNABLE_TASKS}, task={task}")
-        if RUNNABLE_TASKS is not None and task not in RUNNABLE_TASKS:
+        task_registry = get_task_registry()
+        logger.debug(f"runnable_tasks={task_registry.runnable_tasks}, task={task}")
+        if task_registry.runnable_tasks is not None and task not in task_registry.runnable_tasks_set:
             raise ValidationError(f"task {task} is not runnable. Check task name and setting TASKRUN_RUNNABLE_TASKS.")
 
+        task_id = None
+        idempotency_key = None
+        idempotency_window = get_idempotency_window()
+        if idempotency_window:
+            task_id = str(uuid.uuid4())
+            idempotency_key = get_idempotency_key(task, args, kwargs, user)
+            existing_task_id = claim_task_run(idempotency_key, task_id, idempotency_window)
+            if existing_task_id:
+                logger.info(f"Task {task} already launched with the same arguments as task ID {existing_task_id}")
+                return AsyncResult(existing_task_id, app=task_registry.celery_app)
+
+        try:
+            check_rate_limits(task, user)
+        except RateLimitExceeded:
+            if idempotency_key:
+                release_task_run(idempotency_key, task_id)
+            raise
+
         try:
-            task_registry = TaskRegistry(CELERY_APP, RUNNABLE_TASKS)
             task_runner = TaskRunner(task_registry, post_task_run=on_task_post_run)
 
-            result = task_runner.run_task(task, args, kwargs, user=user, delay=delay)
+            result = task_runner.run_task(task, args, kwargs, user=user, delay=delay, task_id=task_id)
         except Exception as e:
+            # The task wasn't launched: a retry must neither get this task ID nor be charged for this launch.
+            if idempotency_key:
+                release_task_run(idempotency_key, task_id)
+            refund_rate_limits(task, user)
             logger.exception(
                 "Cannot run task %s with (args=%s, kwargs=%s): %s",
                 task, args, kwargs, e
@@ -122,6 +368,129 @@ def run_and_record(
     return result
 
 
+_launch_executor = None  # type: Optional[ThreadPoolExecutor]
+_launch_executor_lock = threading.Lock()
+
+
+def _get_launch_executor() -> Optional[ThreadPoolExecutor]:
+    global _launch_executor
+
+    max_workers = getattr(settings, "VCELERY_TASKRUN_ASYNC_LAUNCH_THREADS", 8)
+    if not max_workers:
+        return None
+    if _launch_executor is None:
+        with _launch_executor_lock:
+            if _launch_executor is None:
+                _launch_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vcelery-launch")
+    return _launch_executor
+
+
+def _run_and_record_in_executor(*args: Any, **kwargs: Any) -> AsyncResult:
+    # Like a request would: don't keep connections that are broken or past CONN_MAX_AGE in the pool's threads
+    close_old_connections()
+    try:
+        return run_and_record(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def arun_and_record(
+    task: str, args: List[Any], kwargs: Dict[str, Any], user: AbstractUser, delay: Optional[timedelta] = None
+) -> AsyncResult:
+    """
+    Async version of run_and_record() for async views.
+
+    Publishing to the broker (and recording the run, unless write-behind is enabled) is blocking I/O, so it runs in a
+    pool of VCELERY_TASKRUN_ASYNC_LAUNCH_THREADS (default 8) threads dedicated to launches. Launches beyond that wait
+    on the event loop without holding a thread, and they never queue behind the single thread that Django uses for
+    sync code under ASGI. With VCELERY_TASKRUN_ASYNC_LAUNCH_THREADS = 0, launches run on that thread instead
+    (sync_to_async()).
+
+    :return: an AsyncResult for the task run
+    :raises RateLimitExceeded: if a rate limit is exceeded
+    """
+    executor = _get_launch_executor()
+    if executor is None:
+        return await sync_to_async(run_and_record)(task, args, kwargs, user, delay=delay)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(_run_and_record_in_executor, task, args, kwargs, user, delay=delay)
+    )
+
+
+def run_and_record_many(task_run_requests: List[TaskRunRequest], user: AbstractUser) -> List[TaskRunResult]:
+    """
+    Bulk version of run_and_record(): runs several tasks over a single broker connection and records all the runs
+    with a single bulk INSERT of TaskRunRecords.
+
+    Each request goes through the same guards as run_and_record(): a request already launched within the idempotency
+    window gets the task ID of that launch, and a request beyond a rate limit gets an error (the requests before it
+    are still launched).
+
+    :param task_run_requests: the tasks to run
+    :param user: the User running the tasks (can be None if anonymous task run support is enabled)
+
+    :return: the outcome of each request (task ID or error message), in the same order as the requests
+    """
+    def on_task_post_runs(task_runs: List[Tuple[str, str, List[Any], Dict[str, Any]]]) -> None:
+        TaskRunRecord.objects.record_run_tasks(task_runs, user=user)
+
+    task_registry = get_task_registry()
+    results = [None] * len(task_run_requests)  # type: List[Optional[TaskRunResult]]
+    runnable_requests = []
+    runnable_indexes = []
+    runnable_task_ids = []  # type: List[Optional[str]]
+    idempotency_keys = {}  # type: Dict[int, Tuple[str, str]]
+    idempotency_window = get_idempotency_window()
+    for i, task_run_request in enumerate(task_run_requests):
+        task = task_run_request.get("task")
+        if not task:
+            results[i] = TaskRunResult(task=task, task_id=None, error="task name required")
+        elif task_registry.runnable_tasks is not None and task not in task_registry.runnable_tasks_set:
+            results[i] = TaskRunResult(
+                task=task,
+                task_id=None,
+                error=f"task {task} is not runnable. Check task name and setting TASKRUN_RUNNABLE_TASKS.",
+            )
+        else:
+            task_id = None
+            if idempotency_window:
+                task_id = str(uuid.uuid4())
+                idempotency_key = get_idempotency_key(
+                    task, task_run_request.get("args") or [], task_run_request.get("kwargs") or {}, user
+                )
+                existing_task_id = claim_task_run(idempotency_key, task_id, idempotency_window)
+                if existing_task_id:
+                    logger.info(f"Task {task} already launched with the same arguments as task ID {existing_task_id}")
+                    results[i] = TaskRunResult(task=task, task_id=existing_task_id, error=None)
+                    continue
+                idempotency_keys[i] = (idempotency_key, task_id)
+
+            try:
+                check_rate_limits(task, user)
+            except RateLimitExceeded as e:
+                if i in idempotency_keys:
+                    release_task_run(*idempotency_keys.pop(i))
+                results[i] = TaskRunResult(task=task, task_id=None, error=str(e))
+                continue
+
+            runnable_requests.append(task_run_request)
+            runnable_indexes.append(i)
+            runnable_task_ids.append(task_id)
+
+    if runnable_requests:
+        task_runner = TaskRunner(task_registry, post_task_run=None, post_task_runs=on_task_post_runs)
+        task_run_results = task_runner.run_tasks(runnable_requests, user=user, task_ids=runnable_task_ids)
+        for i, result in zip(runnable_indexes, task_run_results):
+            results[i] = result
+            if result["error"]:
+                if i in idempotency_keys:
+                    release_task_run(*idempotency_keys[i])
+                refund_rate_limits(result["task"], user)
+    return results
+
+
 @receiver(TaskRunSignal, sender=TaskRunner)
 def task_run_listener(sender, **kwargs):
     """
@@ -139,19 +508,18 @@ def task_run_listener(sender, **kwargs):
     )
 
 
-def get_task_infos(task_filter: TaskFilter, pagination: Optional[LimitOffsetPagination] = None
-) -> TaskInfosWithCount:
+def get_task_infos(
+    task_filter: TaskFilter, pagination: Optional[Union[LimitOffsetPagination, CursorPagination]] = None
+) -> Union[TaskInfosWithCount, TaskInfosWithCursor]:
     """
     Collects a list of runnable tasks' names and return them.
 
     :param task_filter: filtering parameters for tasks
-    :param pagination: optional pagination options
+    :param pagination: optional pagination options (offset-based or cursor-based)
 
     :return: tasks that can be run by run_and_record() function
     """
-    task_registry = TaskRegistry(CELERY_APP, RUNNABLE_TASKS)
-
-    return task_registry.get_task_infos(task_filter, pagination=pagination)
+    return get_task_registry().get_task_infos(task_filter, pagination=pagination)
 
 
 def get_task_info(task_name: str) -> Optional[TaskInfo]:
@@ -162,5 +530,4 @@ def get_task_info(task_name: str) -> Optional[TaskInfo]:
 
     :return: a TaskInfo if found
     """
-    task_registry = TaskRegistry(CELERY_APP, RUNNABLE_TASKS)
-    return task_registry.get_task_info(task_name)
+    return get_task_registry().get_task_info(task_name)
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+from celery import states
+from celery.backends.base import DisabledBackend, KeyValueStoreBackend
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+try:
+    from typing_extensions import TypedDict
+except:
+    from typing import TypedDict
+
+from vcelerytaskrunner.models import TaskRunRecord
+
+logger = logging.getLogger(__name__)
+
+
+TASK_STATUS_CACHE_KEY_PREFIX = "vcelery:task_status:"
+DEFAULT_TASK_STATUS_CACHE_TTL = 5
+
+
+class TaskRunStatus(TypedDict):
+    """
+    State of a task run
+    """
+    status: str  # one of celery.states
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    runtime: Optional[float]  # seconds
+
+
+def _get_cache():
+    return caches[getattr(settings, "VCELERY_TASK_STATUS_CACHE", "default")]
+
+
+def _get_cache_ttl() -> int:
+    return getattr(settings, "VCELERY_TASK_STATUS_CACHE_TTL", DEFAULT_TASK_STATUS_CACHE_TTL)
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if isinstance(value, datetime) and timezone.is_naive(value):
+        # Celery stores date_done in UTC
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value if isinstance(value, datetime) else None
+
+
+def get_backend_task_metas(backend, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Looks up the result metadata of several tasks in a Celery result backend. Key/value backends (Redis, memcached,
+    ...) are read with a single MGET. Other backends fall back to one lookup per task.
+
+    :param backend: the Celery result backend
+    :param task_ids: IDs of the tasks to look up
+
+    :return: the metadata ("status", "date_done", ...) by task ID of the tasks known to the backend
+    """
+    if not task_ids or isinstance(backend, DisabledBackend):
+        return {}
+
+    task_metas = {}
+    if isinstance(backend, KeyValueStoreBackend):
+        keys = [backend.get_key_for_task(task_id) for task_id in task_ids]
+        values = backend.mget(keys)
+        if hasattr(values, "items"):
+            values = [values.get(key) for key in keys]
+        for task_id, value in zip(task_ids, values):
+            if value:
+                task_metas[task_id] = backend.decode_result(value)
+    else:
+        for task_id in task_ids:
+            task_metas[task_id] = backend.get_task_meta(task_id)
+    return task_metas
+
+
+def _merge_status(task_run_record: Optional[TaskRunRecord], task_meta: Optional[Dict[str, Any]]) -> TaskRunStatus:
+    task_run_status = TaskRunStatus(status=states.PENDING, started_at=None, finished_at=None, runtime=None)
+    if task_run_record:
+        task_run_status.update(
+            status=task_run_record.status,
+            started_at=task_run_record.started_at,
+            finished_at=task_run_record.finished_at,
+            runtime=task_run_record.runtime,
+        )
+
+    # Keep whichever of the recorded and the backend states is further along (e.g. STARTED recorded by a worker vs.
+    # PENDING in a backend that doesn't track started tasks).
+    backend_status = (task_meta or {}).get("status")
+    if backend_status and states.state(backend_status) > states.state(task_run_status["status"]):
+        task_run_status["status"] = backend_status
+        if backend_status in states.READY_STATES:
+            finished_at = _to_datetime(task_meta.get("date_done"))
+            task_run_status["finished_at"] = finished_at
+            started_at = task_run_status["started_at"]
+            if started_at and finished_at:
+                task_run_status["runtime"] = (finished_at - started_at).total_seconds()
+    return task_run_status
+
+
+def get_task_run_statuses(task_ids: List[str], celery_app=None) -> Dict[str, TaskRunStatus]:
+    """
+    Returns the states of several task runs with as few round trips as possible:
+
+    1. statuses looked up within the last VCELERY_TASK_STATUS_CACHE_TTL seconds come from the Django cache
+       (VCELERY_TASK_STATUS_CACHE),
+    2. runs whose TaskRunRecord already has a final state (SUCCESS, FAILURE, REVOKED) come from the database,
+    3. the rest are looked up in the Celery result backend in one batch. Final states found there are saved on the
+       TaskRunRecords so that they are not looked up again.
+
+    :param task_ids: IDs of the tasks
+    :param celery_app: the Celery app whose result backend to use (defaults to VCELERY_TASKRUN_CELERY_APP)
+
+    :return: the status of each task by task ID. Tasks the backend doesn't know about are PENDING.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    cache = _get_cache()
+    cache_keys = {task_id: f"{TASK_STATUS_CACHE_KEY_PREFIX}{task_id}" for task_id in task_ids}
+    cached = cache.get_many(list(cache_keys.values()))
+    task_run_statuses = {
+        task_id: cached[cache_key] for task_id, cache_key in cache_keys.items() if cache_key in cached
+    }
+
+    missing_task_ids = [task_id for task_id in task_ids if task_id not in task_run_statuses]
+    if missing_task_ids:
+        task_run_records = {
+            task_run_record.task_id: task_run_record
+            for task_run_record in TaskRunRecord.objects.filter(task_id__in=missing_task_ids).only(
+                "pk", "task_id", "status", "started_at", "finished_at", "runtime"
+            )
+        }
+        unfinished_task_ids = [
+            task_id for task_id in missing_task_ids
+            if task_id not in task_run_records or task_run_records[task_id].status not in states.READY_STATES
+        ]
+
+        celery_app = celery_app or settings.VCELERY_TASKRUN_CELERY_APP
+        try:
+            task_metas = get_backend_task_metas(celery_app.backend, unfinished_task_ids)
+        except Exception as e:
+            logger.exception("Cannot look up the states of %d task(s): %s", len(unfinished_task_ids), e)
+            task_metas = {}
+
+        finished_records = []
+        found_statuses = {}
+        for task_id in missing_task_ids:
+            task_run_record = task_run_records.get(task_id)
+            task_run_status = _merge_status(task_run_record, task_metas.get(task_id))
+            found_statuses[task_id] = task_run_status
+
+            if task_run_record and task_run_status["status"] != task_run_record.status \
+                    and task_run_status["status"] in states.READY_STATES:
+                task_run_record.status = task_run_status["status"]
+                task_run_record.finished_at = task_run_status["finished_at"]
+                task_run_record.runtime = task_run_status["runtime"]
+                finished_records.append(task_run_record)
+
+        if finished_records:
+            TaskRunRecord.objects.bulk_update(finished_records, ["status", "finished_at", "runtime"])
+        cache.set_many(
+            {cache_keys[task_id]: task_run_status for task_id, task_run_status in found_statuses.items()},
+            timeout=_get_cache_ttl(),
+        )
+        task_run_statuses.update(found_statuses)
+
+    return {task_id: task_run_statuses[task_id] for task_id in task_ids}
@@ -0,0 +1,304 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from celery import states
+from celery.signals import task_failure, task_postrun, task_prerun, worker_process_shutdown, worker_shutdown
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from vcelerytaskrunner.services.batching import BackgroundBatcher, BatcherStats
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WORKER_UPDATES_BATCH_SIZE = 200
+DEFAULT_WORKER_UPDATES_FLUSH_INTERVAL_MS = 500
+DEFAULT_WORKER_UPDATES_MAX_QUEUE_SIZE = 10000
+DEFAULT_WORKER_UPDATES_MAX_STARTED_TASKS = 10000
+DEFAULT_WORKER_UPDATES_UNMATCHED_RETRY_SECONDS = 60
+
+UPDATABLE_FIELDS = ("status", "started_at", "finished_at", "runtime")
+
+# (task ID, {field: value}) to apply to the TaskRunRecord of the task
+TaskRunUpdate = Tuple[str, Dict[str, Any]]
+
+
+class TaskRunUpdaterStats(BatcherStats):
+    """
+    BatcherStats of a TaskRunRecordUpdater plus the time spent in the Celery signal handlers, i.e. the overhead added to
+    each task run on the worker
+    """
+    events: int
+    rows_updated: int
+    expired: int  # updates dropped because their TaskRunRecord wasn't saved within unmatched_retry_seconds
+    handler_seconds_total: float
+
+
+def coalesce_updates(task_run_updates: List[TaskRunUpdate]) -> Dict[str, Dict[str, Any]]:
+    """
+    Merges the updates of each task in order, so that e.g. the task_prerun and task_postrun updates of a short task end
+    up in a single row update.
+
+    :return: the fields to update by task ID
+    """
+    coalesced = {}  # type: Dict[str, Dict[str, Any]]
+    for task_id, fields in task_run_updates:
+        coalesced.setdefault(task_id, {}).update(fields)
+    return coalesced
+
+
+class TaskRunRecordUpdater:
+    """
+    Updates the status, started_at, finished_at and runtime of TaskRunRecords from Celery signals on the worker. The
+    updates are queued and applied by a background thread in batches, each batch as a single UPDATE statement:
+
+        UPDATE ... SET status = CASE WHEN task_id = ... THEN ... ELSE status END, ... WHERE task_id IN (...)
+
+    A task often starts (or even finishes) before the process that launched it has saved its TaskRunRecord, in
+    particular with write-behind of records. Updates matching no record are therefore retried with the following
+    batches for up to unmatched_retry_seconds, then dropped.
+
+    The start time of each running task is kept to compute its runtime, for at most max_started_tasks tasks: beyond
+    that, the oldest are forgotten (e.g. tasks whose worker was killed before task_postrun) and get no runtime.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval_ms: int,
+        max_queue_size: int,
+        max_started_tasks: int = DEFAULT_WORKER_UPDATES_MAX_STARTED_TASKS,
+        unmatched_retry_seconds: float = DEFAULT_WORKER_UPDATES_UNMATCHED_RETRY_SECONDS,
+    ):
+        self._batcher = BackgroundBatcher(
+            "vcelery-task-run-record-updater",
+            self._write,
+            batch_size=batch_size,
+            flush_interval=flush_interval_ms / 1000.0,
+            max_queue_size=max_queue_size,
+            flush_one=lambda task_run_update: self._write([task_run_update]),
+        )
+        self._started = OrderedDict()  # type: OrderedDict[str, Tuple[datetime, float]]
+        self._started_lock = threading.Lock()
+        self._max_started_tasks = max_started_tasks
+        # When updates of each task ID first matched no TaskRunRecord (time.monotonic())
+        self._unmatched_since = {}  # type: Dict[str, float]
+        self._unmatched_lock = threading.Lock()
+        self._unmatched_retry_seconds = unmatched_retry_seconds
+        self._stats_lock = threading.Lock()
+        self._events = 0
+        self._rows_updated = 0
+        self._expired = 0
+        self._handler_seconds_total = 0.0
+
+    def _write(self, task_run_updates: List[TaskRunUpdate]) -> List[TaskRunUpdate]:
+        """
+        :return: the updates to retry, because their TaskRunRecords don't exist yet
+        """
+        close_old_connections()
+        coalesced = coalesce_updates(task_run_updates)
+
+        updates = {}
+        for field in UPDATABLE_FIELDS:
+            whens = [
+                When(task_id=task_id, then=Value(fields[field]))
+                for task_id, fields in coalesced.items() if field in fields
+            ]
+            if whens:
+                updates[field] = Case(*whens, default=F(field))
+
+        task_run_record_model = apps.get_model("vcelerytaskrunner", "TaskRunRecord")
+        rows_updated = task_run_record_model.objects.filter(task_id__in=list(coalesced)).update(**updates)
+        with self._stats_lock:
+            self._rows_updated += rows_updated
+
+        if rows_updated >= len(coalesced) and not self._unmatched_since:
+            return []
+        matched_task_ids = set(coalesced) if rows_updated >= len(coalesced) else set(
+            task_run_record_model.objects.filter(task_id__in=list(coalesced)).values_list("task_id", flat=True)
+        )
+        return self._get_retries(coalesced, matched_task_ids)
+
+    def _get_retries(
+        self, coalesced: Dict[str, Dict[str, Any]], matched_task_ids: Set[str]
+    ) -> List[TaskRunUpdate]:
+        now = time.monotonic()
+        retries = []  # type: List[TaskRunUpdate]
+        expired = 0
+        with self._unmatched_lock:
+            for task_id, fields in coalesced.items():
+                if task_id in matched_task_ids:
+                    self._unmatched_since.pop(task_id, None)
+                elif now - self._unmatched_since.setdefault(task_id, now) < self._unmatched_retry_seconds:
+                    retries.append((task_id, fields))
+                else:
+                    del self._unmatched_since[task_id]
+                    expired += 1
+        if expired:
+            logger.warning(f"Dropped the updates of {expired} task(s) whose TaskRunRecord was never saved")
+            with self._stats_lock:
+                self._expired += expired
+        return retries
+
+    def _enqueue(self, task_id: str, fields: Dict[str, Any]):
+        if not self._batcher.put((task_id, fields)):
+            # Too many updates waiting: apply this one right away rather than drop it (it is not retried though).
+            self._write([(task_id, fields)])
+
+    def _measure(self, started_at: float):
+        with self._stats_lock:
+            self._events += 1
+            self._handler_seconds_total += time.perf_counter() - started_at
+
+    def on_task_prerun(self, task_id: str):
+        measure_started_at = time.perf_counter()
+        started_at = timezone.now()
+        with self._started_lock:
+            self._started[task_id] = (started_at, measure_started_at)
+            if len(self._started) > self._max_started_tasks:
+                self._started.popitem(last=False)
+        self._enqueue(task_id, {"status": states.STARTED, "started_at": started_at})
+        self._measure(measure_started_at)
+
+    def on_task_finished(self, task_id: str, state: Optional[str]):
+        measure_started_at = time.perf_counter()
+        fields = {"status": state or states.SUCCESS, "finished_at": timezone.now()}
+        with self._started_lock:
+            started = self._started.pop(task_id, None)
+        if started:
+            fields["runtime"] = measure_started_at - started[1]
+        self._enqueue(task_id, fields)
+        self._measure(measure_started_at)
+
+    def flush(self):
+        """
+        Blocks until every update queued so far is applied.
+        """
+        self._batcher.drain()
+
+    def stop(self):
+        """
+        Applies the updates still queued and stops the background thread.
+        """
+        self._batcher.stop()
+
+    def get_stats(self) -> TaskRunUpdaterStats:
+        """
+        :return: the BatcherStats of the updates (an item per signal), plus the number of signals handled, of rows
+            updated, of updates dropped because their TaskRunRecord was never saved and the total time spent in the
+            signal handlers
+        """
+        stats = self._batcher.get_stats()
+        with self._stats_lock:
+            return TaskRunUpdaterStats(
+                **stats,
+                events=self._events,
+                rows_updated=self._rows_updated,
+                expired=self._expired,
+                handler_seconds_total=self._handler_seconds_total,
+            )
+
+
+_updater = None  # type: Optional[TaskRunRecordUpdater]
+_updater_lock = threading.Lock()
+
+
+def get_task_run_record_updater() -> Optional[TaskRunRecordUpdater]:
+    """
+    Returns the process-wide TaskRunRecordUpdater if worker-side updates are enabled through the setting
+    VCELERY_TASK_RUN_RECORD_WORKER_UPDATES, e.g.:
+
+        VCELERY_TASK_RUN_RECORD_WORKER_UPDATES = {
+            "BATCH_SIZE": 200,  # maximum task events per UPDATE
+            "FLUSH_INTERVAL_MS": 500,  # maximum time an event waits before being applied
+            "MAX_QUEUE_SIZE": 10000,  # events are applied synchronously when this many are waiting
+            "MAX_STARTED_TASKS": 10000,  # running tasks whose start time is kept to compute their runtime
+            "UNMATCHED_RETRY_SECONDS": 60,  # how long updates wait for their TaskRunRecord to be saved
+        }
+
+    The updater (and its background thread) is created on first use, i.e. on the first task run by a worker process.
+
+    :return: the updater (None if worker-side updates are disabled)
+    """
+    global _updater
+
+    config = getattr(settings, "VCELERY_TASK_RUN_RECORD_WORKER_UPDATES", None)
+    if not config:
+        return None
+
+    if _updater is None:
+        with _updater_lock:
+            if _updater is None:
+                config = config if isinstance(config, dict) else {}
+                _updater = TaskRunRecordUpdater(
+                    batch_size=config.get("BATCH_SIZE", DEFAULT_WORKER_UPDATES_BATCH_SIZE),
+                    flush_interval_ms=config.get("FLUSH_INTERVAL_MS", DEFAULT_WORKER_UPDATES_FLUSH_INTERVAL_MS),
+                    max_queue_size=config.get("MAX_QUEUE_SIZE", DEFAULT_WORKER_UPDATES_MAX_QUEUE_SIZE),
+                    max_started_tasks=config.get("MAX_STARTED_TASKS", DEFAULT_WORKER_UPDATES_MAX_STARTED_TASKS),
+                    unmatched_retry_seconds=config.get(
+                        "UNMATCHED_RETRY_SECONDS", DEFAULT_WORKER_UPDATES_UNMATCHED_RETRY_SECONDS
+                    ),
+                )
+                # Processes forked by the prefork pool exit through os._exit(), skipping atexit: those are stopped from
+                # the worker_process_shutdown signal instead.
+                atexit.register(_updater.stop)
+                logger.info(f"Started worker-side updates of TaskRunRecords: {config}")
+    return _updater
+
+
+def _is_tracked(sender) -> bool:
+    runnable_tasks = getattr(settings, "VCELERY_TASKRUN_RUNNABLE_TASKS", None)
+    return not runnable_tasks or getattr(sender, "name", None) in runnable_tasks
+
+
+def _on_task_prerun(sender=None, task_id=None, **kwargs):
+    task_run_record_updater = get_task_run_record_updater()
+    if task_run_record_updater and task_id and _is_tracked(sender):
+        task_run_record_updater.on_task_prerun(task_id)
+
+
+def _on_task_postrun(sender=None, task_id=None, state=None, **kwargs):
+    task_run_record_updater = get_task_run_record_updater()
+    if task_run_record_updater and task_id and _is_tracked(sender):
+        task_run_record_updater.on_task_finished(task_id, state)
+
+
+def _on_task_failure(sender=None, task_id=None, **kwargs):
+    task_run_record_updater = get_task_run_record_updater()
+    if task_run_record_updater and task_id and _is_tracked(sender):
+        task_run_record_updater.on_task_finished(task_id, states.FAILURE)
+
+
+def _on_worker_shutdown(**kwargs):
+    # Only stop an updater this process created: a prefork pool's main process runs no tasks.
+    if _updater is not None:
+        _updater.stop()
+
+
+def connect_worker_signals():
+    """
+    Connects the Celery task_prerun, task_postrun and task_failure signals to update TaskRunRecords, and the
+    worker_process_shutdown and worker_shutdown signals to apply the updates still queued when a pool process or the
+    worker exits. Does nothing unless VCELERY_TASK_RUN_RECORD_WORKER_UPDATES is set.
+
+    Call it from Celery's worker_init signal, so that only worker processes (and not e.g. web processes running tasks
+    eagerly) track task runs.
+    """
+    if not getattr(settings, "VCELERY_TASK_RUN_RECORD_WORKER_UPDATES", None):
+        return
+
+    task_prerun.connect(_on_task_prerun, weak=False, dispatch_uid="vcelery-task-run-record-prerun")
+    task_postrun.connect(_on_task_postrun, weak=False, dispatch_uid="vcelery-task-run-record-postrun")
+    task_failure.connect(_on_task_failure, weak=False, dispatch_uid="vcelery-task-run-record-failure")
+    worker_process_shutdown.connect(
+        _on_worker_shutdown, weak=False, dispatch_uid="vcelery-task-run-record-process-shutdown"
+    )
+    worker_shutdown.connect(_on_worker_shutdown, weak=False, dispatch_uid="vcelery-task-run-record-shutdown")
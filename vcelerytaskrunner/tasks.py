@@ -0,0 +1,27 @@
+import logging
+from typing import Optional
+
+from celery import shared_task
+
+from vcelerytaskrunner.services.record_pruning import (
+    DEFAULT_PRUNE_BATCH_SIZE,
+    get_prune_cutoff,
+    prune_task_run_records as _prune_task_run_records,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_task_run_records(batch_size: int = DEFAULT_PRUNE_BATCH_SIZE, max_batches: Optional[int] = None) -> int:
+    """
+    Celery (beat) task deleting TaskRunRecords older than VCELERY_TASK_RUN_RECORD_LONGEVITY.
+
+    :return: the number of records deleted
+    """
+    prune_before = get_prune_cutoff()
+    if prune_before is None:
+        logger.info("VCELERY_TASK_RUN_RECORD_LONGEVITY set to PERMANENT. Skipping pruning.")
+        return 0
+
+    return _prune_task_run_records(prune_before, batch_size=batch_size, max_batches=max_batches) or 0
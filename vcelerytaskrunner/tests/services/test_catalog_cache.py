@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from vcelerytaskrunner.services.catalog_cache import _get_catalog_key, _get_pointer_key, load_catalog
+from vcelerytaskrunner.services.task_registry import LazyTasks, TaskFilter, TaskRegistry
+from vcelerytaskrunner.services.task_runner import CELERY_APP
+
+
+@override_settings(VCELERY_TASKRUN_CATALOG_CACHE="default")
+class CatalogCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.catalog = TaskRegistry.catalog
+        TaskRegistry.catalog = None
+        self.addCleanup(setattr, TaskRegistry, "catalog", self.catalog)
+
+    def _create_task_registry(self, runnable_tasks=None) -> TaskRegistry:
+        return TaskRegistry(CELERY_APP, runnable_tasks, force_autodiscovery=False)
+
+    def test_refresh_publishes_catalog(self):
+        published = self._create_task_registry().refresh()
+
+        cached_catalog = load_catalog(CELERY_APP.main, None)
+        self.assertEqual(cached_catalog["version"], published.version)
+        self.assertEqual(cached_catalog["task_names"], published.task_names)
+        self.assertTrue(all(cached_catalog["runnable_flags"]))
+        self.assertEqual(set(cached_catalog["task_parameters_json"]), set(published.task_names))
+
+    def test_load_instead_of_discovering(self):
+        published = self._create_task_registry().refresh()
+        task_name = "vcelerydev.tasks.process_incoming_payment"
+        parameters_json = published.task_parameters_json[task_name]
+        TaskRegistry.catalog = None
+
+        task_registry = self._create_task_registry()
+        with mock.patch.object(TaskRegistry, "_refresh_locked") as refresh_locked:
+            misses = task_registry.get_parameter_cache_info()["misses"]
+            self.assertEqual(task_registry.get_task_parameters_json(task_name), parameters_json)
+            self.assertEqual(task_registry.get_task_infos(TaskFilter(mask="payment", runnable_only=False))["count"], 1)
+            self.assertEqual(task_registry.get_parameter_cache_info()["misses"], misses)
+        refresh_locked.assert_not_called()
+
+        catalog = task_registry.catalog
+        self.assertIsInstance(catalog.tasks, LazyTasks)
+        self.assertEqual(catalog.version, published.version)
+        self.assertEqual(catalog.task_names, published.task_names)
+        # The live task is resolved on lookup
+        self.assertIs(task_registry.get_task(task_name), CELERY_APP.tasks[task_name])
+        self.assertIsNone(task_registry.get_task("no.such.task"))
+        self.assertEqual([p.name for p in task_registry.get_task_parameters(task_name)], ["payer", "payment"])
+
+    def test_catalog_per_runnable_tasks(self):
+        self._create_task_registry().refresh()
+        TaskRegistry.catalog = None
+
+        self.assertIsNone(load_catalog(CELERY_APP.main, {"vcelerydev.tasks.say_hello"}))
+        task_registry = self._create_task_registry({"vcelerydev.tasks.say_hello"})
+        self.assertNotIsInstance(task_registry.tasks, LazyTasks)
+        self.assertEqual(load_catalog(CELERY_APP.main, {"vcelerydev.tasks.say_hello"})["runnable_flags"].count(True), 1)
+
+    def test_evicted_catalog(self):
+        published = self._create_task_registry().refresh()
+        caches["default"].delete(_get_catalog_key(_get_pointer_key(CELERY_APP.main, None), published.version))
+        TaskRegistry.catalog = None
+
+        task_registry = self._create_task_registry()
+        self.assertNotIsInstance(task_registry.tasks, LazyTasks)
+
+    def test_catalog_per_code_version(self):
+        with override_settings(VCELERY_TASKRUN_CATALOG_CACHE_VERSION="release-1"):
+            self._create_task_registry().refresh()
+            self.assertIsNotNone(load_catalog(CELERY_APP.main, None))
+        with override_settings(VCELERY_TASKRUN_CATALOG_CACHE_VERSION="release-2"):
+            self.assertIsNone(load_catalog(CELERY_APP.main, None))
+
+    def test_catalog_lacking_registered_task(self):
+        published = self._create_task_registry().refresh()
+        cached_catalog = load_catalog(CELERY_APP.main, None)
+        cached_catalog["task_names"] = [
+            task_name for task_name in published.task_names if task_name != "vcelerydev.tasks.say_hello"
+        ]
+        catalog_key = _get_catalog_key(_get_pointer_key(CELERY_APP.main, None), published.version)
+        caches["default"].set(catalog_key, cached_catalog)
+        TaskRegistry.catalog = None
+
+        task_registry = self._create_task_registry()
+        self.assertNotIsInstance(task_registry.tasks, LazyTasks)
+        self.assertIn("vcelerydev.tasks.say_hello", task_registry.task_names)
+
+
+class LazyTasksTests(SimpleTestCase):
+
+    def test_discovers_missing_tasks_once(self):
+        celery_app = mock.Mock(tasks={"app.tasks.one": "one"})
+        celery_app.autodiscover_tasks.side_effect = lambda force: celery_app.tasks.update({"app.tasks.two": "two"})
+        tasks = LazyTasks(celery_app, ["app.tasks.one", "app.tasks.two"], force_autodiscovery=True)
+
+        self.assertEqual(tasks["app.tasks.one"], "one")
+        self.assertIsNone(tasks.get("no.such.task"))
+        celery_app.autodiscover_tasks.assert_not_called()
+
+        self.assertEqual(tasks["app.tasks.two"], "two")
+        self.assertIn("app.tasks.two", tasks)
+        self.assertEqual(list(tasks), ["app.tasks.one", "app.tasks.two"])
+        celery_app.autodiscover_tasks.assert_called_once_with(force=True)
@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from vcelerytaskrunner.services.compact_catalog import Bitset, CompactJsonMap, CompactStrings
+from vcelerytaskrunner.services.task_index import CompactTaskNameIndex
+from vcelerytaskrunner.services.task_registry import (
+    CursorPagination, LazyTasks, LimitOffsetPagination, TaskFilter, TaskRegistry,
+)
+from vcelerytaskrunner.services.task_runner import CELERY_APP, preload_task_registry, reload_task_registry
+
+
+class CompactStructuresTests(SimpleTestCase):
+
+    def test_compact_strings(self):
+        values = ["b", "", "ccc", "dé"]
+        strings = CompactStrings(values)
+
+        self.assertEqual(len(strings), 4)
+        self.assertEqual(list(strings), values)
+        self.assertEqual([strings[i] for i in range(-4, 4)], values + values)
+        self.assertEqual(strings[1:3], ["", "ccc"])
+        self.assertIn("ccc", strings)
+        with self.assertRaises(IndexError):
+            strings[4]
+
+    def test_bitset(self):
+        flags = [True, False, False, True, False, True, True, False, True]
+        bitset = Bitset(flags)
+
+        self.assertEqual(len(bitset.bits), 2)
+        self.assertEqual(list(bitset), flags)
+        self.assertIs(bitset[-1], True)
+        with self.assertRaises(IndexError):
+            bitset[9]
+
+    def test_compact_json_map(self):
+        json_map = CompactJsonMap(CompactStrings(["a", "b", "c"]), CompactStrings(["[]", "[1]", "[2]"]))
+
+        self.assertEqual(json_map["b"], "[1]")
+        self.assertIsNone(json_map.get("bb"))
+        self.assertIsNone(json_map.get("d"))
+        self.assertEqual(dict(json_map), {"a": "[]", "b": "[1]", "c": "[2]"})
+
+
+class CompactCatalogTests(SimpleTestCase):
+
+    def setUp(self):
+        self.catalog = TaskRegistry.catalog
+        self.addCleanup(setattr, TaskRegistry, "catalog", self.catalog)
+        self.runnable_tasks = {"vcelerydev.tasks.say_hello", "vcelerydev.tasks.process_incoming_payment"}
+
+    def _refresh(self, compact: bool) -> TaskRegistry:
+        task_registry = TaskRegistry(CELERY_APP, self.runnable_tasks, force_autodiscovery=False, compact=compact)
+        task_registry.refresh()
+        return task_registry
+
+    def test_same_answers_as_regular_catalog(self):
+        regular = self._refresh(compact=False)
+        regular_catalog = regular.catalog
+        compact = self._refresh(compact=True)
+
+        catalog = compact.catalog
+        self.assertIsInstance(catalog.task_names, CompactStrings)
+        self.assertIsInstance(catalog.name_index, CompactTaskNameIndex)
+        self.assertIsInstance(catalog.tasks, LazyTasks)
+        self.assertEqual(list(catalog.task_names), regular_catalog.task_names)
+        self.assertEqual(catalog.version, regular_catalog.version)
+
+        for task_filter in [
+            TaskFilter(mask=None, runnable_only=False),
+            TaskFilter(mask=None, runnable_only=True),
+            TaskFilter(mask="TASKS.s", runnable_only=False),
+            TaskFilter(mask="payment", runnable_only=True),
+        ]:
+            for pagination in [
+                LimitOffsetPagination(offset=1, limit=3),
+                CursorPagination(cursor=None, limit=2, with_count=True),
+            ]:
+                TaskRegistry.catalog = regular_catalog
+                expected = regular.get_task_infos(task_filter, pagination)
+                TaskRegistry.catalog = catalog
+                self.assertEqual(compact.get_task_infos(task_filter, pagination), expected)
+
+        task_name = "vcelerydev.tasks.process_incoming_payment"
+        TaskRegistry.catalog = regular_catalog
+        expected_parameters_json = regular.get_task_parameters_json(task_name)
+        TaskRegistry.catalog = catalog
+        self.assertEqual(compact.get_task_parameters_json(task_name), expected_parameters_json)
+        self.assertIs(compact.get_task(task_name), CELERY_APP.tasks[task_name])
+        self.assertIsNone(compact.get_task("no.such.task"))
+        self.assertEqual(compact.get_task_parameters_json("celery.backend_cleanup"), "[]")
+        self.assertIsNotNone(compact.get_task_arguments_validator(task_name))
+
+    @override_settings(VCELERY_TASKRUN_CATALOG_CACHE="default")
+    def test_load_cached_catalog_compacted(self):
+        caches["default"].clear()
+        published = self._refresh(compact=False).catalog
+        TaskRegistry.catalog = None
+
+        task_registry = TaskRegistry(CELERY_APP, self.runnable_tasks, force_autodiscovery=False, compact=True)
+        with mock.patch.object(TaskRegistry, "_refresh_locked") as refresh_locked:
+            self.assertEqual(list(task_registry.task_names), published.task_names)
+        refresh_locked.assert_not_called()
+        self.assertIsInstance(task_registry.catalog.name_index, CompactTaskNameIndex)
+        self.assertEqual(dict(task_registry.catalog.task_parameters_json), published.task_parameters_json)
+
+
+class PreloadTests(SimpleTestCase):
+
+    def tearDown(self):
+        reload_task_registry()
+
+    @override_settings(VCELERY_TASKRUN_COMPACT_CATALOG=True)
+    def test_preload_task_registry(self):
+        with mock.patch("vcelerytaskrunner.services.task_runner.gc") as gc:
+            task_registry = preload_task_registry(warm_parameters=True)
+
+        gc.freeze.assert_called_once_with()
+        self.assertTrue(task_registry.compact)
+        catalog = task_registry.catalog
+        self.assertIsInstance(catalog.name_index, CompactTaskNameIndex)
+        self.assertEqual(set(catalog.task_arguments_validators), set(catalog.task_names))
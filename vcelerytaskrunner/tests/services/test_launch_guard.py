@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.launch_guard import RateLimitExceeded, parse_rate
+from vcelerytaskrunner.services.task_runner import run_and_record
+
+
+class LaunchGuardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="launcher", is_superuser=True)
+        self.other_user = User.objects.create(username="other")
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("10/m"), (10, 60))
+        self.assertEqual(parse_rate("100/hour"), (100, 3600))
+        with self.assertRaises(ValueError):
+            parse_rate("10 per minute")
+
+    @override_settings(VCELERY_TASKRUN_RATE_LIMIT_PER_USER="2/m")
+    def test_rate_limit_per_user(self):
+        run_and_record("vcelerydev.tasks.say_hello", ["a"], {}, self.user)
+        run_and_record("vcelerydev.tasks.count_for_me", ["b", 1], {}, self.user)
+        with self.assertRaises(RateLimitExceeded) as cm:
+            run_and_record("vcelerydev.tasks.say_hello", ["c"], {}, self.user)
+        self.assertGreater(cm.exception.retry_after, 0)
+
+        run_and_record("vcelerydev.tasks.say_hello", ["d"], {}, self.other_user)
+        self.assertEqual(TaskRunRecord.objects.count(), 3)
+
+    @override_settings(VCELERY_TASKRUN_RATE_LIMIT_PER_TASK={"vcelerydev.tasks.say_hello": "1/h", "*": "100/m"})
+    def test_rate_limit_per_task(self):
+        run_and_record("vcelerydev.tasks.say_hello", ["a"], {}, self.user)
+        with self.assertRaises(RateLimitExceeded):
+            run_and_record("vcelerydev.tasks.say_hello", ["b"], {}, self.other_user)
+        run_and_record("vcelerydev.tasks.count_for_me", ["b", 1], {}, self.user)
+
+    @override_settings(VCELERY_TASKRUN_IDEMPOTENCY_WINDOW=60, VCELERY_TASKRUN_RATE_LIMIT_PER_USER="2/m")
+    def test_idempotency_window(self):
+        first = run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "a"}, self.user)
+        again = run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "a"}, self.user)
+        other_args = run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "b"}, self.user)
+        other_user = run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "a"}, self.other_user)
+
+        self.assertEqual(again.id, first.id)
+        self.assertNotEqual(other_args.id, first.id)
+        self.assertNotEqual(other_user.id, first.id)
+        # Duplicates neither create records nor use up the rate limit
+        self.assertEqual(TaskRunRecord.objects.count(), 3)
+        self.assertEqual(TaskRunRecord.objects.filter(task_id=first.id).count(), 1)
+
+    @override_settings(VCELERY_TASKRUN_IDEMPOTENCY_WINDOW=60)
+    def test_failed_launch_released(self):
+        with self.assertRaises(ValueError):
+            run_and_record("vcelerydev.tasks.no_such_task", ["a"], {}, self.user)
+        with self.assertRaises(ValueError):
+            run_and_record("vcelerydev.tasks.no_such_task", ["a"], {}, self.user)
+
+    @override_settings(VCELERY_TASKRUN_IDEMPOTENCY_WINDOW=60, VCELERY_TASKRUN_RATE_LIMIT_PER_USER="1/m")
+    def test_retry_after_failed_launch(self):
+        with mock.patch("celery.app.task.Task.apply_async", side_effect=ConnectionError("broker down")):
+            with self.assertRaises(ConnectionError):
+                run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "a"}, self.user)
+
+        # Neither the idempotency window nor the rate limit hold the failed launch against the retry
+        result = run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "a"}, self.user)
+        self.assertEqual(list(TaskRunRecord.objects.values_list("task_id", flat=True)), [result.id])
+        with self.assertRaises(RateLimitExceeded):
+            run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "b"}, self.user)
+
+    @override_settings(VCELERY_TASKRUN_RATE_LIMIT_PER_USER="1/m")
+    def test_form_view_reports_rate_limit(self):
+        self.client.force_login(self.user)
+        url = reverse("vcelery-task-run")
+        self.client.post(url, {"task": "vcelerydev.tasks.say_hello", "to_name": "a"})
+        response = self.client.post(url, {"task": "vcelerydev.tasks.say_hello", "to_name": "b"})
+
+        self.assertIn("Rate limit", response.cookies["error_message"].value)
+        self.assertEqual(TaskRunRecord.objects.count(), 1)
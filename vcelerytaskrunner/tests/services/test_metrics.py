@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from vcelerytaskrunner.services.metrics import (
+    METRIC_RECORD_WRITE,
+    METRIC_TASK_FILTER,
+    METRIC_TASK_PUBLISH,
+    InProcessMetrics,
+    NullMetrics,
+    get_metrics,
+    timed,
+)
+from vcelerytaskrunner.services.task_runner import get_task_infos, run_and_record
+from vcelerytaskrunner.services.task_registry import TaskFilter
+
+
+IN_PROCESS_METRICS = "vcelerytaskrunner.services.metrics.InProcessMetrics"
+
+
+class InProcessMetricsTests(TestCase):
+
+    def test_render_prometheus(self):
+        metrics = InProcessMetrics(buckets=(0.1, 1.0))
+        metrics.observe("vcelery_test_seconds", 0.05, {"mode": "a\"b"})
+        metrics.observe("vcelery_test_seconds", 0.5, {"mode": "a\"b"})
+        metrics.observe("vcelery_test_seconds", 5)
+
+        self.assertEqual(
+            metrics.render_prometheus().splitlines(),
+            [
+                "# HELP vcelery_test_seconds vcelery_test_seconds",
+                "# TYPE vcelery_test_seconds histogram",
+                'vcelery_test_seconds_bucket{le="0.1"} 0',
+                'vcelery_test_seconds_bucket{le="1.0"} 0',
+                'vcelery_test_seconds_bucket{le="+Inf"} 1',
+                "vcelery_test_seconds_sum 5.0",
+                "vcelery_test_seconds_count 1",
+                'vcelery_test_seconds_bucket{mode="a\\"b",le="0.1"} 1',
+                'vcelery_test_seconds_bucket{mode="a\\"b",le="1.0"} 2',
+                'vcelery_test_seconds_bucket{mode="a\\"b",le="+Inf"} 2',
+                'vcelery_test_seconds_sum{mode="a\\"b"} 0.55',
+                'vcelery_test_seconds_count{mode="a\\"b"} 2',
+            ]
+        )
+
+    def test_disabled_by_default(self):
+        self.assertIsInstance(get_metrics(), NullMetrics)
+        with timed(METRIC_TASK_FILTER):
+            pass
+
+
+@override_settings(VCELERY_TASKRUN_METRICS=IN_PROCESS_METRICS)
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="staff", is_staff=True, is_superuser=True)
+
+    def test_hot_paths_are_timed(self):
+        metrics = get_metrics()
+        self.assertIsInstance(metrics, InProcessMetrics)
+
+        get_task_infos(TaskFilter(mask="say", runnable_only=False))
+        run_and_record("vcelerydev.tasks.say_hello", [], {"to_name": "metrics"}, self.user)
+
+        content = metrics.render_prometheus()
+        self.assertIn(f"{METRIC_TASK_FILTER}_count 1", content)
+        self.assertIn(f'{METRIC_TASK_PUBLISH}_count{{mode="single"}} 1', content)
+        self.assertIn(f'{METRIC_RECORD_WRITE}_count{{mode="single"}} 1', content)
+
+    def test_metrics_api_view(self):
+        self.client.force_login(self.user)
+        get_task_infos(TaskFilter(mask=None, runnable_only=False))
+
+        response = self.client.get(reverse("vcelery-api-metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(f"# TYPE {METRIC_TASK_FILTER} histogram", response.content.decode())
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("vcelery-api-metrics")).status_code, 403)
+
+    @override_settings(VCELERY_TASKRUN_METRICS=None)
+    def test_metrics_api_view_disabled(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("vcelery-api-metrics")).status_code, 404)
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from vcelerytaskrunner.services.profiling import PROFILE_STORE, ProfilingConfig
+
+
+PROFILING = {"SAMPLE_RATE": 1.0, "TOP_N": 5, "RING_SIZE": 2}
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        PROFILE_STORE.clear()
+        self.user = User.objects.create(username="root", is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        PROFILE_STORE.clear()
+
+    @override_settings(VCELERY_TASKRUN_PROFILING=PROFILING)
+    def test_profile_runner_views(self):
+        for _ in range(3):
+            self.client.get("/api/tasks/")
+        self.client.get(reverse("vcelery-tasks"))
+        # Not a runner view
+        self.client.get("/admin/")
+
+        profiles = {profile["view"]: profile for profile in PROFILE_STORE.get_profiles()}
+
+        self.assertEqual(
+            set(profiles), {"vcelerytaskrunner.views.TasksAPIView", "vcelerytaskrunner.views.TasksView"}
+        )
+        tasks_api_profile = profiles["vcelerytaskrunner.views.TasksAPIView"]
+        self.assertEqual(tasks_api_profile["requests"], 3)
+        self.assertEqual(len(tasks_api_profile["samples"]), 2)
+        self.assertEqual(len(tasks_api_profile["functions"]), 5)
+        self.assertEqual(len(tasks_api_profile["samples"][0]["functions"]), 5)
+        total_times = [function["total_time"] for function in tasks_api_profile["functions"]]
+        self.assertEqual(total_times, sorted(total_times, reverse=True))
+
+    def test_disabled(self):
+        self.client.get("/api/tasks/")
+        self.assertEqual(PROFILE_STORE.get_profiles(), [])
+
+    def test_aggregation_is_bounded(self):
+        config = ProfilingConfig(sample_rate=1.0, top_n=2, ring_size=3)
+        for request in range(10):
+            stats = {(f"module{request}.py", line, "f"): (1, 0.001 * line, 0.001 * line) for line in range(20)}
+            PROFILE_STORE.add("view", "/path/", 0.1, stats, config)
+
+        profile = PROFILE_STORE.get_profiles(top_n=2)[0]
+        self.assertEqual(profile["requests"], 10)
+        self.assertEqual(len(profile["samples"]), 3)
+        self.assertEqual(
+            [function["function"] for function in profile["functions"]], ["module0.py:19(f)", "module1.py:19(f)"]
+        )
+
+    @override_settings(VCELERY_TASKRUN_PROFILING=PROFILING)
+    def test_profiles_view(self):
+        self.client.get("/api/tasks/")
+
+        response = self.client.get(reverse("vcelery-profiles"))
+        self.assertContains(response, "vcelerytaskrunner.views.TasksAPIView")
+
+        data = self.client.get(reverse("vcelery-profiles"), {"format": "json"}).json()
+        self.assertTrue(data["enabled"])
+        self.assertIn("vcelerytaskrunner.views.TasksAPIView", [profile["view"] for profile in data["profiles"]])
+
+        self.user.is_superuser = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("vcelery-profiles")).status_code, 403)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from vcelerytaskrunner.models import TaskRunRecord
+
+
+class ArchiveTaskRunRecordsTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = User.objects.create(username="archivist")
+        TaskRunRecord.objects.record_run_tasks(
+            [("vcelerydev.tasks.say_hello", f"old-{i}", [f"name-{i}"], {"n": i}) for i in range(5)], user=self.user
+        )
+        TaskRunRecord.objects.filter(task_id__startswith="old").update(created_at=self.now - timedelta(days=10))
+        TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "new", [], {})
+        self.old_records = {
+            record.task_id: record for record in TaskRunRecord.objects.filter(task_id__startswith="old")
+        }
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _archive_and_import(self, file_name: str):
+        path = os.path.join(self.tmpdir.name, file_name)
+        before = (self.now - timedelta(days=1)).isoformat()
+        call_command("archive_task_run_records", path, before=before, chunk_size=2, stdout=open(os.devnull, "w"))
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(list(TaskRunRecord.objects.values_list("task_id", flat=True)), ["new"])
+
+        call_command("import_task_run_records", path, batch_size=2, stdout=open(os.devnull, "w"))
+        # Importing again doesn't duplicate records
+        call_command("import_task_run_records", path, batch_size=2, stdout=open(os.devnull, "w"))
+
+        imported = {record.task_id: record for record in TaskRunRecord.objects.filter(task_id__startswith="old")}
+        self.assertEqual(set(imported), set(self.old_records))
+        for task_id, record in imported.items():
+            old_record = self.old_records[task_id]
+            self.assertEqual(record.created_at, old_record.created_at)
+            self.assertEqual(record.run_by, self.user)
+            self.assertEqual(record.get_run_args(), old_record.get_run_args())
+            self.assertEqual(record.run_args_hash, old_record.run_args_hash)
+
+    def test_jsonl(self):
+        self._archive_and_import("records.jsonl.gz")
+
+    def test_csv(self):
+        self._archive_and_import("records.csv")
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.record_pruning import (
+    PRUNE_LOCK_CACHE_KEY,
+    get_prune_cutoff,
+    prune_task_run_records,
+)
+
+
+class PruneTaskRunRecordsTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        for i in range(5):
+            TaskRunRecord.objects.create(task_name="old", task_id=f"old-{i}", run_with="")
+        TaskRunRecord.objects.create(task_name="new", task_id="new", run_with="")
+        TaskRunRecord.objects.filter(task_name="old").update(created_at=self.now - timedelta(days=10))
+
+    def test_prune_in_batches(self):
+        deleted = prune_task_run_records(self.now - timedelta(days=1), batch_size=2)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(list(TaskRunRecord.objects.values_list("task_name", flat=True)), ["new"])
+
+    def test_prune_resumes(self):
+        self.assertEqual(prune_task_run_records(self.now - timedelta(days=1), batch_size=2, max_batches=1), 2)
+        self.assertEqual(prune_task_run_records(self.now - timedelta(days=1), batch_size=2), 3)
+        self.assertEqual(TaskRunRecord.objects.count(), 1)
+
+    def test_prune_skipped_when_locked(self):
+        cache.set(PRUNE_LOCK_CACHE_KEY, "someone else")
+        try:
+            self.assertIsNone(prune_task_run_records(self.now - timedelta(days=1)))
+        finally:
+            cache.delete(PRUNE_LOCK_CACHE_KEY)
+        self.assertEqual(TaskRunRecord.objects.count(), 6)
+
+    @override_settings(VCELERY_TASK_RUN_RECORD_LONGEVITY="PERMANENT")
+    def test_permanent_records(self):
+        self.assertIsNone(get_prune_cutoff())
+
+    @override_settings(VCELERY_TASK_RUN_RECORD_LONGEVITY=timedelta(days=3))
+    def test_cutoff(self):
+        cutoff = get_prune_cutoff()
+        self.assertAlmostEqual(cutoff.timestamp(), (timezone.now() - timedelta(days=3)).timestamp(), delta=60)
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.batching import BackgroundBatcher
+from vcelerytaskrunner.services.record_writer import get_task_run_record_writer
+
+
+class TaskRunRecordWriterTests(TransactionTestCase):
+
+    @override_settings(VCELERY_TASK_RUN_RECORD_WRITE_BEHIND={"BATCH_SIZE": 3, "FLUSH_INTERVAL_MS": 10})
+    def test_write_behind(self):
+        writer = get_task_run_record_writer()
+        self.assertIsNotNone(writer)
+        stats_before = writer.get_stats()
+
+        for i in range(5):
+            task_run_record = TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", f"id-{i}", [], {})
+            self.assertIsNone(task_run_record.pk)
+        writer.flush()
+
+        self.assertEqual(TaskRunRecord.objects.count(), 5)
+        stats = writer.get_stats()
+        self.assertEqual(stats["flushed"] - stats_before["flushed"], 5)
+        self.assertGreaterEqual(stats["flushes"] - stats_before["flushes"], 2)
+
+    @override_settings(VCELERY_TASK_RUN_RECORD_WRITE_BEHIND={"BATCH_SIZE": 3, "FLUSH_INTERVAL_MS": 1000})
+    def test_failed_batch_loses_only_bad_record(self):
+        writer = get_task_run_record_writer()
+        stats_before = writer.get_stats()
+
+        for task_id in ("id-0", "id-bad", "id-1"):
+            task_run_record = TaskRunRecord(task_name="vcelerydev.tasks.say_hello", task_id=task_id)
+            if task_id == "id-bad":
+                # No such user: the foreign key constraint fails the bulk insert of the whole batch
+                task_run_record.run_by_id = 999999
+            writer.enqueue(task_run_record)
+        writer.flush()
+
+        self.assertEqual(sorted(TaskRunRecord.objects.values_list("task_id", flat=True)), ["id-0", "id-1"])
+        stats = writer.get_stats()
+        self.assertEqual(stats["flushed"] - stats_before["flushed"], 2)
+        self.assertEqual(stats["failed"] - stats_before["failed"], 1)
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_task_run_record_writer())
+
+        task_run_record = TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "id", [], {})
+        self.assertIsNotNone(task_run_record.pk)
+
+
+class BackgroundBatcherTests(SimpleTestCase):
+
+    def test_full_queue_rejects(self):
+        release = threading.Event()
+        batches = []
+
+        def flush(batch):
+            release.wait(timeout=5)
+            batches.append(batch)
+
+        batcher = BackgroundBatcher("test-batcher", flush, batch_size=1, flush_interval=0.01, max_queue_size=1)
+        try:
+            self.assertTrue(batcher.put(1))
+            # Wait for the first item to be taken by the (blocked) flush so that the queue can hold one more
+            while batcher.get_stats()["queue_size"]:
+                time.sleep(0.001)
+            self.assertTrue(batcher.put(2))
+            self.assertFalse(batcher.put(3))
+        finally:
+            release.set()
+            batcher.stop()
+
+        self.assertEqual(batches, [[1], [2]])
+        stats = batcher.get_stats()
+        self.assertEqual((stats["enqueued"], stats["rejected"], stats["flushed"]), (2, 1, 2))
+
+    def test_failed_batch_flushed_one_by_one(self):
+        flushed = []
+
+        def flush(batch):
+            if "bad" in batch:
+                raise ValueError("bad batch")
+            flushed.extend(batch)
+
+        def flush_one(item):
+            if item == "bad":
+                raise ValueError("bad item")
+            flushed.append(item)
+
+        batcher = BackgroundBatcher(
+            "test-batcher", flush, batch_size=3, flush_interval=1, max_queue_size=10, flush_one=flush_one
+        )
+        try:
+            for item in ("a", "bad", "b"):
+                self.assertTrue(batcher.put(item))
+            batcher.drain()
+        finally:
+            batcher.stop()
+
+        self.assertEqual(flushed, ["a", "b"])
+        stats = batcher.get_stats()
+        self.assertEqual((stats["flushed"], stats["failed"]), (2, 1))
+
+    def test_retries(self):
+        flushed = []
+        retried = set()
+
+        def flush(batch):
+            retries = [item for item in batch if item == "later" and item not in retried]
+            retried.update(retries)
+            flushed.extend(item for item in batch if item not in retries)
+            return retries
+
+        batcher = BackgroundBatcher("test-batcher", flush, batch_size=10, flush_interval=0.01, max_queue_size=10)
+        try:
+            batcher.put("now")
+            batcher.put("later")
+            batcher.drain()
+            deadline = time.monotonic() + 5
+            while "later" not in flushed and time.monotonic() < deadline:
+                time.sleep(0.005)
+        finally:
+            batcher.stop()
+
+        self.assertEqual(flushed, ["now", "later"])
+        stats = batcher.get_stats()
+        self.assertEqual((stats["flushed"], stats["retried"], stats["failed"]), (2, 1, 0))
@@ -0,0 +1,95 @@
+from datetime import datetime
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from pydantic import BaseModel
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.run_args import encode_run_args, parse_run_with
+
+
+class Payload(BaseModel):
+    name: str
+    count: int
+
+
+class RunArgsTests(SimpleTestCase):
+
+    def test_encode(self):
+        encoded = encode_run_args([Payload(name="x", count=1), datetime(2024, 1, 2)], {"tags": {"a"}})
+
+        self.assertEqual(
+            encoded["run_args"],
+            {"args": [{"name": "x", "count": 1}, "2024-01-02T00:00:00"], "kwargs": {"tags": ["a"]}},
+        )
+        self.assertIsNone(encoded["run_args_compressed"])
+        self.assertEqual(len(encoded["run_args_hash"]), 64)
+        self.assertEqual(
+            encoded["run_args_hash"],
+            encode_run_args([{"count": 1, "name": "x"}, "2024-01-02T00:00:00"], {"tags": ["a"]})["run_args_hash"],
+        )
+
+    @override_settings(
+        VCELERY_TASK_RUN_RECORD_ARGS_COMPRESS_THRESHOLD=100, VCELERY_TASK_RUN_RECORD_ARGS_MAX_SIZE=10000
+    )
+    def test_compress_and_truncate(self):
+        encoded = encode_run_args(["x" * 1000], {})
+        self.assertIsNone(encoded["run_args"])
+        self.assertIsNotNone(encoded["run_args_compressed"])
+        self.assertFalse(encoded["run_args_truncated"])
+        self.assertLessEqual(len(encoded["run_args_compressed"]), 100)
+
+        encoded = encode_run_args(["x" * 20000], {})
+        self.assertIsNone(encoded["run_args"])
+        self.assertIsNone(encoded["run_args_compressed"])
+        self.assertTrue(encoded["run_args_truncated"])
+        self.assertLessEqual(len(encoded["run_with"]), 1000)
+
+    def test_parse_run_with(self):
+        self.assertEqual(parse_run_with("args=[1, 'a'], kwargs={'b': 2}"), ([1, "a"], {"b": 2}))
+        self.assertEqual(parse_run_with("args=[', kwargs='], kwargs={}"), ([", kwargs="], {}))
+        self.assertIsNone(parse_run_with("args=[<object at 0x1>], kwargs={}"))
+        self.assertIsNone(parse_run_with(""))
+
+
+class TaskRunRecordRunArgsTests(TestCase):
+
+    @override_settings(VCELERY_TASK_RUN_RECORD_ARGS_COMPRESS_THRESHOLD=100)
+    def test_record_run_task(self):
+        small = TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "id-1", ["Alan"], {"n": 1})
+        large = TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "id-2", ["Alan" * 100], {})
+        TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "id-3", ["Alan"], {"n": 1})
+
+        small.refresh_from_db()
+        large.refresh_from_db()
+        self.assertEqual(small.get_run_args(), {"args": ["Alan"], "kwargs": {"n": 1}})
+        self.assertEqual(large.get_run_args(), {"args": ["Alan" * 100], "kwargs": {}})
+        self.assertEqual(
+            list(
+                TaskRunRecord.objects.filter_identical_runs("vcelerydev.tasks.say_hello", ["Alan"], {"n": 1})
+                .order_by("task_id")
+                .values_list("task_id", flat=True)
+            ),
+            ["id-1", "id-3"],
+        )
+
+    def test_data_migration(self):
+        TaskRunRecord.objects.bulk_create([
+            TaskRunRecord(task_name="t", task_id="parsable", run_with="args=['Alan'], kwargs={'n': 1}"),
+            TaskRunRecord(task_name="t", task_id="unparsable", run_with="args=[<object>], kwargs={}"),
+        ])
+
+        migration = import_module("vcelerytaskrunner.migrations.0003_task_run_args_data")
+        migration.forwards(apps, SimpleNamespace(connection=connection))
+
+        parsable = TaskRunRecord.objects.get(task_id="parsable")
+        self.assertEqual(parsable.get_run_args(), {"args": ["Alan"], "kwargs": {"n": 1}})
+        self.assertEqual(
+            parsable.run_args_hash, TaskRunRecord.objects.build_run_record("t", "", ["Alan"], {"n": 1}).run_args_hash
+        )
+        unparsable = TaskRunRecord.objects.get(task_id="unparsable")
+        self.assertIsNone(unparsable.get_run_args())
+        self.assertEqual(unparsable.run_args_hash, "")
@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+from inspect import Parameter
+from typing import Dict, List, Literal
+
+from django.test import TestCase
+
+from vcelerydev.models.payment import Payment
+from vcelerytaskrunner.services.task_arguments import (
+    TaskArgumentsError,
+    TaskArgumentsValidator,
+)
+from vcelerytaskrunner.services.task_registry import TaskParameter
+from vcelerytaskrunner.services.task_runner import get_task_registry
+
+
+class Meters:
+    """
+    A class pydantic doesn't know
+    """
+
+    def __init__(self, value):
+        self.value = float(value)
+
+
+class TaskArgumentsValidatorTests(TestCase):
+
+    PARAMS = [
+        TaskParameter(name="my_name", annotation=str),
+        TaskParameter(name="count_to", annotation=int),
+        TaskParameter(name="step", annotation=int, default="1"),
+    ]
+
+    @staticmethod
+    def _validate_value(annotation, value):
+        args, _ = TaskArgumentsValidator([TaskParameter(name="value", annotation=annotation)]).validate([value], {})
+        return args[0]
+
+    def test_validate_values(self):
+        self.assertEqual(self._validate_value(int, "3"), 3)
+        self.assertEqual(self._validate_value(List[int], "[1, 2]"), [1, 2])
+        self.assertEqual(self._validate_value(Parameter.empty, "3"), "3")
+        self.assertEqual(
+            self._validate_value(datetime, "2024-01-02T03:04:05Z"), datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        payment = self._validate_value(Payment, {"amount": 1, "method": "CASH", "payment_dt": "2024-01-02T03:04:05Z"})
+        self.assertIsInstance(payment, Payment)
+
+        for annotation, value in ((int, "three"), (int, [3]), (Payment, {"amount": 0})):
+            with self.assertRaises(TaskArgumentsError):
+                self._validate_value(annotation, value)
+
+    def test_validate(self):
+        validator = TaskArgumentsValidator(self.PARAMS)
+
+        self.assertEqual(validator.validate(["me", "3"], {}), (["me", 3], {}))
+        self.assertEqual(validator.validate(["me"], {"count_to": 3, "step": "2"}), (["me"], {"count_to": 3, "step": 2}))
+
+        with self.assertRaises(TaskArgumentsError) as cm:
+            validator.validate(["me", 1, 2, 3], {"my_name": "again", "bogus": 1})
+        self.assertEqual(
+            sorted(param_error["param"] for param_error in cm.exception.param_errors),
+            ["args[3]", "bogus", "my_name"],
+        )
+
+    def test_validate_nested_types(self):
+        params = [TaskParameter(name="items", annotation=Dict[Literal["items"], Dict[str, List[int]]])]
+        validator = TaskArgumentsValidator(params)
+
+        self.assertEqual(
+            validator.validate(['{"items": {"a": [1, "2"]}}'], {}),
+            ([{"items": {"a": [1, 2]}}], {}),
+        )
+        # json.loads() alone would accept these
+        for value in ('{"other": {"a": [1]}}', '{"items": {"a": ["one"]}}', {"items": []}):
+            with self.assertRaises(TaskArgumentsError):
+                validator.validate([value], {})
+
+    def test_validate_models_and_other_classes(self):
+        params = [
+            TaskParameter(name="payment", annotation=Payment),
+            TaskParameter(name="distance", annotation=Meters),
+            TaskParameter(name="json", annotation=int, default="0"),
+        ]
+        validator = TaskArgumentsValidator(params)
+
+        args, kwargs = validator.validate(
+            ['{"amount": 1, "method": "CASH", "payment_dt": "2024-01-02T03:04:05Z"}', "2.5"], {"json": "7"}
+        )
+        self.assertIsInstance(args[0], Payment)
+        self.assertEqual(args[1].value, 2.5)
+        self.assertEqual(kwargs, {"json": 7})
+
+    def test_var_args(self):
+        params = [
+            TaskParameter(name="args", annotation=Parameter.empty, kind=Parameter.VAR_POSITIONAL),
+            TaskParameter(name="kwargs", annotation=Parameter.empty, kind=Parameter.VAR_KEYWORD),
+        ]
+        self.assertEqual(TaskArgumentsValidator(params).validate([1, 2], {"a": 3}), ([1, 2], {"a": 3}))
+
+    def test_unresolvable_annotation(self):
+        params = [TaskParameter(name="thing", annotation="NoSuchClass"), TaskParameter(name="n", annotation=int)]
+        validator = TaskArgumentsValidator(params)
+
+        self.assertEqual(validator.validate(["anything", "3"], {}), (["anything", 3], {}))
+        with self.assertRaises(TaskArgumentsError) as cm:
+            validator.validate(["anything"], {})
+        self.assertEqual([param_error["param"] for param_error in cm.exception.param_errors], ["n"])
+
+    def test_validator_is_cached(self):
+        task_registry = get_task_registry()
+        validator = task_registry.get_task_arguments_validator("vcelerydev.tasks.count_for_me")
+
+        self.assertIs(task_registry.get_task_arguments_validator("vcelerydev.tasks.count_for_me"), validator)
+        self.assertIsNone(task_registry.get_task_arguments_validator("vcelerydev.tasks.no_such_task"))
@@ -0,0 +1,78 @@
+from django.test import SimpleTestCase
+
+from vcelerytaskrunner.services.task_index import CompactTaskNameIndex, TaskNameIndex
+
+
+TASK_NAMES = sorted([
+    "app.tasks.Send_Email",
+    "app.tasks.send_sms",
+    "billing.tasks.charge_card",
+    "billing.tasks.refund_card",
+    "reports.tasks.emailed_report",
+    "x",
+])
+
+
+class TaskNameIndexTests(SimpleTestCase):
+    index_class = TaskNameIndex
+
+    def _brute_force(self, mask, runnable_tasks=None, runnable_only=False):
+        return [
+            position for position, name in enumerate(TASK_NAMES)
+            if (not mask or mask.lower() in name.lower())
+            and (not runnable_only or runnable_tasks is None or name in runnable_tasks)
+        ]
+
+    def test_matches_linear_scan(self):
+        runnable_tasks = {"app.tasks.send_sms", "billing.tasks.refund_card"}
+        index = self.index_class(TASK_NAMES, runnable_tasks)
+
+        for mask in [None, "", "x", "ca", "card", "EMAIL", "tasks.", "s.s", "nothing", "_card"]:
+            for runnable_only in [False, True]:
+                self.assertEqual(
+                    list(index.find(mask, runnable_only=runnable_only)),
+                    self._brute_force(mask, runnable_tasks, runnable_only),
+                    f"mask={mask!r}, runnable_only={runnable_only}"
+                )
+
+    def test_all_runnable(self):
+        index = self.index_class(TASK_NAMES)
+
+        self.assertEqual(list(index.find(None, runnable_only=True)), list(range(len(TASK_NAMES))))
+        self.assertTrue(all(index.runnable_flags))
+
+    def test_find_after_pages_like_find(self):
+        runnable_tasks = {"app.tasks.send_sms", "billing.tasks.refund_card", "x"}
+        index = self.index_class(TASK_NAMES, runnable_tasks)
+
+        for mask in [None, "card", "tasks", "s"]:
+            for runnable_only in [False, True]:
+                positions = []
+                after_name = None
+                has_more = True
+                while has_more:
+                    page, has_more = index.find_after(mask, after_name, 2, runnable_only=runnable_only)
+                    positions.extend(page)
+                    if page:
+                        after_name = TASK_NAMES[page[-1]]
+                self.assertEqual(positions, list(index.find(mask, runnable_only=runnable_only)))
+                self.assertEqual(index.count(mask, runnable_only=runnable_only), len(positions))
+
+    def test_find_after_removed_name(self):
+        index = self.index_class(TASK_NAMES)
+
+        positions, _ = index.find_after(None, "billing.tasks.charge_card_v0", 10)
+        self.assertEqual(TASK_NAMES[positions[0]], "billing.tasks.refund_card")
+
+
+class CompactTaskNameIndexTests(TaskNameIndexTests):
+    index_class = CompactTaskNameIndex
+
+    def test_non_ascii_names(self):
+        # "İ".lower() is two characters long, so the lowered names don't line up with the names
+        task_names = sorted(["app.tasks.İmport", "app.tasks.export", "app.tasks.import_all"])
+        index = self.index_class(task_names)
+
+        self.assertEqual([task_names[position] for position in index.find("import")], ["app.tasks.import_all"])
+        self.assertEqual([task_names[position] for position in index.find("i̇mport")], ["app.tasks.İmport"])
+        self.assertEqual(list(index.task_names), task_names)
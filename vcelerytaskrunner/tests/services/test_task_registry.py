@@ -0,0 +1,227 @@
+import time
+from typing import List
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from pydantic import create_model
+
+from vcelerytaskrunner.services.registry_refresh import (
+    TaskRegistryRefresher, request_registry_refresh, start_registry_services,
+)
+from vcelerytaskrunner.services.task_runner import get_task_registry, reload_task_registry, get_task_infos
+from vcelerytaskrunner.services.task_registry import TaskFilter, TaskRegistry
+
+
+class TaskParameterCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.task_registry = get_task_registry()
+
+    def test_parameters_cached_per_task(self):
+        task_name = "vcelerydev.tasks.process_incoming_payment"
+        self.task_registry.catalog.task_parameters.pop(task_name, None)
+        before = self.task_registry.get_parameter_cache_info()
+
+        first = self.task_registry.get_task_parameters(task_name)
+        second = self.task_registry.get_task_parameters(task_name)
+
+        after = self.task_registry.get_parameter_cache_info()
+        self.assertEqual(after["misses"], before["misses"] + 1)
+        self.assertEqual(after["hits"], before["hits"] + 1)
+        self.assertEqual([p.name for p in first], ["payer", "payment"])
+        self.assertEqual(first, second)
+        # Same TaskParameter instances (and JSON schemas) are reused
+        self.assertIs(first[1], second[1])
+
+    def test_runner_tasks_left_out(self):
+        task_name = "vcelerytaskrunner.tasks.prune_task_run_records"
+        self.assertIn(task_name, self.task_registry.celery_app.tasks)
+
+        self.assertNotIn(task_name, self.task_registry.task_names)
+        self.assertIsNone(self.task_registry.get_task(task_name))
+        self.assertIsNone(self.task_registry.get_task_info(task_name))
+
+    def test_unknown_task_not_cached(self):
+        self.assertEqual(self.task_registry.get_task_parameters("no.such.task"), [])
+        self.assertNotIn("no.such.task", self.task_registry.catalog.task_parameters)
+
+    def test_refresh_clears_cache(self):
+        self.task_registry.get_task_parameters("vcelerydev.tasks.say_hello")
+        self.assertGreater(self.task_registry.get_parameter_cache_info()["size"], 0)
+
+        self.task_registry._refresh_registry()
+
+        self.assertEqual(self.task_registry.get_parameter_cache_info()["size"], 0)
+
+
+class TaskRegistryAccessorTests(SimpleTestCase):
+
+    def tearDown(self):
+        reload_task_registry()
+
+    def test_registry_is_long_lived(self):
+        self.assertIs(get_task_registry(), get_task_registry())
+
+    def test_reload_picks_up_runnable_tasks(self):
+        with override_settings(VCELERY_TASKRUN_RUNNABLE_TASKS={"vcelerydev.tasks.say_hello"}):
+            task_registry = reload_task_registry()
+
+        self.assertIs(get_task_registry(), task_registry)
+        task_infos = get_task_infos(TaskFilter(mask=None, runnable_only=True))
+        self.assertEqual([task_info["name"] for task_info in task_infos["task_infos"]], ["vcelerydev.tasks.say_hello"])
+
+
+class TaskRegistryRefreshTests(SimpleTestCase):
+
+    def test_refresh_swaps_catalog(self):
+        task_registry = get_task_registry()
+        old_catalog = task_registry.catalog
+        old_task_names = list(old_catalog.task_names)
+
+        new_catalog = task_registry.refresh(warm_parameters=True)
+
+        self.assertIsNot(new_catalog, old_catalog)
+        self.assertIs(task_registry.catalog, new_catalog)
+        # Readers still holding the old catalog see it intact
+        self.assertEqual(old_catalog.task_names, old_task_names)
+        self.assertEqual(new_catalog.task_names, old_task_names)
+        self.assertEqual(new_catalog.version, old_catalog.version)
+        self.assertEqual(set(new_catalog.task_parameters_json), set(new_catalog.task_names))
+
+    def test_version_follows_parameter_schemas(self):
+        def create_task(field_type):
+            # Same signature repr each time: only the JSON schema of the model differs
+            Payload = create_model("Payload", amount=(field_type, ...))
+
+            def task(payload: Payload):
+                pass
+            return task
+
+        celery_app = mock.Mock(tasks={"app.tasks.pay": create_task(int)})
+        task_registry = TaskRegistry(celery_app, force_autodiscovery=False)
+        catalog = TaskRegistry.catalog
+        self.addCleanup(setattr, TaskRegistry, "catalog", catalog)
+
+        version = task_registry.refresh().version
+        self.assertEqual(task_registry.refresh().version, version)
+
+        celery_app.tasks["app.tasks.pay"] = create_task(str)
+        self.assertNotEqual(task_registry.refresh().version, version)
+
+    def test_version_follows_nested_models(self):
+        def create_task(field_type):
+            Item = create_model("Item", quantity=(field_type, ...))
+
+            def task(items: List[Item]):
+                pass
+            return task
+
+        celery_app = mock.Mock(tasks={"app.tasks.order": create_task(int)})
+        task_registry = TaskRegistry(celery_app, force_autodiscovery=False)
+        catalog = TaskRegistry.catalog
+        self.addCleanup(setattr, TaskRegistry, "catalog", catalog)
+
+        version = task_registry.refresh().version
+        celery_app.tasks["app.tasks.order"] = create_task(float)
+        self.assertNotEqual(task_registry.refresh().version, version)
+        self.assertEqual(task_registry.catalog.task_parameters, {})
+
+    def test_refresher_trigger(self):
+        old_catalog = get_task_registry().catalog
+        refresher = TaskRegistryRefresher()
+        refresher.start()
+        try:
+            refresher.trigger()
+            self._wait_for(lambda: get_task_registry().catalog is not old_catalog)
+        finally:
+            refresher.stop()
+            refresher.join(timeout=5)
+
+    def test_refresher_polls_generation(self):
+        old_catalog = get_task_registry().catalog
+        refresher = TaskRegistryRefresher(interval=0.01)
+        refresher.start()
+        try:
+            time.sleep(0.05)
+            self.assertIs(get_task_registry().catalog, old_catalog)
+
+            request_registry_refresh()
+            self._wait_for(lambda: get_task_registry().catalog is not old_catalog)
+        finally:
+            refresher.stop()
+            refresher.join(timeout=5)
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "Timed out waiting for a refresh")
+            time.sleep(0.01)
+
+
+class LazyAutodiscoveryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.celery_app = mock.Mock(tasks={"app.tasks.one": mock.Mock(), "app.tasks.two": mock.Mock()})
+        self.catalog = TaskRegistry.catalog
+        TaskRegistry.catalog = None
+
+    def tearDown(self):
+        TaskRegistry.catalog = self.catalog
+
+    def test_discovery_deferred_to_first_use(self):
+        task_registry = TaskRegistry(self.celery_app)
+        self.assertFalse(task_registry.is_loaded)
+        self.celery_app.autodiscover_tasks.assert_not_called()
+
+        self.assertEqual(task_registry.get_task_infos(TaskFilter(mask="two", runnable_only=False))["count"], 1)
+        self.assertEqual(task_registry.task_names, ["app.tasks.one", "app.tasks.two"])
+
+        self.assertTrue(task_registry.is_loaded)
+        self.celery_app.autodiscover_tasks.assert_called_once_with(force=True)
+
+    def test_without_forced_autodiscovery(self):
+        task_registry = TaskRegistry(self.celery_app, force_autodiscovery=False)
+
+        self.assertEqual(task_registry.task_names, ["app.tasks.one", "app.tasks.two"])
+        self.celery_app.autodiscover_tasks.assert_not_called()
+
+
+class OtherRunnableTasksIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.catalog = TaskRegistry.catalog
+        self.addCleanup(setattr, TaskRegistry, "catalog", self.catalog)
+        self.celery_app = mock.Mock(tasks={"app.tasks.one": mock.Mock(), "app.tasks.two": mock.Mock()})
+
+    def test_index_built_once_per_catalog(self):
+        TaskRegistry(self.celery_app, force_autodiscovery=False).refresh()
+        task_registry = TaskRegistry(self.celery_app, {"app.tasks.two"}, force_autodiscovery=False)
+        task_filter = TaskFilter(mask=None, runnable_only=True)
+
+        with mock.patch.object(TaskRegistry, "_build_name_index", wraps=task_registry._build_name_index) as build:
+            for _ in range(3):
+                task_infos = task_registry.get_task_infos(task_filter)
+                self.assertEqual([task_info["name"] for task_info in task_infos["task_infos"]], ["app.tasks.two"])
+        build.assert_called_once()
+
+        # A new catalog gets its own
+        TaskRegistry(self.celery_app, force_autodiscovery=False).refresh()
+        self.assertEqual(task_registry.get_task_infos(task_filter)["count"], 1)
+        self.assertEqual(list(TaskRegistry.catalog.other_name_indexes), [frozenset({"app.tasks.two"})])
+
+
+class RegistryServicesTests(SimpleTestCase):
+
+    @override_settings(VCELERY_TASKRUN_WARM_REGISTRY=True, VCELERY_TASK_REGISTRY_REFRESH_INTERVAL=60)
+    def test_only_started_by_servers(self):
+        from django.apps import apps
+
+        with mock.patch("vcelerytaskrunner.services.registry_refresh.start_registry_warmer") as warmer, \
+                mock.patch("vcelerytaskrunner.services.registry_refresh.start_registry_refresher") as refresher:
+            apps.get_app_config("vcelerytaskrunner").ready()
+            warmer.assert_not_called()
+            refresher.assert_not_called()
+
+            start_registry_services()
+            warmer.assert_called_once_with()
+            refresher.assert_called_once_with()
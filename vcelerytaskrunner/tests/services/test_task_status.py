@@ -0,0 +1,65 @@
+from unittest import mock
+
+from celery import states
+from celery.backends.base import DisabledBackend
+from celery.backends.cache import CacheBackend
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.task_status import get_task_run_statuses
+
+
+class TaskRunStatusesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.celery_app = settings.VCELERY_TASKRUN_CELERY_APP
+        self.backend = CacheBackend(app=self.celery_app, backend="memory", url="memory://", serializer="pickle")
+        for task_id in ("done", "failed", "running"):
+            TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", task_id, [], {})
+        self.backend.store_result("done", "hello", states.SUCCESS)
+        self.backend.store_result("failed", ValueError("no"), states.FAILURE)
+
+    def _get_statuses(self, task_ids):
+        with mock.patch.object(type(self.celery_app), "backend", new_callable=mock.PropertyMock) as backend:
+            backend.return_value = self.backend
+            return get_task_run_statuses(task_ids, celery_app=self.celery_app)
+
+    def test_batched_lookup(self):
+        with mock.patch.object(self.backend, "mget", wraps=self.backend.mget) as mget:
+            statuses = self._get_statuses(["done", "failed", "running", "unknown"])
+
+        self.assertEqual(mget.call_count, 1)
+        self.assertEqual(
+            {task_id: status["status"] for task_id, status in statuses.items()},
+            {"done": states.SUCCESS, "failed": states.FAILURE, "running": states.PENDING, "unknown": states.PENDING},
+        )
+        self.assertIsNotNone(statuses["done"]["finished_at"])
+        self.assertEqual(
+            dict(TaskRunRecord.objects.values_list("task_id", "status")),
+            {"done": states.SUCCESS, "failed": states.FAILURE, "running": states.PENDING},
+        )
+
+    def test_cached_and_finished_not_looked_up(self):
+        self._get_statuses(["done", "running"])
+
+        with mock.patch.object(self.backend, "mget", wraps=self.backend.mget) as mget:
+            self._get_statuses(["done", "running"])
+        mget.assert_not_called()
+
+        cache.clear()
+        with mock.patch.object(self.backend, "mget", wraps=self.backend.mget) as mget:
+            self._get_statuses(["done", "running"])
+        # "done" is final in the database, so only "running" is looked up
+        self.assertEqual(len(mget.call_args.args[0]), 1)
+
+    def test_disabled_backend(self):
+        TaskRunRecord.objects.filter(task_id="running").update(status=states.STARTED)
+        self.backend = DisabledBackend(app=self.celery_app)
+
+        statuses = self._get_statuses(["done", "running"])
+
+        self.assertEqual(statuses["done"]["status"], states.PENDING)
+        self.assertEqual(statuses["running"]["status"], states.STARTED)
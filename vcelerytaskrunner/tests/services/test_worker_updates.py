@@ -0,0 +1,100 @@
+from unittest import mock
+
+from celery import states
+from celery.signals import worker_process_shutdown
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services import worker_updates
+from vcelerytaskrunner.services.worker_updates import TaskRunRecordUpdater, coalesce_updates
+
+
+class TaskRunRecordUpdaterTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", f"id-{i}", [], {})
+        self.updater = TaskRunRecordUpdater(batch_size=100, flush_interval_ms=10000, max_queue_size=100)
+
+    def tearDown(self):
+        self.updater.stop()
+
+    def test_coalesce_updates(self):
+        self.assertEqual(
+            coalesce_updates([
+                ("a", {"status": states.STARTED, "started_at": 1}),
+                ("b", {"status": states.STARTED}),
+                ("a", {"status": states.SUCCESS, "runtime": 2.0}),
+            ]),
+            {"a": {"status": states.SUCCESS, "started_at": 1, "runtime": 2.0}, "b": {"status": states.STARTED}},
+        )
+
+    def test_batched_update(self):
+        self.updater.on_task_prerun("id-0")
+        self.updater.on_task_finished("id-0", states.SUCCESS)
+        self.updater.on_task_prerun("id-1")
+        self.updater.on_task_finished("id-1", states.FAILURE)
+        self.updater.on_task_prerun("id-2")
+
+        # Apply the queued updates from this thread so that they run in the test transaction
+        task_run_updates = []
+        while not self.updater._batcher._queue.empty():
+            task_run_updates.append(self.updater._batcher._queue.get_nowait())
+            self.updater._batcher._queue.task_done()
+        with CaptureQueriesContext(connection) as queries:
+            self.updater._write(task_run_updates)
+
+        self.assertEqual(len(queries.captured_queries), 1)
+        records = {record.task_id: record for record in TaskRunRecord.objects.all()}
+        self.assertEqual(records["id-0"].status, states.SUCCESS)
+        self.assertIsNotNone(records["id-0"].started_at)
+        self.assertIsNotNone(records["id-0"].finished_at)
+        self.assertGreaterEqual(records["id-0"].runtime, 0)
+        self.assertEqual(records["id-1"].status, states.FAILURE)
+        self.assertEqual(records["id-2"].status, states.STARTED)
+        self.assertIsNone(records["id-2"].finished_at)
+
+        stats = self.updater.get_stats()
+        self.assertEqual((stats["events"], stats["rows_updated"]), (5, 3))
+        self.assertGreater(stats["handler_seconds_total"], 0)
+
+    def test_update_before_record_saved(self):
+        started = {"status": states.STARTED}
+        retries = self.updater._write([("id-0", started), ("late", started)])
+        self.assertEqual(retries, [("late", started)])
+
+        TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "late", [], {})
+        self.assertEqual(self.updater._write(retries), [])
+        self.assertEqual(TaskRunRecord.objects.get(task_id="late").status, states.STARTED)
+        self.assertEqual(self.updater._unmatched_since, {})
+
+    def test_unmatched_update_expires(self):
+        updater = TaskRunRecordUpdater(
+            batch_size=100, flush_interval_ms=10000, max_queue_size=100, unmatched_retry_seconds=0
+        )
+        try:
+            self.assertEqual(updater._write([("never-saved", {"status": states.STARTED})]), [])
+            self.assertEqual(updater.get_stats()["expired"], 1)
+        finally:
+            updater.stop()
+
+    def test_started_tasks_bounded(self):
+        updater = TaskRunRecordUpdater(batch_size=100, flush_interval_ms=10000, max_queue_size=100, max_started_tasks=2)
+        try:
+            for task_id in ("lost", "a", "b"):
+                updater.on_task_prerun(task_id)
+            self.assertEqual(list(updater._started), ["a", "b"])
+            updater.on_task_finished("a", states.SUCCESS)
+            self.assertEqual(list(updater._started), ["b"])
+        finally:
+            updater.stop()
+
+    @override_settings(VCELERY_TASK_RUN_RECORD_WORKER_UPDATES={"FLUSH_INTERVAL_MS": 10000})
+    def test_stopped_on_process_shutdown(self):
+        worker_updates.connect_worker_signals()
+        with mock.patch.object(worker_updates, "_updater", self.updater), \
+                mock.patch.object(self.updater, "stop") as stop:
+            worker_process_shutdown.send(sender=None, pid=0, exitcode=0)
+        stop.assert_called_once_with()
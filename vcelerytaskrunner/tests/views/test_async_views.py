@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.task_registry import TaskRegistry
+from vcelerytaskrunner.services.task_runner import get_task_registry, reload_task_registry
+from vcelerytaskrunner.tests.views.test_task_runs import RunTaskTestCase
+
+
+ASYNC_TASKS_URL = reverse("vcelery-api-tasks-async")
+ASYNC_TASK_RUN_URL = reverse("vcelery-api-task-run-async")
+
+
+# Launch on the test's own thread so the record is written inside the test transaction.
+@override_settings(VCELERY_TASKRUN_ASYNC_LAUNCH_THREADS=0)
+class AsyncViewsTests(RunTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+
+    async def test_get_tasks(self):
+        response = await self.async_client.get(ASYNC_TASKS_URL, {"mask": "count_for"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task["name"] for task in response.json()["tasks"]], ["vcelerydev.tasks.count_for_me"])
+        sync_response = await sync_to_async(self.client.get)("/api/tasks/", {"mask": "count_for"})
+        self.assertEqual(response.content, sync_response.content)
+
+        response = await self.async_client.get(
+            ASYNC_TASKS_URL, {"mask": "count_for"}, headers={"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_run_task(self):
+        response = await self.async_client.post(
+            f"{ASYNC_TASK_RUN_URL}?task=vcelerydev.tasks.count_for_me",
+            {"args": ["Alan Smithee", "3"]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 202)
+        task_run_record = await TaskRunRecord.objects.aget(task_id=response.json()["task_id"])
+        self.assertEqual(task_run_record.get_run_args(), {"args": ["Alan Smithee", 3], "kwargs": {}})
+
+    async def test_run_task_errors(self):
+        response = await self.async_client.post(
+            f"{ASYNC_TASK_RUN_URL}?task=vcelerydev.tasks.count_for_me", "{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.post(
+            f"{ASYNC_TASK_RUN_URL}?task=vcelerydev.tasks.count_for_me",
+            {"kwargs": {"count_to": "three"}},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            sorted(param_error["param"] for param_error in response.json()["param_errors"]), ["count_to", "my_name"]
+        )
+
+    async def test_permissions(self):
+        user = await User.objects.acreate(username="nobody")
+        await sync_to_async(self.async_client.force_login)(user)
+
+        response = await self.async_client.get(ASYNC_TASKS_URL)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_cold_registry(self):
+        get_parameters = TaskRegistry._get_task_parameters
+        on_event_loop = []
+
+        def _get_task_parameters(task_registry, catalog, task_name):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop.append(task_name)
+            except RuntimeError:
+                pass
+            return get_parameters(task_registry, catalog, task_name)
+
+        await sync_to_async(reload_task_registry)()
+        task_registry = get_task_registry()
+        self.assertFalse(task_registry.is_task_list_warm())
+        self.assertFalse(task_registry.is_task_warm("vcelerydev.tasks.count_for_me"))
+
+        with patch.object(TaskRegistry, "_get_task_parameters", autospec=True, side_effect=_get_task_parameters):
+            response = await self.async_client.get(ASYNC_TASKS_URL, {"limit": "1000"})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(task_registry.is_task_list_warm())
+
+            response = await self.async_client.post(
+                f"{ASYNC_TASK_RUN_URL}?task=vcelerydev.tasks.count_for_me",
+                {"args": ["Alan Smithee", "3"]},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 202)
+            self.assertTrue(task_registry.is_task_warm("vcelerydev.tasks.count_for_me"))
+
+        # Cold lookups were made from the sync thread, never from the event loop
+        self.assertEqual(on_event_loop, [])
+        self.assertTrue(task_registry.is_task_warm("vcelerydev.tasks.no_such_task"))
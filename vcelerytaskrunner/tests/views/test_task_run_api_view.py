@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.task_runner import reload_task_registry
+from vcelerytaskrunner.tests.views.test_task_runs import RunTaskTestCase
+
+
+TASK_RUN_API_URL = reverse("vcelery-api-task-run")
+
+
+class TaskRunAPIViewTests(RunTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _run_task(self, task_name: str, **body):
+        return self.client.post(f"{TASK_RUN_API_URL}?task={task_name}", body, content_type="application/json")
+
+    def test_run_task(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self._run_task("vcelerydev.tasks.count_for_me", args=["Alan Smithee"], kwargs={"count_to": "3"})
+
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertFalse(data["error"])
+        task_run_record = TaskRunRecord.objects.get(task_id=data["task_id"])
+        # The value is coerced to the annotated type
+        self.assertEqual(task_run_record.get_run_args(), {"args": ["Alan Smithee"], "kwargs": {"count_to": 3}})
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_run_task_with_pydantic_param(self):
+        payment = {"amount": 100, "method": "CASH", "payment_dt": "2024-01-02T03:04:05Z"}
+        response = self._run_task("vcelerydev.tasks.process_incoming_payment", args=["payer", payment])
+        self.assertEqual(response.status_code, 202)
+
+        response = self._run_task("vcelerydev.tasks.process_incoming_payment", args=["payer", dict(payment, amount=0)])
+        self.assertEqual(response.status_code, 422)
+        data = response.json()
+        self.assertEqual(data["error_code"], "invalid_arguments")
+        self.assertEqual([param_error["param"] for param_error in data["param_errors"]], ["payment"])
+
+    def test_invalid_arguments(self):
+        response = self._run_task("vcelerydev.tasks.count_for_me", kwargs={"count_to": "three", "bogus": 1})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            sorted(param_error["param"] for param_error in response.json()["param_errors"]),
+            ["bogus", "count_to", "my_name"],
+        )
+        self.assertFalse(TaskRunRecord.objects.exists())
+
+    def test_unknown_task(self):
+        response = self._run_task("vcelerydev.tasks.no_such_task")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["error_code"], "unknown_task")
+
+    def test_not_runnable(self):
+        with override_settings(VCELERY_TASKRUN_RUNNABLE_TASKS={"vcelerydev.tasks.say_hello"}):
+            reload_task_registry()
+        self.addCleanup(reload_task_registry)
+
+        response = self._run_task("vcelerydev.tasks.count_for_me", args=["Alan Smithee", 3])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()["error_code"], "not_runnable")
+
+    def test_bad_request(self):
+        response = self.client.post(TASK_RUN_API_URL, {"args": []}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        response = self._run_task("vcelerydev.tasks.say_hello", args={"to_name": "x"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            f"{TASK_RUN_API_URL}?task=vcelerydev.tasks.say_hello", "{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error_code"], "bad_request")
+
+    @override_settings(VCELERY_TASKRUN_RATE_LIMIT_PER_USER="1/m")
+    def test_rate_limited(self):
+        self.assertEqual(self._run_task("vcelerydev.tasks.say_hello").status_code, 202)
+
+        response = self._run_task("vcelerydev.tasks.say_hello", kwargs={"to_name": "again"})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.task_runner import TaskRunBatchSignal, TaskRunSignal
+from vcelerytaskrunner.tests.views.test_task_runs import RunTaskTestCase
+
+
+TASK_RUNS_URL = reverse("vcelery-api-task-runs")
+
+
+class TaskRunBulkAPIViewTests(RunTaskTestCase):
+
+    RUNS = [
+        {"task": "vcelerydev.tasks.say_hello", "kwargs": {"to_name": "Alan Smithee"}},
+        {"task": "vcelerydev.tasks.no_such_task"},
+        {"task": "vcelerydev.tasks.count_for_me", "args": ["Alan Smithee", 3]},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _run_tasks(self, runs):
+        return self.client.post(TASK_RUNS_URL, {"runs": runs}, content_type="application/json")
+
+    def test_run_tasks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self._run_tasks(self.RUNS)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([result["task"] for result in results], [run["task"] for run in self.RUNS])
+        self.assertIsNotNone(results[0]["task_id"])
+        self.assertIsNone(results[1]["task_id"])
+        self.assertIsNotNone(results[1]["error_msg"])
+        self.assertIsNotNone(results[2]["task_id"])
+
+        self.assertEqual(
+            set(TaskRunRecord.objects.values_list("task_id", flat=True)),
+            {results[0]["task_id"], results[2]["task_id"]}
+        )
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    @override_settings(VCELERY_TASKRUN_BULK_SIGNAL_MODE="batch")
+    def test_batch_signal(self):
+        item_signals = []
+        batch_signals = []
+
+        def on_item(sender, **kwargs):
+            item_signals.append(kwargs)
+
+        def on_batch(sender, **kwargs):
+            batch_signals.append(kwargs)
+
+        TaskRunSignal.connect(on_item)
+        TaskRunBatchSignal.connect(on_batch)
+        try:
+            self._run_tasks(self.RUNS)
+        finally:
+            TaskRunSignal.disconnect(on_item)
+            TaskRunBatchSignal.disconnect(on_batch)
+
+        self.assertEqual(item_signals, [])
+        self.assertEqual(len(batch_signals), 1)
+        self.assertEqual(len(batch_signals[0]["task_runs"]), 2)
+
+    def test_invalid_request(self):
+        response = self._run_tasks([])
+        self.assertEqual(response.status_code, 400)
+
+        response = self._run_tasks([{"task": "vcelerydev.tasks.say_hello", "args": "not a list"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(TaskRunRecord.objects.count(), 0)
+
+    @override_settings(VCELERY_TASKRUN_RATE_LIMIT_PER_TASK={"vcelerydev.tasks.say_hello": "2/m"})
+    def test_rate_limited_runs(self):
+        runs = [{"task": "vcelerydev.tasks.say_hello", "kwargs": {"to_name": f"name {i}"}} for i in range(3)]
+        runs.append({"task": "vcelerydev.tasks.count_for_me", "args": ["Alan Smithee", 3]})
+
+        results = self._run_tasks(runs).json()["results"]
+
+        self.assertEqual([result["task_id"] is not None for result in results], [True, True, False, True])
+        self.assertIn("Rate limit", results[2]["error_msg"])
+        self.assertEqual(TaskRunRecord.objects.count(), 3)
+
+    @override_settings(VCELERY_TASKRUN_IDEMPOTENCY_WINDOW=60)
+    def test_idempotent_runs(self):
+        run = {"task": "vcelerydev.tasks.say_hello", "kwargs": {"to_name": "Alan Smithee"}}
+
+        results = self._run_tasks([run, run]).json()["results"]
+        self.assertEqual(results[0]["task_id"], results[1]["task_id"])
+        results_again = self._run_tasks([run]).json()["results"]
+        self.assertEqual(results_again[0]["task_id"], results[0]["task_id"])
+        self.assertEqual(TaskRunRecord.objects.count(), 1)
+
+    @override_settings(VCELERY_TASKRUN_IDEMPOTENCY_WINDOW=60, VCELERY_TASKRUN_RATE_LIMIT_PER_USER="1/m")
+    def test_rate_limited_run_releases_claim(self):
+        first = {"task": "vcelerydev.tasks.say_hello", "kwargs": {"to_name": "first"}}
+        second = {"task": "vcelerydev.tasks.say_hello", "kwargs": {"to_name": "second"}}
+
+        results = self._run_tasks([first, second]).json()["results"]
+        self.assertIsNone(results[1]["task_id"])
+
+        # The rate limited run was not claimed, so it is launched once the limit allows it
+        with override_settings(VCELERY_TASKRUN_RATE_LIMIT_PER_USER=None):
+            results = self._run_tasks([second]).json()["results"]
+        self.assertIsNotNone(results[0]["task_id"])
+        self.assertEqual(TaskRunRecord.objects.count(), 2)
+
+
+class TaskRunStatusesAPIViewTests(RunTaskTestCase):
+
+    def test_statuses(self):
+        task_id = self.client.post(
+            TASK_RUNS_URL, {"runs": [{"task": "vcelerydev.tasks.say_hello"}]}, content_type="application/json"
+        ).json()["results"][0]["task_id"]
+
+        response = self.client.post(
+            reverse("vcelery-api-task-run-statuses"), {"task_ids": [task_id]}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["statuses"][task_id]), {"status", "started_at", "finished_at", "runtime"})
+
+    def test_invalid_request(self):
+        response = self.client.post(
+            reverse("vcelery-api-task-run-statuses"), {"task_ids": "abc"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from vcelerytaskrunner.admin import EstimatedCountPaginator
+from vcelerytaskrunner.models import TaskRunRecord
+
+
+CHANGELIST_URL = reverse("admin:vcelerytaskrunner_taskrunrecord_changelist")
+
+
+class TaskRunRecordAdminTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+
+    def _create_records(self, count: int):
+        TaskRunRecord.objects.record_run_tasks(
+            [("vcelerydev.tasks.say_hello", f"id-{i}", [], {}) for i in range(count)], user=self.user
+        )
+
+    def _count_changelist_queries(self, **params) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(CHANGELIST_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def test_query_count_independent_of_rows(self):
+        self._create_records(5)
+        queries_for_5 = self._count_changelist_queries()
+        filtered_queries_for_5 = self._count_changelist_queries(task_name="vcelerydev.tasks.say_hello")
+
+        self._create_records(25)
+        self.assertEqual(self._count_changelist_queries(), queries_for_5)
+        self.assertEqual(self._count_changelist_queries(task_name="vcelerydev.tasks.say_hello"), filtered_queries_for_5)
+
+    @override_settings(VCELERY_ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    def test_estimated_count(self):
+        self._create_records(3)
+
+        with mock.patch("vcelerytaskrunner.admin.get_estimated_row_count", return_value=5000):
+            self.assertEqual(EstimatedCountPaginator(TaskRunRecord.objects.all(), 10).count, 5000)
+            self.assertEqual(EstimatedCountPaginator(TaskRunRecord.objects.filter(task_name="x"), 10).count, 0)
+        with mock.patch("vcelerytaskrunner.admin.get_estimated_row_count", return_value=500):
+            self.assertEqual(EstimatedCountPaginator(TaskRunRecord.objects.all(), 10).count, 3)
+        # SQLite has no estimate
+        self.assertEqual(EstimatedCountPaginator(TaskRunRecord.objects.all(), 10).count, 3)
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from vcelerytaskrunner.models import TaskRunRecord
+
+
+EXPORT_URL = reverse("vcelery-api-task-run-records-export")
+
+
+class TaskRunRecordExportAPIViewTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="auditor")
+        self.user.user_permissions.add(
+            *Permission.objects.filter(codename__in=["view_taskrunrecord", "export_taskrunrecord"])
+        )
+        self.client.force_login(self.user)
+
+        self.now = timezone.now()
+        TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "hello-old", ["a"], {}, user=self.user)
+        TaskRunRecord.objects.filter(task_id="hello-old").update(created_at=self.now - timedelta(days=10))
+        TaskRunRecord.objects.record_run_task("vcelerydev.tasks.say_hello", "hello-new", ["b"], {}, user=self.user)
+        TaskRunRecord.objects.record_run_task("vcelerydev.tasks.count_for_me", "count", [], {"count_to": 3})
+
+    def _export(self, **params):
+        response = self.client.get(EXPORT_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self._export(format="ndjson").splitlines()]
+
+        self.assertEqual([row["task_id"] for row in rows], ["hello-old", "hello-new", "count"])
+        self.assertEqual(rows[0]["run_by"], "auditor")
+        self.assertEqual(rows[0]["run_args"], {"args": ["a"], "kwargs": {}})
+
+    def test_csv_filters(self):
+        content = self._export(
+            task_name="vcelerydev.tasks.say_hello",
+            user="auditor",
+            created_after=(self.now - timedelta(days=1)).isoformat(),
+        )
+
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row["task_id"] for row in rows], ["hello-new"])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(EXPORT_URL, {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(EXPORT_URL, {"created_after": "yesterday"}).status_code, 400)
+
+    def test_permission_required(self):
+        self.user.user_permissions.remove(Permission.objects.get(codename="export_taskrunrecord"))
+        self.user = User.objects.get(pk=self.user.pk)
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(EXPORT_URL).status_code, 403)
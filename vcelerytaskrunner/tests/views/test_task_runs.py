@@ -1,15 +1,23 @@
 import json
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from django.contrib.auth.models import User
 from django.http.response import HttpResponse
 from django.test import Client
-from django.urls import reverse
+from django.urls import path, reverse
+
+from vcelerytaskrunner.views import TaskRunFormView, TasksView
 
 
 TASK_RUN_URL = reverse("vcelery-task-run")
 
+# An install that routes the pages but not the task run statuses API
+urlpatterns = [
+    path('tasks/', TasksView.as_view(), name="vcelery-tasks"),
+    path('task_run/', TaskRunFormView.as_view(), name="vcelery-task-run"),
+]
+
 
 # Run tests here by:
 #     python manage.py test --settings=main.test_settings vcelerytaskrunner
@@ -152,3 +160,18 @@ class ToTimezoneTests(RunTaskTestCase):
         to_tz = "America/New_York"
         response = self._run_task("vcelerydev.tasks.to_timezone", dt=dt, to_tz=to_tz)
         self.assertTrue("task_id" in response.cookies)
+
+
+class TaskRunStatusPollingTests(RunTaskTestCase):
+
+    def test_polls_statuses(self):
+        self.client.cookies["task_id"] = "some-task-id"
+        response = self.client.get(TASK_RUN_URL, {"task": "vcelerydev.tasks.say_hello"})
+        self.assertContains(response, reverse("vcelery-api-task-run-statuses"))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_without_statuses_api(self):
+        self.client.cookies["task_id"] = "some-task-id"
+        response = self.client.get(TASK_RUN_URL, {"task": "vcelerydev.tasks.say_hello"})
+        self.assertContains(response, "some-task-id")
+        self.assertNotContains(response, "pollStatus")
@@ -104,4 +104,40 @@ class TasksAPIViewTests(RunTaskTestCase):
 
                 self.assertIsNone(param["default"])
             else:
-                self.fail(f"Unexpected parameter: {param['name']}")
\ No newline at end of file
+                self.fail(f"Unexpected parameter: {param['name']}")
+
+    def test_get_tasks_etag(self):
+        response = self.client.get("/api/tasks/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        not_modified = self.client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], etag)
+
+        other_page = self.client.get("/api/tasks/?offset=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other_page.status_code, 200)
+        self.assertNotEqual(other_page["ETag"], etag)
+
+    def test_get_tasks_with_cursor(self):
+        all_names = [task["name"] for task in self.client.get("/api/tasks/?limit=1000").json()["tasks"]]
+
+        names = []
+        cursor = ""
+        while cursor is not None:
+            data = self.client.get(f"/api/tasks/?limit=3&withCount=true&cursor={cursor}").json()
+            self.assertEqual(data["total_count"], len(all_names))
+            names.extend(task["name"] for task in data["tasks"])
+            cursor = data["next_cursor"]
+
+        self.assertEqual(names, all_names)
+
+    def test_get_tasks_with_cursor_count_optional(self):
+        data = self.client.get("/api/tasks/?cursor=&limit=2").json()
+        self.assertIsNone(data["total_count"])
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_get_tasks_with_bad_cursor(self):
+        response = self.client.get("/api/tasks/?cursor=%25%25")
+        self.assertEqual(response.status_code, 400)
@@ -1,32 +1,60 @@
+import hashlib
 import json
 import logging
+import math
 from datetime import datetime, timedelta
 from inspect import Parameter
-from typing import Any, Dict, List, Optional, _GenericAlias
+from typing import Any, Dict, List, Optional, Union
 
 from urllib.parse import quote
 
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.mixins import PermissionRequiredMixin, AccessMixin
-from django.core.exceptions import ValidationError
-from django.http import JsonResponse, HttpResponseRedirect, HttpRequest, HttpResponse
+from django.contrib.auth.mixins import PermissionRequiredMixin, AccessMixin, UserPassesTestMixin
+from django.http import (
+    JsonResponse, HttpResponseRedirect, HttpRequest, HttpResponse, HttpResponseNotModified, StreamingHttpResponse,
+)
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
-from django.views.generic import TemplateView
-from pydantic import BaseModel
+from django.utils.http import parse_etags, quote_etag
+from django.views.generic import TemplateView, View
 
 from rest_framework.exceptions import ParseError
 
 from vcelerytaskrunner.services.task_registry import (
     TaskInfo,
     DEFAULT_PAGE_SIZE,
+    CursorPagination,
     LimitOffsetPagination,
     TaskFilter,
     TaskRegistry,
     TaskParameter,
 )
-from vcelerytaskrunner.services.task_runner import run_and_record, get_task_infos, get_task_info, TASK_REGISTRY
+from vcelerytaskrunner.models import TaskRunRecord
+from vcelerytaskrunner.services.launch_guard import RateLimitExceeded
+from vcelerytaskrunner.services.metrics import PROMETHEUS_CONTENT_TYPE, InProcessMetrics, get_metrics
+from vcelerytaskrunner.services.profiling import PROFILE_STORE, get_profiling_config
+from vcelerytaskrunner.services.task_arguments import TaskArgumentsError
+from vcelerytaskrunner.services.record_export import (
+    FORMAT_CSV,
+    FORMAT_JSONL,
+    format_rows,
+    iter_serialized_task_run_records,
+)
+from vcelerytaskrunner.services.task_status import get_task_run_statuses
+from vcelerytaskrunner.services.task_runner import (
+    TaskRunRequest,
+    arun_and_record,
+    get_task_info,
+    get_task_infos,
+    get_task_registry,
+    run_and_record,
+    run_and_record_many,
+)
 from rest_framework.views import APIView
 
 
@@ -35,24 +63,24 @@ logger = logging.getLogger(__name__)
 
 PERMISSIONS_CAN_SEE_TASKS = ["vcelerytaskrunner.view_taskrunrecord"]
 PERMISSIONS_CAN_SEE_AND_RUN_TASKS = ["vcelerytaskrunner.view_taskrunrecord", "vcelerytaskrunner.add_taskrunrecord"]
+PERMISSIONS_CAN_EXPORT_TASK_RUNS = ["vcelerytaskrunner.view_taskrunrecord", "vcelerytaskrunner.export_taskrunrecord"]
 
 VCELERY_SHOW_ONLY_RUNNABLE_TASKS = getattr(settings, "VCELERY_SHOW_ONLY_RUNNABLE_TASKS", False)
 
 
 
-class TasksAPIView(AccessMixin, APIView):
+class TaskListMixin:
     """
-    Returns a list of Celery tasks
+    Builds the task list response of TasksAPIView and AsyncTasksAPIView. It comes from the registry, which only blocks
+    while it is cold (see TaskRegistry.is_task_list_warm()): loading the catalog may autodiscover tasks, and the
+    parameters of tasks listed for the first time are inspected and encoded.
     """
 
     @staticmethod
     def _create_task_run_url(task_info: TaskInfo) -> str:
         return f"{reverse('vcelery-task-run')}?task={quote(task_info['name'])}"
 
-    def get(self, request):
-        if not request.user.has_perms(PERMISSIONS_CAN_SEE_TASKS):
-            return self.handle_no_permission()
-
+    def _get_task_list_response(self, request: HttpRequest) -> HttpResponse:
         mask = request.GET.get("mask")
         runnable_only = True
 
@@ -63,60 +91,445 @@ class TasksAPIView(AccessMixin, APIView):
             if not runnable_only_param or runnable_only_param.lower() == "false":
                 runnable_only = False
 
-        entries = []
-        offset = int(request.GET.get("offset") or 0)
+        task_registry: TaskRegistry = get_task_registry()
         limit = int(request.GET.get("limit") or DEFAULT_PAGE_SIZE)
-        task_infos_w_count = get_task_infos(
-            TaskFilter(mask=mask, runnable_only=runnable_only),
-            pagination=LimitOffsetPagination(offset=offset, limit=limit)
-        )
-        task_registry: TaskRegistry = TASK_REGISTRY
+        if "cursor" in request.GET:
+            # Keyset pagination: resume after the last task of the previous page. Counting is opt-in.
+            cursor = request.GET.get("cursor") or None
+            with_count = (request.GET.get("withCount") or "").lower() == "true"
+            pagination = CursorPagination(cursor=cursor, limit=limit, with_count=with_count)
+        else:
+            offset = int(request.GET.get("offset") or 0)
+            pagination = LimitOffsetPagination(offset=offset, limit=limit)
+
+        etag = self._create_etag(task_registry.catalog_version, mask, runnable_only, pagination)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return self._set_cache_headers(HttpResponseNotModified(), etag)
+
+        try:
+            task_infos_w_count = get_task_infos(
+                TaskFilter(mask=mask, runnable_only=runnable_only),
+                pagination=pagination
+            )
+        except ValueError as e:
+            return JsonResponse(data={"error": True, "error_msg": str(e)}, status=400)
+
+        # The parameters of each task are pre-encoded by the registry, so the response is stitched together from
+        # JSON fragments rather than re-encoded through TaskParameter.Encoder on every request.
+        entries = []
         for task_info in task_infos_w_count["task_infos"]:
-            entry: TaskInfo = task_info.copy()
-            entry['task_run_url'] = self._create_task_run_url(task_info)
-            task_params = task_registry.get_task_parameters(task_info["name"])
-            entry['parameters'] = task_params
+            entries.append(
+                '{"name": %s, "runnable": %s, "task_run_url": %s, "parameters": %s}' % (
+                    json.dumps(task_info["name"]),
+                    json.dumps(task_info["runnable"]),
+                    json.dumps(self._create_task_run_url(task_info)),
+                    task_registry.get_task_parameters_json(task_info["name"]),
+                )
+            )
+        content = '{"tasks": [%s], "total_count": %s' % (", ".join(entries), json.dumps(task_infos_w_count["count"]))
+        if "next_cursor" in task_infos_w_count:
+            content += ', "next_cursor": %s' % json.dumps(task_infos_w_count["next_cursor"])
+        content += "}"
+
+        return self._set_cache_headers(HttpResponse(content, content_type="application/json"), etag)
 
-            entries.append(entry)
+    @staticmethod
+    def _create_etag(
+        catalog_version: str,
+        mask: Optional[str],
+        runnable_only: bool,
+        pagination: Union[LimitOffsetPagination, CursorPagination]
+    ) -> str:
+        query = f"{catalog_version}|{mask or ''}|{runnable_only}|{sorted(pagination.items())}"
+        return quote_etag(hashlib.sha1(query.encode("utf-8")).hexdigest())
 
-        data={"tasks": entries, "total_count": task_infos_w_count["count"]}
+    @staticmethod
+    def _set_cache_headers(response: HttpResponse, etag: str) -> HttpResponse:
+        # "no-cache" makes browsers revalidate with If-None-Match each time instead of reusing stale pages.
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
-        return JsonResponse(data=data, encoder=TaskParameter.json_encoder())
 
+class TasksAPIView(TaskListMixin, AccessMixin, APIView):
+    """
+    Returns a list of Celery tasks
+    """
+
+    def get(self, request):
+        if not request.user.has_perms(PERMISSIONS_CAN_SEE_TASKS):
+            return self.handle_no_permission()
 
-class TaskRunAPIView(AccessMixin, APIView):
+        return self._get_task_list_response(request)
+
+
+async def _auser_has_perms(request: HttpRequest, perms: List[str]) -> bool:
+    # Loading the user of the session and their permissions uses the ORM, which is sync only. Both are done in one
+    # hop to the sync thread, after which request.user is resolved and can be used from async code.
+    return await sync_to_async(lambda: request.user.has_perms(perms))()
+
+
+class AsyncTasksAPIView(TaskListMixin, AccessMixin, View):
     """
-    Undocumented and not fully supported (yet).
+    Native async version of TasksAPIView for ASGI deployments. Same parameters and response, served on the event loop
+    once the registry is warm. The session user (and their permissions) is loaded through the sync thread, and so is
+    the response while the registry is cold, since that means discovering tasks and inspecting their signatures.
+    Unlike the DRF views, only session authentication is supported.
+    """
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        if not await _auser_has_perms(request, PERMISSIONS_CAN_SEE_TASKS):
+            return self.handle_no_permission()
+
+        if not get_task_registry().is_task_list_warm():
+            return await sync_to_async(self._get_task_list_response)(request)
+        return self._get_task_list_response(request)
+
+
+class TaskRunLaunchMixin:
+    """
+    Request parsing, argument validation and error responses shared by TaskRunAPIView and AsyncTaskRunAPIView.
+    """
+
+    @staticmethod
+    def _error_response(status: int, error_code: str, error_msg: str, **extra: Any) -> JsonResponse:
+        return JsonResponse(
+            data={"error": True, "error_code": error_code, "error_msg": error_msg, **extra}, status=status
+        )
+
+    def _prepare_task_run(self, request: HttpRequest, data: Any) -> Union[TaskRunRequest, JsonResponse]:
+        """
+        Parses the body of a launch request and validates the arguments against the task's parameters. The task and
+        its validator come from the registry, which blocks while they are cold (see TaskRegistry.is_task_warm()):
+        loading the catalog may autodiscover tasks, and the validator of a task is compiled on its first launch.
+
+        :param request: the request (for the "task" query parameter)
+        :param data: the decoded JSON body
+
+        :return: the TaskRunRequest with the coerced arguments, or the error response to return
+        """
+        try:
+            if not isinstance(data, dict):
+                raise ParseError("The body must be a JSON object")
+            task_name = request.GET.get("task") or data.get("task")
+            if not task_name:
+                raise ParseError("'task' parameter required")
+            args = data.get("args") or []
+            kwargs = data.get("kwargs") or {}
+            if not isinstance(args, list) or not isinstance(kwargs, dict):
+                raise ParseError("'args' must be a list and 'kwargs' an object")
+            delay_param = data.get("delay")
+            delay = timedelta(seconds=int(delay_param)) if delay_param else None
+        except (ParseError, ValueError, TypeError) as e:
+            return self._error_response(400, "bad_request", str(e.detail if isinstance(e, ParseError) else e))
+
+        task_registry: TaskRegistry = get_task_registry()
+        task_info = task_registry.get_task_info(task_name)
+        if task_info is None:
+            return self._error_response(404, "unknown_task", f"No task found for name {task_name}")
+        if not task_info["runnable"]:
+            return self._error_response(403, "not_runnable", f"task {task_name} is not runnable")
+
+        try:
+            args, kwargs = task_registry.get_task_arguments_validator(task_name).validate(args, kwargs)
+        except TaskArgumentsError as e:
+            return self._error_response(422, "invalid_arguments", str(e), param_errors=e.param_errors)
+        return TaskRunRequest(task=task_name, args=args, kwargs=kwargs, delay=delay)
+
+    def _launch_error_response(self, task_name: str, error: Exception) -> JsonResponse:
+        if isinstance(error, RateLimitExceeded):
+            response = self._error_response(429, "rate_limited", str(error))
+            response["Retry-After"] = str(math.ceil(error.retry_after))
+            return response
+        # run_and_record() already logged the details
+        return self._error_response(503, "launch_failed", f"Cannot run task {task_name}: {error}")
+
+    @staticmethod
+    def _launched_response(result: AsyncResult) -> JsonResponse:
+        return JsonResponse(data={"error": False, "task_id": result.id}, status=202)
+
+
+class TaskRunAPIView(TaskRunLaunchMixin, AccessMixin, APIView):
+    """
+    Runs a task. The task name is given by the "task" query parameter (or in the body), and the JSON body has the
+    arguments:
+
+        {"args": [...], "kwargs": {...}, "delay": <seconds>}
+
+    The arguments are checked and coerced against the task's parameters (e.g. a pydantic model parameter accepts a
+    JSON object). Responses:
+
+        202 {"error": false, "task_id": "<task ID>"} -- the task was queued
+        400 -- malformed request (error_code "bad_request")
+        403 -- the task is not runnable (error_code "not_runnable")
+        404 -- no such task (error_code "unknown_task")
+        422 -- the arguments don't match the task's parameters (error_code "invalid_arguments", with "param_errors":
+               [{"param": "<name>", "error": "<message>"}, ...])
+        429 -- a rate limit was exceeded (error_code "rate_limited", with a Retry-After header)
+        503 -- the task could not be queued, e.g. the broker is unreachable (error_code "launch_failed")
     """
     # curl -d "{\"kwargs\": {\"to_name\":\"John\"}}" -H "Content-Type: application/json" -u root:nothing1234 -XPOST http://localhost:8000/api/task_run/?task=vcelerydev.tasks.say_hello
-    # curl -d "{\"kwargs\": {\"to_name\":\"John\"}}" -H "Content-Type: application/json" -u van:nothing1234 -XPOST http://localhost:8000/api/task_run/?task=vcelerydev.tasks.say_hello
 
     def post(self, request):
         if not request.user.has_perms(PERMISSIONS_CAN_SEE_AND_RUN_TASKS):
             return self.handle_no_permission()
 
-        task_name_param = request.GET.get("task")
-        if task_name_param:
-            try:
-                args = request.data.get("args") or []
-                kwargs = request.data.get("kwargs") or {}
-                logger.debug(f"task={task_name_param}, args={args}, kwargs={kwargs}")
-                delay_param = request.data.get("delay") if request.data else None
-                delay = None
-                if delay_param:
-                    delay = timedelta(seconds=int(delay_param))
-
-                result = run_and_record(task_name_param, args=args, kwargs=kwargs, user=request.user, delay=delay)
-                result_data = {"error": False, "task_id": result.id}
-            except (ValidationError, ParseError) as e:
-                result_data = {"error": True, "error_msg": str(e)}
-            except Exception as e:
-                logger.exception("Cannot run task %s with %s: %s", task_name_param, request.data or {}, e)
-                result_data = {"error": True, "error_msg": str(e)}
+        try:
+            data = request.data
+        except ParseError as e:
+            return self._error_response(400, "bad_request", str(e.detail))
+        task_run_request = self._prepare_task_run(request, data)
+        if isinstance(task_run_request, HttpResponse):
+            return task_run_request
+
+        try:
+            result = run_and_record(
+                task_run_request["task"],
+                args=task_run_request["args"],
+                kwargs=task_run_request["kwargs"],
+                user=request.user,
+                delay=task_run_request["delay"],
+            )
+        except Exception as e:
+            return self._launch_error_response(task_run_request["task"], e)
+        return self._launched_response(result)
+
+
+class AsyncTaskRunAPIView(TaskRunLaunchMixin, AccessMixin, View):
+    """
+    Native async version of TaskRunAPIView for ASGI deployments, with the same body and responses. Validation runs on
+    the event loop once the task is warm (through the sync thread before that, since it may discover tasks and compile
+    the task's validator), and the launch through arun_and_record(), so a request waiting on the broker doesn't tie up
+    the thread Django runs sync code on. Unlike the DRF views, only session authentication is supported, and CSRF
+    protection applies (send the X-CSRFToken header).
+    """
+
+    async def post(self, request: HttpRequest) -> HttpResponse:
+        if not await _auser_has_perms(request, PERMISSIONS_CAN_SEE_AND_RUN_TASKS):
+            return self.handle_no_permission()
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError as e:
+            return self._error_response(400, "bad_request", f"JSON parse error - {e}")
+        task_name = request.GET.get("task") or (data.get("task") if isinstance(data, dict) else None)
+        if task_name and not get_task_registry().is_task_warm(task_name):
+            task_run_request = await sync_to_async(self._prepare_task_run)(request, data)
         else:
-            result_data = {"error": True, "error_msg": "'task' parameter required"}
+            task_run_request = self._prepare_task_run(request, data)
+        if isinstance(task_run_request, HttpResponse):
+            return task_run_request
+
+        try:
+            result = await arun_and_record(
+                task_run_request["task"],
+                args=task_run_request["args"],
+                kwargs=task_run_request["kwargs"],
+                user=request.user,
+                delay=task_run_request["delay"],
+            )
+        except Exception as e:
+            return self._launch_error_response(task_run_request["task"], e)
+        return self._launched_response(result)
 
-        return JsonResponse(data=result_data)
+
+class TaskRunBulkAPIView(AccessMixin, APIView):
+    """
+    Runs several tasks in one call over a single broker connection, recording the runs with a single bulk INSERT.
+    Expected JSON body:
+
+        {"runs": [{"task": "<task name>", "args": [...], "kwargs": {...}, "delay": <seconds>}, ...]}
+
+    The response has the task_id (or error_msg) of each run in the same order as the request.
+    """
+    # curl -d "{\"runs\": [{\"task\": \"vcelerydev.tasks.say_hello\", \"kwargs\": {\"to_name\":\"John\"}}]}" -H "Content-Type: application/json" -u root:nothing1234 -XPOST http://localhost:8000/api/task_runs/
+
+    @staticmethod
+    def _parse_task_run_request(run: Any) -> TaskRunRequest:
+        if not isinstance(run, dict):
+            raise ParseError("Each run must be an object")
+        args = run.get("args") or []
+        kwargs = run.get("kwargs") or {}
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise ParseError("'args' must be a list and 'kwargs' an object")
+        delay_param = run.get("delay")
+        return TaskRunRequest(
+            task=run.get("task"),
+            args=args,
+            kwargs=kwargs,
+            delay=timedelta(seconds=int(delay_param)) if delay_param else None,
+        )
+
+    def post(self, request):
+        if not request.user.has_perms(PERMISSIONS_CAN_SEE_AND_RUN_TASKS):
+            return self.handle_no_permission()
+
+        max_runs = getattr(settings, "VCELERY_TASKRUN_BULK_MAX_RUNS", 1000)
+        try:
+            runs = request.data.get("runs") if isinstance(request.data, dict) else None
+            if not isinstance(runs, list) or not runs:
+                raise ParseError("'runs' must be a non-empty list")
+            if len(runs) > max_runs:
+                raise ParseError(f"At most {max_runs} runs can be requested at once")
+            task_run_requests = [self._parse_task_run_request(run) for run in runs]
+        except (ParseError, ValueError, TypeError) as e:
+            return JsonResponse(data={"error": True, "error_msg": str(e)}, status=400)
+
+        results = run_and_record_many(task_run_requests, user=request.user)
+        return JsonResponse(
+            data={
+                "error": False,
+                "results": [
+                    {"task": result["task"], "task_id": result["task_id"], "error_msg": result["error"]}
+                    for result in results
+                ],
+            }
+        )
+
+
+class TaskRunStatusesAPIView(AccessMixin, APIView):
+    """
+    Returns the states of several task runs in one call. Expected JSON body:
+
+        {"task_ids": ["<task ID>", ...]}
+
+    The response has the status, started_at, finished_at and runtime (seconds) of each task by task ID.
+    """
+    # curl -d "{\"task_ids\": [\"4f9e1b6c-...\"]}" -H "Content-Type: application/json" -u root:nothing1234 -XPOST http://localhost:8000/api/task_run_statuses/
+
+    def post(self, request):
+        if not request.user.has_perms(PERMISSIONS_CAN_SEE_TASKS):
+            return self.handle_no_permission()
+
+        max_task_ids = getattr(settings, "VCELERY_TASK_STATUS_MAX_IDS", 500)
+        task_ids = request.data.get("task_ids") if isinstance(request.data, dict) else None
+        if not isinstance(task_ids, list) or not task_ids or not all(isinstance(t, str) for t in task_ids):
+            return JsonResponse(data={"error": True, "error_msg": "'task_ids' must be a non-empty list"}, status=400)
+        if len(task_ids) > max_task_ids:
+            return JsonResponse(
+                data={"error": True, "error_msg": f"At most {max_task_ids} task IDs can be requested at once"},
+                status=400,
+            )
+
+        return JsonResponse(data={"error": False, "statuses": get_task_run_statuses(task_ids)})
+
+
+class TaskRunRecordExportAPIView(AccessMixin, APIView):
+    """
+    Streams TaskRunRecords, oldest first, as CSV (format=csv, the default) or NDJSON (format=ndjson). Optional filters:
+
+        task_name -- the exact task name
+        user -- the username of the user who ran the tasks
+        created_after, created_before -- ISO 8601 datetimes
+
+    Records are read from the database in chunks as the response is sent, so memory use doesn't depend on the number
+    of records exported.
+    """
+    # curl -u root:nothing1234 "http://localhost:8000/api/task_run_records/export/?format=ndjson&task_name=vcelerydev.tasks.say_hello"
+
+    FORMATS = {
+        "csv": (FORMAT_CSV, "text/csv"),
+        "ndjson": (FORMAT_JSONL, "application/x-ndjson"),
+    }
+
+    @staticmethod
+    def _parse_datetime_param(request: HttpRequest, name: str) -> Optional[datetime]:
+        value = request.GET.get(name)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ParseError(f"'{name}' must be an ISO 8601 datetime")
+        return parsed
+
+    def perform_content_negotiation(self, request, force=False):
+        # "format" selects the export format here, not one of DRF's renderers (which would 404 on e.g. format=csv).
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        if not request.user.has_perms(PERMISSIONS_CAN_EXPORT_TASK_RUNS):
+            return self.handle_no_permission()
+
+        format_param = request.GET.get("format") or "csv"
+        if format_param not in self.FORMATS:
+            return JsonResponse(
+                data={"error": True, "error_msg": f"'format' must be one of {', '.join(self.FORMATS)}"}, status=400
+            )
+        export_format, content_type = self.FORMATS[format_param]
+
+        task_run_records = TaskRunRecord.objects.all()
+        try:
+            created_after = self._parse_datetime_param(request, "created_after")
+            created_before = self._parse_datetime_param(request, "created_before")
+        except ParseError as e:
+            return JsonResponse(data={"error": True, "error_msg": str(e.detail)}, status=400)
+        if request.GET.get("task_name"):
+            task_run_records = task_run_records.filter(task_name=request.GET["task_name"])
+        if request.GET.get("user"):
+            task_run_records = task_run_records.filter(
+                **{f"run_by__{get_user_model().USERNAME_FIELD}": request.GET["user"]}
+            )
+        if created_after:
+            task_run_records = task_run_records.filter(created_at__gte=created_after)
+        if created_before:
+            task_run_records = task_run_records.filter(created_at__lt=created_before)
+        # Ordered by created_at only, so that the (task_name, created_at) / created_at indexes serve the query.
+        task_run_records = task_run_records.order_by("created_at")
+
+        response = StreamingHttpResponse(
+            format_rows(iter_serialized_task_run_records(task_run_records), export_format), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="task_run_records.{format_param}"'
+        return response
+
+
+@method_decorator(login_required, name='dispatch')
+class MetricsAPIView(AccessMixin, APIView):
+    """
+    Exposes the timings of the task runner in the Prometheus text format, for staff users, when VCELERY_TASKRUN_METRICS
+    is InProcessMetrics. The numbers are those of the process serving the request.
+    """
+    # curl -u root:nothing1234 http://localhost:8000/api/metrics/
+
+    def get(self, request):
+        if not request.user.is_staff:
+            return self.handle_no_permission()
+
+        metrics = get_metrics()
+        if not isinstance(metrics, InProcessMetrics):
+            return HttpResponse(
+                "Set VCELERY_TASKRUN_METRICS to vcelerytaskrunner.services.metrics.InProcessMetrics to enable.\n",
+                content_type="text/plain; charset=utf-8",
+                status=404,
+            )
+        return HttpResponse(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@method_decorator(login_required, name='dispatch')
+class ProfilesView(UserPassesTestMixin, TemplateView):
+    """
+    Shows the profiles of the runner views collected by ProfilingMiddleware in this process, to superusers. With
+    ?format=json, returns them as JSON.
+    """
+    template_name = "vcelerytaskrunner/profiles.html"
+
+    def test_func(self) -> bool:
+        return self.request.user.is_superuser
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if request.GET.get("format") == "json":
+            return JsonResponse(
+                data={"enabled": get_profiling_config() is not None, "profiles": PROFILE_STORE.get_profiles()}
+            )
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        profiling_config = get_profiling_config()
+        return {
+            "profiling_config": profiling_config,
+            "sample_percent": profiling_config["sample_rate"] * 100 if profiling_config else None,
+            "profiles": PROFILE_STORE.get_profiles(),
+        }
 
 
 @method_decorator(login_required, name='dispatch')
@@ -190,7 +603,7 @@ class TaskRunFormView(PermissionRequiredMixin, TemplateView):
 
         # if a task name was provided, then prefill
         if task_name:
-            task_registry: TaskRegistry = TASK_REGISTRY
+            task_registry: TaskRegistry = get_task_registry()
             task_params = task_registry.get_task_parameters(task_name)
             
             context_data["task_params"] = task_params
@@ -221,32 +634,17 @@ class TaskRunFormView(PermissionRequiredMixin, TemplateView):
 
         return response
 
-    def _deserialize_task_param_value(self, task_param: TaskParameter, value: Any) -> Any:
-        has_default = task_param.default is not None
-        deserialized_value = value
-        if value:
-            if isinstance(task_param.annotation, _GenericAlias):
-                # This only works for values that can be deserialized from JSON e.g. List[int] and List[str]
-                deserialized_value = json.loads(value)
-            elif issubclass(task_param.annotation, datetime):
-                # fromisoformat() doesn't know how to parse "Z"
-                if value.endswith("Z"):
-                    value = value[:len(value)-1] + "-00:00"
-                deserialized_value = datetime.fromisoformat(value)
-            elif issubclass(task_param.annotation, BaseModel):
-                deserialized_value = task_param.annotation.model_validate_json(value)
-            elif task_param.annotation == Parameter.empty:
-                logger.warning(f"No type hint available for {task_param.name}. Using str.")
-                deserialized_value = str(value)
-            else:
-                deserialized_value = task_param.annotation(value)
-        else:
-            if not has_default:
-                # Missing parameter
-                raise ValueError(f"Missing value for {task_param.name}")
-            else:
-                deserialized_value = task_param.default.value
-        return deserialized_value
+    def _get_posted_task_param_values(self, request: HttpRequest, task_params: List[TaskParameter]) -> Dict[str, Any]:
+        posted_values = {}
+        for task_param in task_params:
+            if task_param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                continue
+            posted_value = request.POST.get(task_param.name)
+            if posted_value:
+                if task_param.annotation == Parameter.empty:
+                    logger.warning(f"No type hint available for {task_param.name}. Using str.")
+                posted_values[task_param.name] = posted_value
+        return posted_values
 
     def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         """
@@ -262,19 +660,24 @@ class TaskRunFormView(PermissionRequiredMixin, TemplateView):
         
         try:
             if task_name:
-                task_registry: TaskRegistry = TASK_REGISTRY
+                task_registry: TaskRegistry = get_task_registry()
                 task_params = task_registry.get_task_parameters(task_name)
-                
+                validator = task_registry.get_task_arguments_validator(task_name)
+                if validator is None:
+                    raise ValueError(f"No task found for name {task_name}")
+
+                # All the values are validated in one go; missing ones are reported as errors.
+                _, param_values = validator.validate([], self._get_posted_task_param_values(request, task_params))
+
                 call_args = []
                 call_kwargs= {}
                 for task_param in task_params:
-                    posted_value = request.POST.get(task_param.name)
-                    param_value = self._deserialize_task_param_value(task_param, posted_value)
-                
+                    if task_param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                        continue
                     if task_param.default is not None:
-                        call_kwargs[task_param.name] = param_value
+                        call_kwargs[task_param.name] = param_values.get(task_param.name, task_param.default.value)
                     else:
-                        call_args.append(param_value)
+                        call_args.append(param_values[task_param.name])
                     
                 logger.info(f"Calling task {task_name} with args={call_args}, kwargs={call_kwargs}")
 